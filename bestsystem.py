@@ -15,6 +15,12 @@ from vendas.database import init_db as init_vendas_db
 from ordem_servico.database import init_db as init_os_db
 from estoque.database import init_db as init_estoque_db
 from catalogo.database import init_db as init_catalogo_db
+from diagnostico.database import init_db as init_diagnostico_db
+
+from core.clientes import init_clientes_db
+from core.jobs import init_jobs_db
+from core.jobs_view import painel_jobs
+from core.modelos import init_modelos_db
 
 from vendas.view import fmt_today_label
 
@@ -29,6 +35,10 @@ def initialize_databases():
     init_os_db()
     init_estoque_db()
     init_catalogo_db()
+    init_diagnostico_db()
+    init_modelos_db()
+    init_clientes_db()
+    init_jobs_db()
 
 initialize_databases()
 
@@ -128,6 +138,9 @@ with st.sidebar:
         st.query_params.page = "catalogo"
         st.rerun()
     
+    # Jobs em segundo plano (PDFs, extratos, diagnósticos)
+    painel_jobs()
+
     # Footer da sidebar
     st.markdown("---")
     st.caption("Sistema interno v2.0.0")
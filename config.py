@@ -11,6 +11,10 @@ PLATFORM_TOOLS = r"C:\platform-tools"
 LAUDOS_DIR = Path(PLATFORM_TOOLS) / "Laudos"
 LAUDOS_DIR.mkdir(exist_ok=True)
 
+# ---------------- OUTPUTS ----------------
+EXTRATOS_DIR = BASE_DIR / "extratos"
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+
 # ---------------- MODULE PATHS ----------------
 VENDAS_DIR = BASE_DIR / "vendas"
 ORDEM_SERVICO_DIR = BASE_DIR / "ordem_servico"
@@ -0,0 +1,294 @@
+"""
+Histórico do cliente entre os módulos.
+
+Vendas, OS e diagnósticos guardam o cliente como texto livre. Cada
+tabela ganha a coluna ``cliente_chave`` (nome normalizado: sem
+acentos, caixa ou pontuação) e, onde há telefone, ``fone_chave``
+(últimos 8 dígitos), ambas indexadas junto com a data.
+
+``fetch_timeline_cliente`` junta tudo em uma linha do tempo ordenada
+por data (mais recente primeiro), paginada por cursor: a primeira
+página de um cliente antigo custa o mesmo que a de um cliente novo.
+As datas das tabelas (datas puras locais e timestamps UTC) são
+comparadas como o dia de Brasília.
+"""
+
+import re
+import sqlite3
+import unicodedata
+
+from config import DB_PATH
+from core.dates import SQLITE_UTC_PARA_LOCAL
+
+# Dígitos do telefone usados na chave: ignora DDI, DDD e o nono dígito
+DIGITOS_FONE = 8
+
+TIMELINE_PAGE_SIZE = 20
+
+# Tabela -> colunas de origem e rótulo na linha do tempo
+TABELAS_CLIENTE = {
+    "sales": {
+        "tipo": "Venda",
+        "nome": "cliente",
+        "fone": None,
+        "data": "data_venda",
+        "titulo": "aparelho",
+        "detalhe": "'Valor total: R$ ' || printf('%.2f', valor_total)",
+    },
+    "sales_archive": {
+        "tipo": "Venda (arquivada)",
+        "nome": "cliente",
+        "fone": None,
+        "data": "data_venda",
+        "titulo": "aparelho",
+        "detalhe": "'Valor total: R$ ' || printf('%.2f', valor_total)",
+    },
+    "service_orders": {
+        "tipo": "OS",
+        "nome": "nome",
+        "fone": "fone",
+        "data": "data_entrada",
+        "titulo": "numero_os || ' - ' || aparelho",
+        "detalhe": "status || ' - ' || detalhes_servico",
+    },
+    "os_arquivadas": {
+        "tipo": "OS (arquivada)",
+        "nome": "nome",
+        "fone": "fone",
+        "data": "data_entrada",
+        "titulo": "numero_os || ' - ' || aparelho",
+        "detalhe": "status || ' - ' || detalhes_servico",
+    },
+    "diagnosticos": {
+        "tipo": "Diagnóstico",
+        "nome": "cliente",
+        "fone": None,
+        "data": "created_at",
+        "titulo": "aparelho",
+        "detalhe": "tipo || ' - ' || COALESCE(resumo, status)",
+    },
+}
+
+
+# ======================================================
+# CHAVES
+# ======================================================
+
+def chave_cliente(nome: str | None) -> str | None:
+    """"  José  da Silva " → "jose da silva"."""
+    texto = unicodedata.normalize("NFKD", nome or "")
+    texto = texto.encode("ascii", "ignore").decode("ascii").lower()
+    chave = " ".join(re.findall(r"[a-z0-9]+", texto))
+    return chave or None
+
+
+def chave_fone(fone: str | None) -> str | None:
+    """"(14) 9 9639-4412" → "96394412"; None se curto demais."""
+    digitos = re.sub(r"\D", "", fone or "")
+    if len(digitos) < DIGITOS_FONE:
+        return None
+    return digitos[-DIGITOS_FONE:]
+
+
+def _dia_local(coluna: str) -> str:
+    """
+    SQL do dia (em Brasília) da coluna: timestamps UTC com hora são
+    ajustados; datas puras já são locais (como core.dates.local_date).
+    """
+    return (
+        f"CASE WHEN length({coluna}) > 10 "
+        f"THEN date({coluna}, '{SQLITE_UTC_PARA_LOCAL}') ELSE {coluna} END"
+    )
+
+
+# ======================================================
+# ESQUEMA
+# ======================================================
+
+def get_connection():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.create_function("chave_cliente", 1, chave_cliente, deterministic=True)
+    conn.create_function("chave_fone", 1, chave_fone, deterministic=True)
+    return conn
+
+
+def ensure_cliente_chave_columns(cur, tabela: str):
+    """
+    Adiciona cliente_chave (e fone_chave, se a tabela tem telefone)
+    com índices por (chave, data, id) para a paginação da timeline.
+    """
+    config = TABELAS_CLIENTE[tabela]
+
+    cur.execute(f"PRAGMA table_info({tabela})")
+    columns = [col[1] for col in cur.fetchall()]
+
+    chaves = ["cliente_chave"] + (["fone_chave"] if config["fone"] else [])
+
+    for coluna in chaves:
+        if coluna not in columns:
+            cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} TEXT")
+
+        cur.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS idx_{tabela}_{coluna}
+            ON {tabela} ({coluna}, {config['data']}, id)
+            """
+        )
+
+
+def init_clientes_db():
+    """
+    Garante as colunas de chave nas tabelas existentes e preenche as
+    linhas ainda sem chave. Chamar depois do init_db dos módulos.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    for tabela, config in TABELAS_CLIENTE.items():
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (tabela,),
+        )
+        if not cur.fetchone():
+            continue
+
+        ensure_cliente_chave_columns(cur, tabela)
+
+        cur.execute(
+            f"""
+            UPDATE {tabela}
+            SET cliente_chave = chave_cliente({config['nome']})
+            WHERE cliente_chave IS NULL
+            """
+        )
+
+        if config["fone"]:
+            cur.execute(
+                f"""
+                UPDATE {tabela}
+                SET fone_chave = chave_fone({config['fone']})
+                WHERE fone_chave IS NULL AND {config['fone']} IS NOT NULL
+                """
+            )
+
+    conn.commit()
+    conn.close()
+
+
+# ======================================================
+# BUSCA E LINHA DO TEMPO
+# ======================================================
+
+def buscar_clientes(texto: str, limit: int = 10):
+    """Chaves de cliente que começam com o texto (faixa no índice)."""
+    prefixo = chave_cliente(texto)
+    if not prefixo:
+        return []
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    partes = [
+        f"""
+        SELECT cliente_chave, {config['nome']} AS nome
+        FROM {tabela}
+        WHERE cliente_chave >= :inicio AND cliente_chave < :fim
+        """
+        for tabela, config in TABELAS_CLIENTE.items()
+    ]
+
+    cur.execute(
+        f"""
+        SELECT cliente_chave, MAX(nome) AS nome, COUNT(*) AS registros
+        FROM ({" UNION ALL ".join(partes)})
+        GROUP BY cliente_chave
+        ORDER BY registros DESC, cliente_chave
+        LIMIT :limit
+        """,
+        {"inicio": prefixo, "fim": prefixo + "\uffff", "limit": limit},
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+
+def fetch_timeline_cliente(
+    nome: str | None,
+    fone: str | None = None,
+    cursor: tuple | None = None,
+    limit: int = TIMELINE_PAGE_SIZE,
+):
+    """
+    Vendas, OS e diagnósticos do cliente (nome e/ou telefone), do
+    mais recente para o mais antigo.
+
+    `data` é o dia local (YYYY-MM-DD) em todas as origens, para que
+    vendas, OS e diagnósticos se intercalem na ordem certa. Cada tabela
+    contribui no máximo `limit` linhas a partir do cursor (data,
+    origem, id). Retorna (itens, próximo_cursor); próximo_cursor é None
+    na última página.
+    """
+    params = {
+        "chave": chave_cliente(nome),
+        "fone": chave_fone(fone),
+        "limit": limit + 1,
+        "data": cursor[0] if cursor else None,
+        "origem": cursor[1] if cursor else None,
+        "id": cursor[2] if cursor else None,
+    }
+
+    if not params["chave"] and not params["fone"]:
+        return [], None
+
+    partes = []
+    for tabela, config in TABELAS_CLIENTE.items():
+        data = _dia_local(config["data"])
+
+        filtro = "cliente_chave = :chave"
+        if config["fone"]:
+            filtro = f"({filtro} OR fone_chave = :fone)"
+
+        partes.append(
+            f"""
+            SELECT * FROM (
+                SELECT
+                    '{tabela}' AS origem,
+                    '{config['tipo']}' AS tipo,
+                    id,
+                    {data} AS data,
+                    {config['nome']} AS nome,
+                    {config['titulo']} AS titulo,
+                    {config['detalhe']} AS detalhe
+                FROM {tabela}
+                WHERE {filtro}
+                  AND (:data IS NULL OR ({data}, '{tabela}', id) < (:data, :origem, :id))
+                ORDER BY data DESC, id DESC
+                LIMIT :limit
+            )
+            """
+        )
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        f"""
+        {" UNION ALL ".join(partes)}
+        ORDER BY data DESC, origem DESC, id DESC
+        LIMIT :limit
+        """,
+        params,
+    )
+
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+
+    proximo = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        proximo = (rows[-1]["data"], rows[-1]["origem"], rows[-1]["id"])
+
+    return rows, proximo
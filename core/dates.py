@@ -0,0 +1,197 @@
+"""
+Utilidades de datas compartilhadas entre os módulos.
+
+Os módulos gravam datas no SQLite em formatos ISO conhecidos:
+
+• ``YYYY-MM-DD`` para datas puras (data_venda, vencimento)
+• ``YYYY-MM-DDTHH:MM:SS[.ffffff]`` para timestamps UTC gerados com
+  ``datetime.utcnow().isoformat()`` (created_at, changed_at, ...)
+
+Por isso as funções abaixo tentam primeiro o caminho rápido desses
+formatos e só recorrem ao parser genérico quando necessário.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+DATE_FORMAT = "%Y-%m-%d"
+LABEL_DATE_FORMAT = "%d/%m/%Y"
+LABEL_DATETIME_FORMAT = "%d/%m/%Y %H:%M"
+
+# Diferença fixa UTC → Brasília usada na exibição
+UTC_OFFSET_BRASILIA = timedelta(hours=3)
+
+# O mesmo ajuste como modificador de date()/datetime() do SQLite
+SQLITE_UTC_PARA_LOCAL = f"-{UTC_OFFSET_BRASILIA.total_seconds():.0f} seconds"
+
+
+# ======================================================
+# NORMALIZAÇÃO ESCALAR
+# ======================================================
+
+def _vazio(value) -> bool:
+    """None ou valor ausente do pandas (NaT, NaN)."""
+    if value is None:
+        return True
+
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def normalize_date(value) -> date | None:
+    """
+    Normaliza qualquer entrada para datetime.date
+    SEM timezone, SEM hora, SEM pandas UTC.
+    """
+    if _vazio(value):
+        return None
+
+    # string ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS) → caminho rápido
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+
+    # pandas Timestamp (subclasse de datetime)
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime().date()
+
+    # datetime -> date
+    if isinstance(value, datetime):
+        return value.date()
+
+    # Já é date (caso do st.date_input)
+    if isinstance(value, date):
+        return value
+
+    raise TypeError(f"Tipo inválido para data: {type(value)}")
+
+
+def normalize_datetime(value) -> datetime | None:
+    if _vazio(value):
+        return None
+
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+
+    if isinstance(value, datetime):
+        return value
+
+    raise TypeError(f"Tipo inválido para data: {type(value)}")
+
+
+def hoje_local() -> date:
+    """Data de hoje em Brasília, pelo mesmo ajuste fixo dos rótulos."""
+    return (datetime.utcnow() - UTC_OFFSET_BRASILIA).date()
+
+
+def local_date(value) -> date | None:
+    """
+    Dia (em Brasília) de uma data gravada no banco: timestamps UTC
+    com hora são ajustados; datas puras já são locais e ficam iguais.
+    """
+    if _vazio(value):
+        return None
+
+    if isinstance(value, str):
+        if len(value) <= 10:
+            return date.fromisoformat(value)
+        value = datetime.fromisoformat(value)
+
+    if isinstance(value, datetime):
+        return (value - UTC_OFFSET_BRASILIA).date()
+
+    return normalize_date(value)
+
+
+# ======================================================
+# NORMALIZAÇÃO VETORIZADA (COLUNAS DE DATAFRAME)
+# ======================================================
+
+def parse_date_column(series: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas para datetime64 (meia-noite),
+    descartando a hora. Valores inválidos viram NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.normalize()
+
+    return pd.to_datetime(
+        series.astype("string").str.slice(0, 10),
+        format=DATE_FORMAT,
+        errors="coerce",
+    )
+
+
+def parse_datetime_column(series: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de timestamps ISO para datetime64.
+    Valores inválidos viram NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    return pd.to_datetime(series, format="ISO8601", errors="coerce")
+
+
+# ======================================================
+# FORMATAÇÃO DE RÓTULOS (UTC → LOCAL)
+# ======================================================
+
+def _parse_label_value(value) -> datetime:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return pd.to_datetime(value, format="mixed").to_pydatetime()
+
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+
+    if isinstance(value, datetime):
+        return value
+
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+
+    return pd.to_datetime(value, format="mixed").to_pydatetime()
+
+
+@lru_cache(maxsize=8192)
+def parse_label_datetime(value) -> datetime:
+    """Versão memoizada do parser usado nos rótulos de tela."""
+    return _parse_label_value(value)
+
+
+@lru_cache(maxsize=8192)
+def _fmt_date_cached(value, with_time: bool) -> str:
+    dt = parse_label_datetime(value)
+
+    # ⚠️ Se NÃO houver horário explícito, é data pura → NÃO ajusta timezone
+    if dt.hour == 0 and dt.minute == 0 and dt.second == 0 and not with_time:
+        return dt.strftime(LABEL_DATE_FORMAT)
+
+    # Caso tenha horário, converte UTC → Brasília
+    dt_local = dt - UTC_OFFSET_BRASILIA
+
+    return (
+        dt_local.strftime(LABEL_DATETIME_FORMAT)
+        if with_time
+        else dt_local.strftime(LABEL_DATE_FORMAT)
+    )
+
+
+def fmt_date(value, with_time=False):
+    """Formata datas no padrão dd/mm/aaaa (ou dd/mm/aaaa HH:MM)."""
+    if not value:
+        return ""
+
+    try:
+        return _fmt_date_cached(value, bool(with_time))
+    except Exception:
+        return str(value)
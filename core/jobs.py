@@ -0,0 +1,367 @@
+"""
+Execução de tarefas longas em segundo plano.
+
+Diagnósticos via ADB, PDFs em lote e reindexações rodam em um pool de
+threads, fora do script do Streamlit: a tela só consulta o estado do
+job (tabela ``jobs``) e pode pedir o cancelamento.
+
+A função do job recebe um ``JobContext`` como primeiro argumento, que
+reporta progresso, verifica o cancelamento e distribui trabalho pesado
+de CPU em um pool de processos (``map_processos``).
+
+O retorno da função fica em memória (pode ser bytes, ex.: um PDF)
+por RESULTADO_TTL segundos e no máximo RESULTADOS_MAX de cada vez,
+para que sessões abandonadas não acumulem arquivos; na tabela é
+gravado apenas se for serializável em JSON.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from config import DB_PATH
+
+# Jobs executando ao mesmo tempo
+MAX_JOBS = 4
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+CANCELADO = "cancelado"
+INTERROMPIDO = "interrompido"
+
+STATUS_ATIVOS = (PENDENTE, EXECUTANDO)
+
+# Resultados em memória: validade (s) e quantidade máxima guardada
+RESULTADO_TTL = 30 * 60
+RESULTADOS_MAX = 16
+
+_executor = ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="job")
+
+# job_id -> (instante em que terminou, resultado), do mais antigo ao mais novo
+_resultados = OrderedDict()
+_cancelamentos = {}
+_lock = threading.Lock()
+
+
+class JobCancelado(Exception):
+    """Levantada dentro do job quando o cancelamento foi pedido."""
+
+
+# ======================================================
+# BANCO
+# ======================================================
+
+def get_connection():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_jobs_db():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            modulo TEXT,
+            descricao TEXT,
+            status TEXT NOT NULL,       -- pendente | executando | concluido | erro | cancelado | interrompido
+            feitos INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            mensagem TEXT,
+            resultado TEXT,
+            erro TEXT,
+            cancelar INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_modulo
+        ON jobs (modulo, created_at)
+        """
+    )
+
+    # Jobs que estavam rodando quando o processo anterior terminou
+    cur.execute(
+        f"""
+        UPDATE jobs
+        SET status = ?, finished_at = ?
+        WHERE status IN ({", ".join("?" for _ in STATUS_ATIVOS)})
+        """,
+        (INTERROMPIDO, datetime.utcnow().isoformat(), *STATUS_ATIVOS),
+    )
+
+    conn.commit()
+    conn.close()
+
+
+def _atualizar(job_id: str, **campos):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in campos)} WHERE id = ?",
+        (*campos.values(), job_id),
+    )
+
+    conn.commit()
+    conn.close()
+
+
+# ======================================================
+# CONTEXTO DO JOB
+# ======================================================
+
+class JobContext:
+    """Passado à função do job: progresso, cancelamento e pool de processos."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.feitos = 0
+        self.total = None
+
+    @property
+    def cancelado(self) -> bool:
+        # Sem o evento (job descartado), não há mais quem espere o resultado
+        evento = _cancelamentos.get(self.id)
+        return evento is None or evento.is_set()
+
+    def verificar_cancelamento(self):
+        if self.cancelado:
+            raise JobCancelado()
+
+    def progresso(self, feitos: int | None = None, total: int | None = None, mensagem: str | None = None):
+        """Grava o progresso; também é o ponto de parada se o job foi cancelado."""
+        campos = {}
+
+        if feitos is not None:
+            self.feitos = feitos
+            campos["feitos"] = feitos
+
+        if total is not None:
+            self.total = total
+            campos["total"] = total
+
+        if mensagem is not None:
+            campos["mensagem"] = mensagem
+
+        if campos:
+            _atualizar(self.id, **campos)
+
+        self.verificar_cancelamento()
+
+    def map_processos(self, funcao, chamadas: list[tuple], initializer=None, max_workers: int | None = None):
+        """
+        Executa funcao(*args) para cada tupla de `chamadas` em um pool
+        de processos e devolve (args, resultado) conforme terminam,
+        somando 1 ao progresso a cada um. Cancelado, descarta o que
+        ainda não começou.
+        """
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer) as executor:
+            futures = {executor.submit(funcao, *args): args for args in chamadas}
+
+            try:
+                for future in as_completed(futures):
+                    resultado = future.result()
+                    self.progresso(self.feitos + 1)
+                    yield futures[future], resultado
+            except JobCancelado:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+
+# ======================================================
+# EXECUÇÃO
+# ======================================================
+
+def _guardar_resultado(job_id: str, resultado):
+    """Guarda o retorno e descarta os vencidos e os mais antigos."""
+    agora = time.monotonic()
+
+    with _lock:
+        _resultados[job_id] = (agora, resultado)
+
+        while _resultados:
+            chave, (momento, _) = next(iter(_resultados.items()))
+            if len(_resultados) <= RESULTADOS_MAX and agora - momento <= RESULTADO_TTL:
+                break
+            del _resultados[chave]
+
+
+def _serializar(resultado) -> str | None:
+    try:
+        return json.dumps(resultado, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def _executar(job_id: str, funcao, args: tuple, kwargs: dict):
+    job = JobContext(job_id)
+
+    try:
+        _executar_job(job, funcao, args, kwargs)
+    finally:
+        # Job encerrado: o evento de cancelamento não é mais consultado
+        with _lock:
+            _cancelamentos.pop(job_id, None)
+
+
+def _executar_job(job: JobContext, funcao, args: tuple, kwargs: dict):
+    job_id = job.id
+
+    if job.cancelado:
+        _atualizar(job_id, status=CANCELADO, finished_at=datetime.utcnow().isoformat())
+        return
+
+    _atualizar(job_id, status=EXECUTANDO, started_at=datetime.utcnow().isoformat())
+
+    try:
+        resultado = funcao(job, *args, **kwargs)
+
+    except JobCancelado:
+        _atualizar(job_id, status=CANCELADO, finished_at=datetime.utcnow().isoformat())
+
+    except Exception as e:
+        traceback.print_exc()
+        _atualizar(
+            job_id,
+            status=ERRO,
+            erro=str(e) or e.__class__.__name__,
+            finished_at=datetime.utcnow().isoformat(),
+        )
+
+    else:
+        # Descartado enquanto rodava: ninguém vai buscar o resultado
+        with _lock:
+            descartado = job_id not in _cancelamentos
+
+        if not descartado:
+            _guardar_resultado(job_id, resultado)
+
+        _atualizar(
+            job_id,
+            status=CONCLUIDO,
+            resultado=_serializar(resultado),
+            finished_at=datetime.utcnow().isoformat(),
+        )
+
+
+def submeter_job(funcao, *args, tipo: str, modulo: str | None = None, descricao: str = "", **kwargs) -> str:
+    """
+    Registra o job e agenda funcao(job, *args, **kwargs) no pool.
+    Retorna o job_id.
+    """
+    job_id = str(uuid.uuid4())
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        INSERT INTO jobs (id, tipo, modulo, descricao, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (job_id, tipo, modulo, descricao, PENDENTE, datetime.utcnow().isoformat()),
+    )
+
+    conn.commit()
+    conn.close()
+
+    with _lock:
+        _cancelamentos[job_id] = threading.Event()
+
+    _executor.submit(_executar, job_id, funcao, args, kwargs)
+
+    return job_id
+
+
+# ======================================================
+# CONSULTA E CONTROLE
+# ======================================================
+
+def status_job(job_id: str) -> dict | None:
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    row = cur.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+
+def resultado_job(job_id: str):
+    """
+    Retorno da função (em memória; None após reiniciar o app, após
+    RESULTADO_TTL ou quando saiu para dar lugar a resultados novos).
+    """
+    with _lock:
+        guardado = _resultados.get(job_id)
+
+    if not guardado:
+        return None
+
+    momento, resultado = guardado
+    if time.monotonic() - momento > RESULTADO_TTL:
+        return None
+
+    return resultado
+
+
+def listar_jobs(modulo: str | None = None, apenas_ativos: bool = False, limit: int = 20):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = "SELECT * FROM jobs WHERE 1=1"
+    params = []
+
+    if modulo:
+        query += " AND modulo = ?"
+        params.append(modulo)
+
+    if apenas_ativos:
+        query += f" AND status IN ({', '.join('?' for _ in STATUS_ATIVOS)})"
+        params.extend(STATUS_ATIVOS)
+
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+
+def cancelar_job(job_id: str):
+    """Pede o cancelamento; o job para no próximo ponto de verificação."""
+    with _lock:
+        evento = _cancelamentos.get(job_id)
+
+    if evento:
+        evento.set()
+
+    _atualizar(job_id, cancelar=1)
+
+
+def descartar_job(job_id: str):
+    """Libera o resultado em memória (o registro na tabela permanece)."""
+    with _lock:
+        _resultados.pop(job_id, None)
+        _cancelamentos.pop(job_id, None)
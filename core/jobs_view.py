@@ -0,0 +1,69 @@
+"""
+Componentes de tela para os jobs de core.jobs.
+
+``acompanhar_job`` reexecuta só a si mesmo a cada segundo enquanto o
+job roda e dispara um rerun completo quando ele termina, para que a
+página mostre o resultado. ``painel_jobs`` faz o mesmo, mas só
+enquanto houver algum job ativo.
+"""
+
+import streamlit as st
+
+from .jobs import STATUS_ATIVOS, cancelar_job, listar_jobs, status_job
+
+
+def _barra(job: dict, texto: str):
+    total = job["total"] or 0
+    feitos = job["feitos"] or 0
+
+    legenda = job["mensagem"] or texto
+    if total:
+        legenda += f" {feitos}/{total}"
+
+    st.progress(feitos / total if total else 0.0, text=legenda)
+
+
+@st.fragment(run_every=1)
+def acompanhar_job(job_id: str, texto: str = "Processando..."):
+    """Barra de progresso e botão de cancelar enquanto o job roda."""
+    job = status_job(job_id)
+
+    if not job or job["status"] not in STATUS_ATIVOS:
+        st.rerun()
+
+    _barra(job, texto)
+
+    st.button(
+        "⏹️ Cancelar" if not job["cancelar"] else "Cancelando...",
+        key=f"cancelar_job_{job_id}",
+        on_click=cancelar_job,
+        args=(job_id,),
+        disabled=bool(job["cancelar"]),
+        width="stretch"
+    )
+
+
+def _lista_jobs(acompanhando: bool):
+    jobs = listar_jobs(apenas_ativos=True, limit=5)
+
+    if not jobs:
+        # Último job terminou: um rerun completo recria o painel sem
+        # atualização automática
+        if acompanhando:
+            st.rerun()
+        return
+
+    st.caption("⏳ Em andamento")
+    for job in jobs:
+        _barra(job, job["descricao"] or job["tipo"])
+
+
+def painel_jobs():
+    """
+    Lista compacta dos jobs em andamento (sidebar). Só se atualiza
+    sozinha enquanto há job ativo; jobs novos aparecem no rerun da
+    página que os iniciou.
+    """
+    acompanhando = bool(listar_jobs(apenas_ativos=True, limit=1))
+
+    st.fragment(_lista_jobs, run_every=2 if acompanhando else None)(acompanhando)
@@ -0,0 +1,381 @@
+"""
+Normalização de modelos de aparelho compartilhada entre os módulos.
+
+OS, vendas e diagnóstico gravam o aparelho como texto livre ("a12",
+"Samsung A12", "SM-A125M"). Este módulo resolve esse texto para o id
+de um modelo de ``diagnostico_modelos`` (modelo_tecnico →
+modelo_comercial), usando também a tabela ``aparelho_aliases`` para
+apelidos cadastrados à mão.
+
+Cada tabela de aparelhos (e o estoque de peças) ganha a coluna
+``modelo_id`` (indexada), de modo que relatórios e buscas por modelo
+viram GROUP BY / lookup sobre um inteiro.
+
+O índice de busca fica em memória e só é recarregado quando modelos
+ou aliases mudam (``invalidar_modelos``). A assinatura do catálogo
+usada na última reindexação fica em ``aparelho_reindexacao``: linhas
+que continuam sem modelo não voltam ao match aproximado a cada
+inicialização, só quando o catálogo muda.
+"""
+
+import difflib
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from config import DB_PATH
+
+# Tabela -> coluna de texto livre resolvida para `modelo_id`
+TABELAS_APARELHO = {
+    "service_orders": "aparelho",
+    "os_arquivadas": "aparelho",
+    "sales": "aparelho",
+    "sales_archive": "aparelho",
+    "diagnosticos": "aparelho",
+    "estoque_pecas": "modelo",
+}
+
+# Palavras que não identificam o modelo ("Samsung Galaxy A12" → "a12")
+PALAVRAS_IGNORADAS = {
+    "samsung", "galaxy", "apple", "motorola", "xiaomi", "lg", "asus",
+    "nokia", "realme", "huawei", "lenovo", "sony", "positivo",
+    "multilaser", "celular", "smartphone", "aparelho",
+}
+
+# Similaridade mínima (difflib) para aceitar um match aproximado
+LIMIAR_FUZZY = 0.85
+
+# Tamanho mínimo de chave para o match por trecho do texto
+MIN_CHAVE = 2
+
+_versao = 0
+_versao_lock = threading.Lock()
+
+
+# ======================================================
+# CONEXÃO E ESQUEMA
+# ======================================================
+
+def get_connection():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _tabela_existe(cur, tabela: str) -> bool:
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (tabela,),
+    )
+    return cur.fetchone() is not None
+
+
+def ensure_modelo_id_column(cur, tabela: str):
+    """Adiciona `modelo_id` (e o índice) à tabela, se ainda não existir."""
+    cur.execute(f"PRAGMA table_info({tabela})")
+    columns = [col[1] for col in cur.fetchall()]
+
+    if "modelo_id" not in columns:
+        cur.execute(f"ALTER TABLE {tabela} ADD COLUMN modelo_id INTEGER")
+
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{tabela}_modelo ON {tabela} (modelo_id)"
+    )
+
+
+def ensure_aliases_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS aparelho_aliases (
+            alias TEXT PRIMARY KEY,
+            modelo_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (modelo_id) REFERENCES diagnostico_modelos(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_aparelho_aliases_modelo
+        ON aparelho_aliases (modelo_id)
+        """
+    )
+
+
+def ensure_reindexacao_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS aparelho_reindexacao (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            assinatura TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        """
+    )
+
+
+def _assinatura_gravada(cur) -> str | None:
+    cur.execute("SELECT assinatura FROM aparelho_reindexacao WHERE id = 1")
+    row = cur.fetchone()
+    return row["assinatura"] if row else None
+
+
+def init_modelos_db():
+    """
+    Cria a tabela de aliases, garante `modelo_id` nas tabelas de
+    aparelhos já existentes e resolve as linhas ainda sem modelo.
+    Chamar depois do init_db dos módulos.
+
+    As linhas sem modelo só são reprocessadas se o catálogo mudou
+    desde a última reindexação (as gravações do sistema já resolvem
+    o modelo na hora); ``reindexar_modelos()`` força a passada.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    ensure_aliases_table(cur)
+    ensure_reindexacao_table(cur)
+
+    for tabela in TABELAS_APARELHO:
+        if _tabela_existe(cur, tabela):
+            ensure_modelo_id_column(cur, tabela)
+
+    conn.commit()
+
+    catalogo_igual = _assinatura_gravada(cur) == assinatura_catalogo()
+    conn.close()
+
+    if not catalogo_igual:
+        reindexar_modelos()
+
+
+# ======================================================
+# CHAVE DE COMPARAÇÃO
+# ======================================================
+
+def _tokens(texto: str) -> list[str]:
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = texto.encode("ascii", "ignore").decode("ascii").lower()
+
+    return [
+        t for t in re.findall(r"[a-z0-9]+", texto)
+        if t not in PALAVRAS_IGNORADAS
+    ]
+
+
+def chave_modelo(texto: str) -> str:
+    """
+    Chave compacta de comparação: sem acentos, marca ou separadores.
+    "Samsung Galaxy A-12" → "a12"; "SM-A125M" → "sma125m".
+    """
+    return "".join(_tokens(texto))
+
+
+# ======================================================
+# ÍNDICE EM MEMÓRIA
+# ======================================================
+
+def invalidar_modelos():
+    """Descarta o índice e as resoluções em cache (modelos/aliases mudaram)."""
+    global _versao
+    with _versao_lock:
+        _versao += 1
+
+
+@lru_cache(maxsize=2)
+def _indice(versao: int) -> tuple[dict, tuple]:
+    """(chave → modelo_id, chaves) a partir de modelos e aliases."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    indice = {}
+
+    if _tabela_existe(cur, "diagnostico_modelos"):
+        cur.execute(
+            "SELECT id, modelo_tecnico, modelo_comercial FROM diagnostico_modelos ORDER BY id"
+        )
+        for row in cur.fetchall():
+            for texto in (row["modelo_tecnico"], row["modelo_comercial"]):
+                indice.setdefault(chave_modelo(texto), row["id"])
+
+    # Aliases têm precedência sobre os nomes do catálogo
+    if _tabela_existe(cur, "aparelho_aliases"):
+        cur.execute("SELECT alias, modelo_id FROM aparelho_aliases")
+        for row in cur.fetchall():
+            indice[row["alias"]] = row["modelo_id"]
+
+    conn.close()
+
+    indice.pop("", None)
+    return indice, tuple(indice)
+
+
+@lru_cache(maxsize=4096)
+def _resolver(texto: str, versao: int) -> int | None:
+    indice, chaves = _indice(versao)
+    tokens = _tokens(texto)
+
+    if not tokens:
+        return None
+
+    # 1) texto inteiro
+    chave = "".join(tokens)
+    if chave in indice:
+        return indice[chave]
+
+    # 2) trecho do texto, do maior para o menor
+    #    ("a12 tela quebrada" → "a12")
+    for tamanho in range(len(tokens) - 1, 0, -1):
+        for inicio in range(len(tokens) - tamanho + 1):
+            trecho = "".join(tokens[inicio:inicio + tamanho])
+            if len(trecho) >= MIN_CHAVE and trecho in indice:
+                return indice[trecho]
+
+    # 3) aproximado
+    parecidos = difflib.get_close_matches(chave, chaves, n=1, cutoff=LIMIAR_FUZZY)
+    return indice[parecidos[0]] if parecidos else None
+
+
+@lru_cache(maxsize=2)
+def _assinatura(versao: int) -> str:
+    indice, _ = _indice(versao)
+    return hashlib.sha1(repr(sorted(indice.items())).encode("utf-8")).hexdigest()
+
+
+def assinatura_catalogo() -> str:
+    """Hash das chaves de modelos e aliases (muda junto com o catálogo)."""
+    return _assinatura(_versao)
+
+
+def modelo_id_para(aparelho: str) -> int | None:
+    """Id do modelo em diagnostico_modelos para o texto, ou None."""
+    return _resolver(aparelho or "", _versao)
+
+
+# ======================================================
+# ALIASES
+# ======================================================
+
+def cadastrar_alias(texto: str, modelo_id: int):
+    """Associa um texto (ex.: "a12s") a um modelo do catálogo."""
+    alias = chave_modelo(texto)
+
+    if not alias:
+        raise ValueError("O alias não foi informado.")
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        INSERT INTO aparelho_aliases (alias, modelo_id, created_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT (alias) DO UPDATE SET modelo_id = excluded.modelo_id
+        """,
+        (alias, modelo_id, datetime.utcnow().isoformat()),
+    )
+
+    conn.commit()
+    conn.close()
+
+    invalidar_modelos()
+    reindexar_modelos(apenas_pendentes=False)
+
+
+def listar_aliases():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT a.alias, a.modelo_id, m.fabricante, m.modelo_comercial
+        FROM aparelho_aliases a
+        JOIN diagnostico_modelos m ON m.id = a.modelo_id
+        ORDER BY m.fabricante, m.modelo_comercial, a.alias
+        """
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+
+def excluir_alias(alias: str):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("DELETE FROM aparelho_aliases WHERE alias = ?", (alias,))
+
+    conn.commit()
+    conn.close()
+
+    invalidar_modelos()
+    reindexar_modelos(apenas_pendentes=False)
+
+
+# ======================================================
+# BACKFILL
+# ======================================================
+
+def desvincular_modelo(cur, modelo_id: int):
+    """Zera `modelo_id` das linhas do modelo (antes de excluí-lo)."""
+    for tabela in TABELAS_APARELHO:
+        if _tabela_existe(cur, tabela):
+            cur.execute(
+                f"UPDATE {tabela} SET modelo_id = NULL WHERE modelo_id = ?",
+                (modelo_id,),
+            )
+
+
+def reindexar_modelos(apenas_pendentes: bool = True) -> int:
+    """
+    Resolve `modelo_id` nas tabelas de aparelhos. Por padrão, só as
+    linhas ainda sem modelo; com apenas_pendentes=False, todas
+    (após mudar ou excluir aliases). Retorna quantas linhas mudaram.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    alteradas = 0
+
+    for tabela, coluna in TABELAS_APARELHO.items():
+        if not _tabela_existe(cur, tabela):
+            continue
+
+        filtro = "WHERE modelo_id IS NULL" if apenas_pendentes else ""
+        cur.execute(f"SELECT rowid, {coluna} AS texto, modelo_id FROM {tabela} {filtro}")
+
+        updates = []
+        for row in cur.fetchall():
+            modelo_id = modelo_id_para(row["texto"])
+            if modelo_id != row["modelo_id"]:
+                updates.append((modelo_id, row["rowid"]))
+
+        cur.executemany(
+            f"UPDATE {tabela} SET modelo_id = ? WHERE rowid = ?",
+            updates,
+        )
+        alteradas += len(updates)
+
+    if _tabela_existe(cur, "aparelho_reindexacao"):
+        cur.execute(
+            """
+            INSERT INTO aparelho_reindexacao (id, assinatura, updated_at)
+            VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                assinatura = excluded.assinatura,
+                updated_at = excluded.updated_at
+            """,
+            (assinatura_catalogo(), datetime.utcnow().isoformat()),
+        )
+
+    conn.commit()
+    conn.close()
+
+    return alteradas
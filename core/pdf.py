@@ -0,0 +1,214 @@
+"""
+Recursos compartilhados dos PDFs (OS, extratos de carnê).
+
+Logo e fontes são resolvidos, lidos e decodificados uma única vez por
+processo; cada documento novo só recebe cópias já prontas, em vez de
+decodificar o PNG e interpretar o arquivo TrueType de novo.
+
+Sem fonte UTF-8 disponível, os documentos caem para Helvetica e os
+caracteres fora do Latin-1 são trocados por "?".
+
+As cópias dependem de detalhes internos do fpdf2 (TTFFont, ImageCache):
+a versão está fixada em requirements.txt e tests/test_pdf_base.py
+compara o resultado com o da API pública antes de qualquer atualização.
+"""
+
+import copy
+import io
+from functools import lru_cache
+from pathlib import Path
+
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap
+from fpdf.image_datastructures import ImageCache
+from fpdf.image_parsing import preload_image
+
+from config import BASE_DIR
+
+LOGO_CANDIDATES = [
+    BASE_DIR / "assets" / "logo.png",
+    BASE_DIR / "assets" / "logo.jpg",
+    BASE_DIR / "assets" / "logo.jpeg",
+]
+
+# Pares (regular, negrito) de fontes TrueType com suporte a UTF-8
+FONT_CANDIDATES = [
+    (
+        BASE_DIR / "assets" / "fonts" / "DejaVuSans.ttf",
+        BASE_DIR / "assets" / "fonts" / "DejaVuSans-Bold.ttf",
+    ),
+    (
+        Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+        Path("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ),
+    (
+        Path("C:/Windows/Fonts/arial.ttf"),
+        Path("C:/Windows/Fonts/arialbd.ttf"),
+    ),
+]
+
+FONTE_UTF8 = "BestSans"
+
+# Linhas fixas do cabeçalho da loja, abaixo do título do documento
+ENDERECO_LOJA = [
+    "WhatsApp: (14) 99639-4412",
+    "Rua Duque de Caxias, 135 - Centro",
+    "Ourinhos - SP",
+]
+
+# Após cell/multi_cell, volta para a margem esquerda na linha seguinte
+PROXIMA_LINHA = {"new_x": "LMARGIN", "new_y": "NEXT"}
+
+# =========================================================
+# RECURSOS PRÉ-CARREGADOS
+# =========================================================
+
+@lru_cache(maxsize=1)
+def _logo_bytes() -> bytes | None:
+    """Lê o logo uma única vez por processo."""
+    for logo_path in LOGO_CANDIDATES:
+        if logo_path.exists():
+            return logo_path.read_bytes()
+    return None
+
+
+@lru_cache(maxsize=1)
+def _logo_decodificado() -> tuple | None:
+    """(nome, info, perfis ICC) do logo já decodificado, ou None."""
+    logo = _logo_bytes()
+    if not logo:
+        return None
+
+    cache = ImageCache()
+    try:
+        nome, _, info = preload_image(cache, io.BytesIO(logo))
+    except Exception:
+        return None
+
+    return nome, info, dict(cache.icc_profiles)
+
+
+@lru_cache(maxsize=1)
+def _font_files() -> tuple[str, str] | None:
+    """Primeiro par de fontes UTF-8 disponível (ou None → Helvetica)."""
+    for regular, bold in FONT_CANDIDATES:
+        if regular.exists() and bold.exists():
+            return str(regular), str(bold)
+    return None
+
+
+@lru_cache(maxsize=4)
+def _font_bytes(caminho: str) -> bytes:
+    return Path(caminho).read_bytes()
+
+
+@lru_cache(maxsize=4)
+def _fonte_modelo(caminho: str, estilo: str):
+    """Fonte interpretada (métricas, cmap) uma vez por processo."""
+    pdf = FPDF()
+    pdf.add_font(FONTE_UTF8, estilo, caminho)
+    return pdf.fonts[f"{FONTE_UTF8.lower()}{estilo}"]
+
+
+def init_pdf_worker():
+    """Inicializador de pools de processos: pré-carrega os recursos."""
+    _logo_decodificado()
+
+    fontes = _font_files()
+    if fontes:
+        _fonte_modelo(fontes[0], "")
+        _fonte_modelo(fontes[1], "B")
+
+# =========================================================
+# DOCUMENTO BASE
+# =========================================================
+
+class DocumentoPDF(FPDF):
+    """FPDF com a fonte UTF-8 e o cabeçalho da loja já configurados."""
+
+    def __init__(self):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=12)
+
+        fontes = _font_files()
+        if fontes:
+            self._adicionar_fonte(fontes[0], "")
+            self._adicionar_fonte(fontes[1], "B")
+            self.fonte = FONTE_UTF8
+        else:
+            self.fonte = "Helvetica"
+
+    def _adicionar_fonte(self, caminho: str, estilo: str):
+        """
+        Registra uma cópia da fonte-modelo. Métricas e cmap são
+        compartilhados (só leitura); o TTFont e o mapa de subset são
+        do documento, porque a geração do PDF os altera.
+        """
+        modelo = _fonte_modelo(caminho, estilo)
+
+        if modelo.color_font is not None or modelo.is_cff:
+            self.add_font(FONTE_UTF8, estilo, caminho)
+            return
+
+        fonte = copy.copy(modelo)
+        fonte.i = len(self.fonts) + 1
+        fonte.ttfont = ttLib.TTFont(
+            io.BytesIO(_font_bytes(caminho)),
+            recalcTimestamp=False,
+            lazy=True,
+        )
+        fonte.biggest_size_pt = 0
+        fonte.missing_glyphs = []
+        fonte._hbfont = None
+        fonte.subset = SubsetMap(fonte)
+
+        self.fonts[fonte.fontkey] = fonte
+
+    def texto(self, valor) -> str:
+        """Sem fonte UTF-8, troca caracteres fora do Latin-1."""
+        valor = "" if valor is None else str(valor)
+        if self.fonte == FONTE_UTF8:
+            return valor
+        return valor.encode("latin-1", "replace").decode("latin-1")
+
+    def fonte_padrao(self, estilo: str = "", tamanho: int = 11):
+        self.set_font(self.fonte, estilo, tamanho)
+
+    def linha(self, altura: float, valor, largura: float = 0):
+        """Célula de uma linha; o cursor vai para a margem esquerda."""
+        self.cell(largura, altura, self.texto(valor), **PROXIMA_LINHA)
+
+    def paragrafo(self, altura: float, valor):
+        """Texto com quebra automática; o cursor vai para a margem esquerda."""
+        self.multi_cell(0, altura, self.texto(valor), **PROXIMA_LINHA)
+
+    def logo(self, x: float = 10, y: float = 10, w: float = 40):
+        """Logo a partir da imagem já decodificada no processo."""
+        decodificado = _logo_decodificado()
+        if not decodificado:
+            return
+
+        nome, info, icc_profiles = decodificado
+
+        if nome not in self.image_cache.images:
+            copia = copy.copy(info)
+            copia["i"] = len(self.image_cache.images) + 1
+            copia["usages"] = 0
+            self.image_cache.images[nome] = copia
+            self.image_cache.icc_profiles.update(icc_profiles)
+
+        self.image(nome, x=x, y=y, w=w)
+
+    def cabecalho(self, titulo: str):
+        self.logo()
+
+        self.set_xy(55, 10)
+        self.fonte_padrao("B", 14)
+        self.cell(0, 7, self.texto(titulo), new_x="LEFT", new_y="NEXT")
+
+        self.fonte_padrao("", 10)
+        for linha in ENDERECO_LOJA:
+            self.cell(0, 6, self.texto(linha), new_x="LEFT", new_y="NEXT")
+
+        self.set_x(self.l_margin)
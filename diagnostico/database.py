@@ -2,6 +2,16 @@ import sqlite3
 import json
 from config import DB_PATH
 
+from core.clientes import ensure_cliente_chave_columns, chave_cliente
+from core.modelos import (
+    ensure_aliases_table,
+    ensure_modelo_id_column,
+    modelo_id_para,
+    invalidar_modelos,
+    reindexar_modelos,
+    desvincular_modelo,
+)
+
 
 # ---------------- CONNECTION ----------------
 def get_connection():
@@ -46,6 +56,10 @@ def init_db():
         """
     )
 
+    ensure_aliases_table(cur)
+    ensure_modelo_id_column(cur, "diagnosticos")
+    ensure_cliente_chave_columns(cur, "diagnosticos")
+
     conn.commit()
     conn.close()
 
@@ -72,9 +86,11 @@ def inserir_diagnostico(diagnostico: dict):
             resultado_json,
             laudo_path,
             erro,
+            modelo_id,
+            cliente_chave,
             created_at
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             diagnostico["id"],
@@ -87,6 +103,8 @@ def inserir_diagnostico(diagnostico: dict):
             resultado_json,
             diagnostico.get("laudo_path"),
             diagnostico.get("erro"),
+            modelo_id_para(diagnostico["aparelho"]),
+            chave_cliente(diagnostico["cliente"]),
             diagnostico["created_at"],
         )
     )
@@ -240,6 +258,10 @@ def cadastrar_modelo_aparelho(
     conn.commit()
     conn.close()
 
+    # Novo modelo no catálogo: resolve aparelhos ainda sem modelo
+    invalidar_modelos()
+    reindexar_modelos()
+
     return modelo_id
 
 
@@ -301,11 +323,21 @@ def atualizar_modelo_aparelho(
     conn.commit()
     conn.close()
 
+    invalidar_modelos()
+    reindexar_modelos(apenas_pendentes=False)
+
 
 def excluir_modelo_aparelho(modelo_id: int):
     conn = get_connection()
     cur = conn.cursor()
 
+    desvincular_modelo(cur, modelo_id)
+
+    cur.execute(
+        "DELETE FROM aparelho_aliases WHERE modelo_id = ?",
+        (modelo_id,)
+    )
+
     cur.execute(
         """
         DELETE FROM diagnostico_modelos
@@ -316,4 +348,5 @@ def excluir_modelo_aparelho(modelo_id: int):
 
     conn.commit()
     conn.close()
-    
\ No newline at end of file
+
+    invalidar_modelos()
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from core.jobs import STATUS_ATIVOS, submeter_job, status_job, resultado_job, descartar_job
+from core.jobs_view import acompanhar_job
+
 from diagnostico.database import (
     init_db,
     inserir_diagnostico,
@@ -27,6 +30,82 @@ from diagnostico.view import (
 )
 
 
+# ======================================================
+# EXECUÇÃO EM SEGUNDO PLANO
+# ======================================================
+
+def executar_diagnostico_job(job, tipo, cliente, aparelho, identificacao, observacao):
+    executar = (
+        executar_diagnostico_software
+        if tipo == "software"
+        else executar_diagnostico_hardware
+    )
+
+    diagnostico = executar(
+        cliente=cliente,
+        aparelho=aparelho,
+        identificacao_adb=identificacao,
+        progresso=job.progresso,
+        cancelado=lambda: job.cancelado
+    )
+
+    if observacao:
+        diagnostico["resultado_json"]["observacao_inicial"] = observacao
+
+    if diagnostico["status"] == "concluido":
+        inserir_diagnostico(diagnostico)
+
+    return diagnostico
+
+
+def iniciar_diagnostico(tipo, cliente, aparelho, identificacao, observacao):
+    anterior = st.session_state.get(f"job_diagnostico_{tipo}")
+    if anterior:
+        descartar_job(anterior)
+
+    st.session_state[f"job_diagnostico_{tipo}"] = submeter_job(
+        executar_diagnostico_job,
+        tipo,
+        cliente,
+        aparelho,
+        identificacao,
+        (observacao or "").strip(),
+        tipo=f"diagnostico_{tipo}",
+        modulo="diagnostico",
+        descricao=f"Diagnóstico de {tipo} - {aparelho}",
+    )
+
+
+def acompanhar_diagnostico(tipo):
+    # Diagnóstico terminado (para exibir) ou None enquanto roda / sem job
+    chave = f"job_diagnostico_{tipo}"
+    job_id = st.session_state.get(chave)
+    job = status_job(job_id) if job_id else None
+
+    if not job:
+        return None
+
+    if job["status"] in STATUS_ATIVOS:
+        acompanhar_job(job_id, f"Executando diagnóstico de {tipo} via ADB...")
+        return None
+
+    diagnostico = resultado_job(job_id)
+
+    if job["status"] == "erro":
+        st.error(f"Erro durante o diagnóstico: {job['erro']}")
+    elif job["status"] != "concluido":
+        st.warning(f"Diagnóstico {job['status']}. Nada foi salvo.")
+    elif not diagnostico:
+        st.info("Diagnóstico concluído. Consulte o resultado na aba Histórico.")
+
+    if st.button("Limpar resultado", key=f"limpar_{chave}"):
+        descartar_job(job_id)
+        del st.session_state[chave]
+        st.rerun()
+
+    return diagnostico
+
+
 def app():
     init_db()
 
@@ -69,8 +148,6 @@ def app():
                 type="primary"
             )
 
-        diagnostico_software = None
-
         if executar:
             conexao = verificar_dispositivo_adb()
 
@@ -110,14 +187,13 @@ def app():
                         identificacao["modelo_comercial"] = modelo_comercial
                         identificacao["nome_exibicao"] = nome_aparelho
 
-                        with st.spinner(
-                            "Executando diagnóstico de software via ADB..."
-                        ):
-                            diagnostico_software = executar_diagnostico_software(
-                                cliente=cliente,
-                                aparelho=nome_aparelho,
-                                identificacao_adb=identificacao
-                            )
+                        iniciar_diagnostico(
+                            "software",
+                            cliente,
+                            nome_aparelho,
+                            identificacao,
+                            observacao
+                        )
 
                     else:
                         st.session_state["modelo_pendente_software"] = {
@@ -201,25 +277,13 @@ def app():
                         )
                         identificacao["nome_exibicao"] = nome_aparelho
 
-                        with st.spinner(
-                            "Modelo cadastrado. Executando diagnóstico..."
-                        ):
-                            diagnostico_software = (
-                                executar_diagnostico_software(
-                                    cliente=modelo_pendente["cliente"],
-                                    aparelho=nome_aparelho,
-                                    identificacao_adb=identificacao
-                                )
-                            )
-
-                        observacao_pendente = modelo_pendente[
-                            "observacao"
-                        ].strip()
-
-                        if observacao_pendente:
-                            diagnostico_software["resultado_json"][
-                                "observacao_inicial"
-                            ] = observacao_pendente
+                        iniciar_diagnostico(
+                            "software",
+                            modelo_pendente["cliente"],
+                            nome_aparelho,
+                            identificacao,
+                            modelo_pendente["observacao"]
+                        )
 
                         del st.session_state[
                             "modelo_pendente_software"
@@ -230,15 +294,10 @@ def app():
                             f"Não foi possível cadastrar o modelo: {erro}"
                         )
 
-        if diagnostico_software:
-            if observacao.strip():
-                diagnostico_software["resultado_json"][
-                    "observacao_inicial"
-                ] = observacao.strip()
+        diagnostico_software = acompanhar_diagnostico("software")
 
+        if diagnostico_software:
             if diagnostico_software["status"] == "concluido":
-                inserir_diagnostico(diagnostico_software)
-
                 st.success(
                     "Diagnóstico finalizado e salvo no histórico."
                 )
@@ -289,8 +348,6 @@ def app():
                 type="primary"
             )
 
-        diagnostico_hardware = None
-
         if executar:
             conexao = verificar_dispositivo_adb()
 
@@ -333,16 +390,13 @@ def app():
                         identificacao["modelo_comercial"] = modelo_comercial
                         identificacao["nome_exibicao"] = nome_aparelho
 
-                        with st.spinner(
-                            "Executando diagnóstico de hardware via ADB..."
-                        ):
-                            diagnostico_hardware = (
-                                executar_diagnostico_hardware(
-                                    cliente=cliente,
-                                    aparelho=nome_aparelho,
-                                    identificacao_adb=identificacao
-                                )
-                            )
+                        iniciar_diagnostico(
+                            "hardware",
+                            cliente,
+                            nome_aparelho,
+                            identificacao,
+                            observacao
+                        )
 
                     else:
                         st.session_state["modelo_pendente_hardware"] = {
@@ -426,25 +480,13 @@ def app():
                         )
                         identificacao["nome_exibicao"] = nome_aparelho
 
-                        with st.spinner(
-                            "Modelo cadastrado. Executando diagnóstico..."
-                        ):
-                            diagnostico_hardware = (
-                                executar_diagnostico_hardware(
-                                    cliente=modelo_pendente["cliente"],
-                                    aparelho=nome_aparelho,
-                                    identificacao_adb=identificacao
-                                )
-                            )
-
-                        observacao_pendente = modelo_pendente[
-                            "observacao"
-                        ].strip()
-
-                        if observacao_pendente:
-                            diagnostico_hardware["resultado_json"][
-                                "observacao_inicial"
-                            ] = observacao_pendente
+                        iniciar_diagnostico(
+                            "hardware",
+                            modelo_pendente["cliente"],
+                            nome_aparelho,
+                            identificacao,
+                            modelo_pendente["observacao"]
+                        )
 
                         del st.session_state[
                             "modelo_pendente_hardware"
@@ -455,15 +497,10 @@ def app():
                             f"Não foi possível cadastrar o modelo: {erro}"
                         )
 
-        if diagnostico_hardware:
-            if observacao.strip():
-                diagnostico_hardware["resultado_json"][
-                    "observacao_inicial"
-                ] = observacao.strip()
+        diagnostico_hardware = acompanhar_diagnostico("hardware")
 
+        if diagnostico_hardware:
             if diagnostico_hardware["status"] == "concluido":
-                inserir_diagnostico(diagnostico_hardware)
-
                 st.success(
                     "Diagnóstico finalizado e salvo no histórico."
                 )
@@ -1,5 +1,6 @@
 import re
 import subprocess
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime
@@ -16,6 +17,9 @@ ADB_TIMEOUT_CURTO = 15
 ADB_TIMEOUT_MEDIO = 45
 ADB_TIMEOUT_LONGO = 90
 
+# Intervalo (s) entre verificações de cancelamento durante um comando
+CANCELAMENTO_INTERVALO = 0.5
+
 DIAGNOSTICO_LAUDOS_DIR = LAUDOS_DIR / "diagnostico"
 SOFTWARE_LAUDOS_DIR = DIAGNOSTICO_LAUDOS_DIR / "software"
 HARDWARE_LAUDOS_DIR = DIAGNOSTICO_LAUDOS_DIR / "hardware"
@@ -126,31 +130,57 @@ def get_adb_path():
     return "adb"
 
 
-def executar_comando(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO):
+def executar_comando(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO, cancelado=None):
+    """
+    cancelado(), se informado, é consultado a cada
+    CANCELAMENTO_INTERVALO segundos enquanto o comando roda; se
+    retornar True, o processo é encerrado sem esperar o timeout.
+    """
     try:
-        resultado = subprocess.run(
+        processo = subprocess.Popen(
             args,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
             encoding="utf-8",
             errors="replace",
-            timeout=timeout,
             creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, "CREATE_NO_WINDOW") else 0
         )
 
-        return {
-            "ok": resultado.returncode == 0,
-            "stdout": resultado.stdout or "",
-            "stderr": resultado.stderr or "",
-            "returncode": resultado.returncode,
-        }
+        limite = time.monotonic() + timeout
+        intervalo = CANCELAMENTO_INTERVALO if cancelado else timeout
+
+        while True:
+            try:
+                stdout, stderr = processo.communicate(
+                    timeout=max(0, min(intervalo, limite - time.monotonic()))
+                )
+                break
+            except subprocess.TimeoutExpired:
+                interrompido = cancelado is not None and cancelado()
+
+                if not interrompido and time.monotonic() < limite:
+                    continue
+
+                processo.kill()
+                processo.communicate()
+
+                return {
+                    "ok": False,
+                    "stdout": "",
+                    "stderr": (
+                        f"Comando cancelado: {' '.join(args)}"
+                        if interrompido
+                        else f"Tempo limite excedido ao executar: {' '.join(args)}"
+                    ),
+                    "returncode": -1,
+                }
 
-    except subprocess.TimeoutExpired:
         return {
-            "ok": False,
-            "stdout": "",
-            "stderr": f"Tempo limite excedido ao executar: {' '.join(args)}",
-            "returncode": -1,
+            "ok": processo.returncode == 0,
+            "stdout": stdout or "",
+            "stderr": stderr or "",
+            "returncode": processo.returncode,
         }
 
     except Exception as e:
@@ -162,12 +192,12 @@ def executar_comando(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO):
         }
 
 
-def adb(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO):
-    return executar_comando([get_adb_path()] + args, timeout=timeout)
+def adb(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO, cancelado=None):
+    return executar_comando([get_adb_path()] + args, timeout=timeout, cancelado=cancelado)
 
 
-def adb_shell(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO):
-    return adb(["shell"] + args, timeout=timeout)
+def adb_shell(args: list[str], timeout: int = ADB_TIMEOUT_MEDIO, cancelado=None):
+    return adb(["shell"] + args, timeout=timeout, cancelado=cancelado)
 
 
 # ======================================================
@@ -464,7 +494,7 @@ def salvar_laudo(tipo: str, cliente: str, linhas: list[str]):
     return str(path)
 
 
-def coletar_laudo_software(cliente: str, aparelho: str):
+def coletar_laudo_software(cliente: str, aparelho: str, progresso=None, cancelado=None):
     linhas = montar_cabecalho_laudo(
         "LAUDO TECNICO DE SEGURANCA DO CELULAR",
         cliente,
@@ -499,8 +529,11 @@ def coletar_laudo_software(cliente: str, aparelho: str):
         ),
     ]
 
-    for titulo, comando, timeout in comandos:
-        resultado = adb_shell(comando, timeout=timeout)
+    for etapa, (titulo, comando, timeout) in enumerate(comandos):
+        if progresso:
+            progresso(etapa, len(comandos), titulo.split(". ", 1)[-1].capitalize())
+
+        resultado = adb_shell(comando, timeout=timeout, cancelado=cancelado)
         conteudo = resultado["stdout"]
 
         if resultado["stderr"].strip():
@@ -508,6 +541,10 @@ def coletar_laudo_software(cliente: str, aparelho: str):
 
         adicionar_secao(linhas, titulo, conteudo)
 
+    # Cancelado no último comando: para antes de gravar o laudo
+    if progresso:
+        progresso(len(comandos), len(comandos), "Gerando laudo")
+
     linhas.extend([
         "=======================================================",
         "FIM DO RELATORIO - ASSISTENCIA TECNICA",
@@ -522,7 +559,7 @@ def coletar_laudo_software(cliente: str, aparelho: str):
     }
 
 
-def coletar_laudo_hardware(cliente: str, aparelho: str):
+def coletar_laudo_hardware(cliente: str, aparelho: str, progresso=None, cancelado=None):
     linhas = montar_cabecalho_laudo(
         "LAUDO TECNICO DE HARDWARE E PLACA",
         cliente,
@@ -562,8 +599,11 @@ def coletar_laudo_hardware(cliente: str, aparelho: str):
         ),
     ]
 
-    for titulo, comando, timeout in comandos:
-        resultado = adb_shell(comando, timeout=timeout)
+    for etapa, (titulo, comando, timeout) in enumerate(comandos):
+        if progresso:
+            progresso(etapa, len(comandos), titulo.split(". ", 1)[-1].capitalize())
+
+        resultado = adb_shell(comando, timeout=timeout, cancelado=cancelado)
         conteudo = resultado["stdout"]
 
         if resultado["stderr"].strip():
@@ -571,6 +611,10 @@ def coletar_laudo_hardware(cliente: str, aparelho: str):
 
         adicionar_secao(linhas, titulo, conteudo)
 
+    # Cancelado no último comando: para antes de gravar o laudo
+    if progresso:
+        progresso(len(comandos), len(comandos), "Gerando laudo")
+
     linhas.extend([
         "=======================================================",
         "FIM DO RELATORIO - ASSISTENCIA TECNICA",
@@ -1155,8 +1199,15 @@ def analisar_hardware(raw_text: str):
 def executar_diagnostico_software(
     cliente: str,
     aparelho: str,
-    identificacao_adb: dict | None = None
+    identificacao_adb: dict | None = None,
+    progresso=None,
+    cancelado=None
 ):
+    """
+    progresso(etapa, total, descricao), se informado, é chamado antes
+    de cada comando ADB (usado pelo job em segundo plano); cancelado()
+    encerra o comando em andamento (ver executar_comando).
+    """
     cliente = cliente.strip() or "Não informado"
     aparelho = aparelho.strip()
 
@@ -1187,7 +1238,7 @@ def executar_diagnostico_software(
     if not aparelho:
         aparelho = montar_nome_aparelho(identificacao)
 
-    coleta = coletar_laudo_software(cliente, aparelho)
+    coleta = coletar_laudo_software(cliente, aparelho, progresso, cancelado)
     analise = analisar_software(coleta["raw_text"])
 
     analise["identificacao_adb"] = identificacao
@@ -1209,8 +1260,15 @@ def executar_diagnostico_software(
 def executar_diagnostico_hardware(
     cliente: str,
     aparelho: str,
-    identificacao_adb: dict | None = None
+    identificacao_adb: dict | None = None,
+    progresso=None,
+    cancelado=None
 ):
+    """
+    progresso(etapa, total, descricao), se informado, é chamado antes
+    de cada comando ADB (usado pelo job em segundo plano); cancelado()
+    encerra o comando em andamento (ver executar_comando).
+    """
     cliente = cliente.strip() or "Não informado"
     aparelho = aparelho.strip()
 
@@ -1241,7 +1299,7 @@ def executar_diagnostico_hardware(
     if not aparelho:
         aparelho = montar_nome_aparelho(identificacao)
 
-    coleta = coletar_laudo_hardware(cliente, aparelho)
+    coleta = coletar_laudo_hardware(cliente, aparelho, progresso, cancelado)
     analise = analisar_hardware(coleta["raw_text"])
 
     analise["identificacao_adb"] = identificacao
@@ -3,6 +3,8 @@ import json
 from datetime import datetime
 from config import DB_PATH
 
+from core.modelos import ensure_modelo_id_column, modelo_id_para
+
 def get_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
@@ -60,6 +62,9 @@ def init_db():
         )
     """)
     
+    # Peças por modelo normalizado (disponibilidade na OS)
+    ensure_modelo_id_column(cur, "estoque_pecas")
+    
     conn.commit()
     conn.close()
 
@@ -70,12 +75,13 @@ def inserir_peca(peca):
     
     cur.execute("""
         INSERT INTO estoque_pecas 
-        (id, descricao, modelo, quantidade, observacoes, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        (id, descricao, modelo, modelo_id, quantidade, observacoes, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         peca['id'],
         peca['descricao'],
         peca.get('modelo'),
+        modelo_id_para(peca.get('modelo')),
         peca.get('quantidade', 0),
         peca.get('observacoes'),
         peca['created_at'],
@@ -103,27 +109,59 @@ def buscar_peca_por_id(peca_id):
     conn.close()
     return dict(peca) if peca else None
 
-def atualizar_peca(peca_id, descricao, modelo, quantidade, observacoes):
+def atualizar_peca(peca_id, descricao, modelo, quantidade, observacoes, expected_updated_at=None):
+    """
+    Atualiza a peça. Com expected_updated_at, grava apenas se ela não
+    mudou desde a leitura: uma reserva de OS no meio da edição baixa a
+    quantidade, e regravar o valor lido desfaria a baixa.
+    Retorna o novo updated_at, ou None se nada foi gravado.
+    """
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("""
+    now = datetime.utcnow().isoformat()
+    params = [descricao, modelo, modelo_id_para(modelo), quantidade, observacoes, now, peca_id]
+    
+    where = "id = ?"
+    if expected_updated_at is not None:
+        where += " AND updated_at = ?"
+        params.append(expected_updated_at)
+    
+    cur.execute(f"""
         UPDATE estoque_pecas 
-        SET descricao = ?, modelo = ?, quantidade = ?, observacoes = ?, updated_at = ?
-        WHERE id = ?
-    """, (descricao, modelo, quantidade, observacoes, datetime.utcnow().isoformat(), peca_id))
+        SET descricao = ?, modelo = ?, modelo_id = ?, quantidade = ?, observacoes = ?, updated_at = ?
+        WHERE {where}
+    """, params)
+    gravado = cur.rowcount > 0
     
     conn.commit()
     conn.close()
+    
+    return now if gravado else None
 
 def excluir_peca(peca_id):
+    """
+    Exclui a peça, exceto se houver reserva em aberto em alguma OS
+    (os_reservas_pecas): a quantidade reservada ainda é desta peça.
+    Retorna True se excluiu.
+    """
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("DELETE FROM estoque_pecas WHERE id = ?", (peca_id,))
+    cur.execute("""
+        DELETE FROM estoque_pecas
+        WHERE id = ?
+          AND NOT EXISTS (
+              SELECT 1 FROM os_reservas_pecas
+              WHERE peca_id = ? AND status = 'reservada'
+          )
+    """, (peca_id, peca_id))
+    excluida = cur.rowcount > 0
     
     conn.commit()
     conn.close()
+    
+    return excluida
 
 # Funções para Capas
 def inserir_capa(capa):
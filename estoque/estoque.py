@@ -137,6 +137,12 @@ def app():
                 peca = buscar_peca_por_id(peca_id)
                 
                 if peca:
+                    # Versão mostrada na execução anterior: é a que o
+                    # usuário via ao clicar em salvar
+                    chave_versao = f"estoque_peca_versao_{peca_id}"
+                    versao_lida = st.session_state.get(chave_versao, peca['updated_at'])
+                    st.session_state[chave_versao] = peca['updated_at']
+                    
                     with st.form("editar_peca_form"):
                         col1, col2 = st.columns(2)
                         
@@ -147,14 +153,24 @@ def app():
                         
                         col3, col4 = st.columns(2)
                         if col3.form_submit_button("💾 Salvar Alterações"):
-                            atualizar_peca(peca_id, nova_descricao, novo_modelo, nova_quantidade, novas_observacoes)
-                            st.success("Peça atualizada com sucesso!")
-                            st.rerun()
+                            if atualizar_peca(
+                                peca_id, nova_descricao, novo_modelo, nova_quantidade, novas_observacoes,
+                                expected_updated_at=versao_lida
+                            ):
+                                st.success("Peça atualizada com sucesso!")
+                                st.rerun()
+                            else:
+                                st.error(
+                                    "⚠️ Esta peça foi alterada (ex.: reserva em uma OS) enquanto você editava. "
+                                    "Confira a quantidade atual na lista abaixo e salve novamente."
+                                )
                             
                         if col4.form_submit_button("🗑️ Excluir Peça"):
-                            excluir_peca(peca_id)
-                            st.success("Peça excluída com sucesso!")
-                            st.rerun()
+                            if excluir_peca(peca_id):
+                                st.success("Peça excluída com sucesso!")
+                                st.rerun()
+                            else:
+                                st.error("Esta peça está reservada em uma OS. Libere ou consuma a reserva antes de excluir.")
         
         # Filtro local para peças
         st.subheader("Filtrar Peças")
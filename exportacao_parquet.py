@@ -0,0 +1,422 @@
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import DB_PATH, SNAPSHOT_DIR
+
+
+# Tamanho de cada lote lido com fetchmany
+TAMANHO_LOTE = 10_000
+
+ARQUIVO_ESTADO = "_estado.json"
+
+# Chave do estado com o último seq de vendas_events já processado
+ESTADO_EVENTOS = "_eventos_seq"
+
+# Coluna que marca quando a linha entrou na tabela.
+# Ela define a partição (ano/mês) e o corte incremental.
+TABELAS_SNAPSHOT = {
+    "sales": "created_at",
+    "sales_archive": "archived_at",
+    "sales_closed": "closed_at",
+    "parcels": "created_at",
+    "parcel_adjustments": "created_at",
+}
+
+# Coluna acrescentada a cada linha: corte da exportação que a gravou
+COLUNA_EXPORTACAO = "exportado_em"
+
+# Revisões: vendas alteradas ou removidas depois de exportadas
+TABELA_REVISOES = "_revisoes"
+
+# Eventos de vendas_events que alteram ou removem linhas já gravadas
+# (inserções chegam pelo corte incremental de cada tabela)
+EVENTOS_REVISAO = (
+    "adjustments_deleted",
+    "sale_archived",
+    "sale_deleted",
+    "sale_closed",
+    "closed_sale_recovered",
+    "closed_sale_deleted",
+)
+
+# Como cada tabela chega ao id da venda (na releitura das revisadas)
+FILTRO_VENDA = {
+    "sales": "id IN (SELECT value FROM json_each(:vendas))",
+    "sales_archive": "id IN (SELECT value FROM json_each(:vendas))",
+    "sales_closed": "id IN (SELECT value FROM json_each(:vendas))",
+    "parcels": "sale_id IN (SELECT value FROM json_each(:vendas))",
+    "parcel_adjustments": """parcel_id IN (
+        SELECT id FROM parcels
+        WHERE sale_id IN (SELECT value FROM json_each(:vendas))
+    )""",
+}
+
+SCHEMA_REVISOES = pa.schema([
+    ("sale_id", pa.string()),
+    ("tipo", pa.string()),
+    ("revisado_em", pa.string()),
+])
+
+TIPOS_ARROW = {
+    "TEXT": pa.string(),
+    "REAL": pa.float64(),
+    "INTEGER": pa.int64(),
+}
+
+
+def conectar_somente_leitura(path: Path):
+    conexao = sqlite3.connect(
+        f"file:{path.as_posix()}?mode=ro",
+        uri=True
+    )
+    conexao.execute("PRAGMA query_only = ON")
+    return conexao
+
+
+def obter_schema(conexao, tabela: str):
+    colunas = conexao.execute(
+        f'PRAGMA table_info("{tabela}")'
+    ).fetchall()
+
+    return pa.schema([
+        (coluna[1], TIPOS_ARROW.get((coluna[2] or "").upper(), pa.string()))
+        for coluna in colunas
+    ] + [
+        (COLUNA_EXPORTACAO, pa.string())
+    ])
+
+
+def carregar_estado(destino: Path):
+    caminho = destino / ARQUIVO_ESTADO
+
+    if not caminho.exists():
+        return {}
+
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def salvar_estado(destino: Path, estado: dict):
+    caminho = destino / ARQUIVO_ESTADO
+    temporario = caminho.with_suffix(".tmp")
+
+    temporario.write_text(
+        json.dumps(estado, indent=2, ensure_ascii=False),
+        encoding="utf-8"
+    )
+    temporario.replace(caminho)
+
+
+def _colunas_sql(schema) -> str:
+    """Colunas da tabela de origem, mais o corte da exportação."""
+    colunas = [
+        f'"{nome}"' for nome in schema.names if nome != COLUNA_EXPORTACAO
+    ]
+    return ", ".join(colunas + [f":corte AS {COLUNA_EXPORTACAO}"])
+
+
+def montar_consulta(tabela: str, coluna: str, schema):
+    """
+    Seleciona as linhas que entraram na tabela na janela (desde, corte].
+
+    Em parcel_adjustments a entrada é gravada com a data da venda
+    (retroativa), então os ajustes de parcelas criadas na janela
+    também entram, mesmo com created_at anterior ao último corte.
+    """
+    colunas_sql = _colunas_sql(schema)
+
+    filtro = f'("{coluna}" > :desde AND "{coluna}" <= :corte)'
+
+    if tabela == "parcel_adjustments":
+        filtro += """
+            OR parcel_id IN (
+                SELECT id FROM parcels
+                WHERE created_at > :desde AND created_at <= :corte
+            )
+        """
+
+    return f"""
+        SELECT {colunas_sql}
+        FROM "{tabela}"
+        WHERE {filtro}
+        ORDER BY "{coluna}"
+    """
+
+
+def escrever_particoes(destino: Path, tabela: str, coluna: str, schema, linhas, sufixo: str):
+    """Agrupa um lote por ano/mês e grava um arquivo por partição."""
+    particoes = {}
+    indice_coluna = schema.names.index(coluna)
+
+    for linha in linhas:
+        valor = linha[indice_coluna] or ""
+        chave = (valor[:4] or "0000", valor[5:7] or "00")
+        particoes.setdefault(chave, []).append(linha)
+
+    for (ano, mes), registros in particoes.items():
+        pasta = destino / tabela / f"ano={ano}" / f"mes={mes}"
+        pasta.mkdir(parents=True, exist_ok=True)
+
+        colunas = list(zip(*registros))
+        tabela_arrow = pa.Table.from_arrays(
+            [
+                pa.array(valores, type=campo.type)
+                for valores, campo in zip(colunas, schema)
+            ],
+            schema=schema
+        )
+
+        pq.write_table(tabela_arrow, pasta / f"part-{sufixo}.parquet")
+
+
+def montar_consulta_revisao(tabela: str, coluna: str, schema):
+    """Estado atual das linhas ligadas às vendas revisadas."""
+    return f"""
+        SELECT {_colunas_sql(schema)}
+        FROM "{tabela}"
+        WHERE {FILTRO_VENDA[tabela]}
+        ORDER BY "{coluna}"
+    """
+
+
+def gravar_consulta(conexao, destino: Path, tabela: str, coluna: str, schema, consulta: str, params: dict, sufixo: str):
+    cursor = conexao.execute(consulta, params)
+
+    total = 0
+    lote_num = 0
+
+    while True:
+        linhas = cursor.fetchmany(TAMANHO_LOTE)
+
+        if not linhas:
+            break
+
+        escrever_particoes(
+            destino,
+            tabela,
+            coluna,
+            schema,
+            linhas,
+            sufixo=f"{sufixo}-{lote_num:04d}"
+        )
+
+        total += len(linhas)
+        lote_num += 1
+
+    return total
+
+
+def _carimbo(corte: str) -> str:
+    return corte.replace(":", "").replace("-", "").replace(".", "")
+
+
+def exportar_tabela(conexao, destino: Path, tabela: str, desde: str, corte: str):
+    coluna = TABELAS_SNAPSHOT[tabela]
+    schema = obter_schema(conexao, tabela)
+
+    return gravar_consulta(
+        conexao,
+        destino,
+        tabela,
+        coluna,
+        schema,
+        montar_consulta(tabela, coluna, schema),
+        {"desde": desde, "corte": corte},
+        sufixo=_carimbo(corte),
+    )
+
+
+def vendas_revisadas(conexao, desde_seq: int, ate_seq: int) -> dict:
+    """
+    sale_id -> último tipo de evento que alterou ou removeu linhas da
+    venda entre os seqs (desde_seq, ate_seq].
+    """
+    cursor = conexao.execute(
+        f"""
+        SELECT sale_id, tipo
+        FROM vendas_events
+        WHERE seq > ? AND seq <= ?
+          AND tipo IN ({", ".join("?" for _ in EVENTOS_REVISAO)})
+        ORDER BY seq
+        """,
+        (desde_seq, ate_seq, *EVENTOS_REVISAO),
+    )
+    return dict(cursor.fetchall())
+
+
+def exportar_revisoes(conexao, destino: Path, revisadas: dict, corte: str) -> int:
+    """
+    Regrava o estado atual de todas as linhas das vendas revisadas e
+    registra as revisões em _revisoes. Na leitura, as linhas dessas
+    vendas exportadas antes de revisado_em deixam de valer (ver
+    ler_tabela_atual).
+    """
+    if not revisadas:
+        return 0
+
+    sufixo = f"{_carimbo(corte)}-rev"
+    params = {"vendas": json.dumps(list(revisadas)), "corte": corte}
+
+    for tabela, coluna in TABELAS_SNAPSHOT.items():
+        schema = obter_schema(conexao, tabela)
+        gravar_consulta(
+            conexao,
+            destino,
+            tabela,
+            coluna,
+            schema,
+            montar_consulta_revisao(tabela, coluna, schema),
+            params,
+            sufixo=sufixo,
+        )
+
+    escrever_particoes(
+        destino,
+        TABELA_REVISOES,
+        "revisado_em",
+        SCHEMA_REVISOES,
+        [(sale_id, tipo, corte) for sale_id, tipo in revisadas.items()],
+        sufixo=sufixo,
+    )
+
+    return len(revisadas)
+
+
+def exportar_snapshot(destino: Path = SNAPSHOT_DIR):
+    """
+    Exporta de forma incremental as tabelas de vendas para Parquet,
+    particionado em <tabela>/ano=AAAA/mes=MM.
+
+    Cada rodada grava as linhas novas de cada tabela (corte por data)
+    e, a partir de vendas_events, regrava as vendas alteradas ou
+    removidas desde a rodada anterior (encerramentos, exclusões,
+    ajustes removidos, valor recuperado), registrando-as em _revisoes.
+    Os arquivos nunca são reescritos: use ler_tabela_atual para obter
+    o estado vigente de uma tabela.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+
+    estado = carregar_estado(destino)
+
+    # Corte fixo da execução: linhas gravadas durante a exportação
+    # ficam para a próxima rodada
+    corte = datetime.utcnow().isoformat()
+
+    conexao = conectar_somente_leitura(DB_PATH)
+
+    try:
+        # Uma única leitura consistente: eventos e linhas da mesma versão
+        conexao.execute("BEGIN")
+
+        ate_seq = conexao.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM vendas_events"
+        ).fetchone()[0]
+
+        for tabela in TABELAS_SNAPSHOT:
+            desde = estado.get(tabela, "")
+
+            quantidade = exportar_tabela(
+                conexao,
+                destino,
+                tabela,
+                desde,
+                corte
+            )
+
+            print(f"{tabela}: {quantidade} registro(s) exportado(s)")
+
+        # Primeira exportação já parte do estado atual: nada a revisar
+        if estado:
+            revisadas = vendas_revisadas(conexao, estado.get(ESTADO_EVENTOS, 0), ate_seq)
+            quantidade = exportar_revisoes(conexao, destino, revisadas, corte)
+            print(f"{TABELA_REVISOES}: {quantidade} venda(s) revisada(s)")
+
+        for tabela in TABELAS_SNAPSHOT:
+            estado[tabela] = corte
+        estado[ESTADO_EVENTOS] = ate_seq
+        salvar_estado(destino, estado)
+
+    finally:
+        conexao.close()
+
+    return estado
+
+
+def _ler_dataset(destino: Path, tabela: str) -> list[dict]:
+    pasta = Path(destino) / tabela
+    if not pasta.exists():
+        return []
+
+    arquivos = sorted(pasta.rglob("*.parquet"))
+    return [
+        linha
+        for arquivo in arquivos
+        for linha in pq.read_table(arquivo).to_pylist()
+    ]
+
+
+def ler_tabela_atual(destino: Path, tabela: str) -> list[dict]:
+    """
+    Estado vigente de uma tabela do snapshot: para cada id fica a
+    gravação mais recente, e linhas de vendas revisadas depois de
+    exportadas (removidas ou alteradas) são descartadas.
+    """
+    revisoes = {}
+    for r in _ler_dataset(destino, TABELA_REVISOES):
+        revisoes[r["sale_id"]] = max(r["revisado_em"], revisoes.get(r["sale_id"], ""))
+
+    venda_da_parcela = {}
+    if tabela == "parcel_adjustments":
+        venda_da_parcela = {
+            p["id"]: p["sale_id"] for p in _ler_dataset(destino, "parcels")
+        }
+
+    def venda(linha):
+        if tabela == "parcels":
+            return linha["sale_id"]
+        if tabela == "parcel_adjustments":
+            return venda_da_parcela.get(linha["parcel_id"])
+        return linha["id"]
+
+    atuais = {}
+    for linha in _ler_dataset(destino, tabela):
+        exportado_em = linha.get(COLUNA_EXPORTACAO) or ""
+
+        if exportado_em < revisoes.get(venda(linha), ""):
+            continue
+
+        anterior = atuais.get(linha["id"])
+        if anterior is None or exportado_em >= (anterior.get(COLUNA_EXPORTACAO) or ""):
+            atuais[linha["id"]] = linha
+
+    return list(atuais.values())
+
+
+def main():
+    destino = Path(sys.argv[1]) if len(sys.argv) > 1 else SNAPSHOT_DIR
+
+    if not DB_PATH.exists():
+        raise FileNotFoundError(
+            f"Banco não encontrado:\n{DB_PATH}"
+        )
+
+    print("BANCO DE ORIGEM:")
+    print(DB_PATH)
+
+    print("\nDESTINO DO SNAPSHOT:")
+    print(destino)
+    print()
+
+    exportar_snapshot(destino)
+
+    print("\nExportação concluída.")
+
+
+if __name__ == "__main__":
+    main()
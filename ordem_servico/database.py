@@ -1,8 +1,18 @@
+import re
 import sqlite3
+import threading
+from collections import OrderedDict
 from config import DB_PATH
 from datetime import datetime
+from functools import lru_cache
 import uuid
 
+from core.clientes import ensure_cliente_chave_columns, chave_cliente, chave_fone
+from core.dates import SQLITE_UTC_PARA_LOCAL, hoje_local
+from core.modelos import ensure_modelo_id_column, modelo_id_para
+
+from .utils import marca_aparelho, SLA_STATUS
+
 # ---------------- CONNECTION ----------------
 def get_connection():
     conn = sqlite3.connect(DB_PATH)
@@ -10,6 +20,33 @@ def get_connection():
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
+# ---------------- VERSÃO DOS DADOS ----------------
+# Incrementada a cada gravação neste processo; serve de chave para
+# caches de leitura (ex.: SLA), que expiram sozinhos após mudanças
+_geracao = 0
+
+def _registrar_alteracao():
+    global _geracao
+    _geracao += 1
+
+def versao_dados() -> int:
+    return _geracao
+
+# ---------------- CACHE DE DETALHES ----------------
+# OS e histórico de status por (order_id, updated_at): toda mudança de
+# status ou campo grava um novo updated_at, então uma entrada nunca
+# fica velha; as gravações descartam as entradas da OS mesmo assim
+DETALHE_CACHE_MAX = 256
+
+_detalhe_cache = OrderedDict()
+_detalhe_cache_lock = threading.Lock()
+
+def _invalidar_detalhe(order_ids):
+    ids = set(order_ids)
+    with _detalhe_cache_lock:
+        for key in [k for k in _detalhe_cache if k[0] in ids]:
+            del _detalhe_cache[key]
+
 # ---------------- INIT DATABASE ----------------
 def init_db():
     conn = get_connection()
@@ -105,26 +142,682 @@ def init_db():
         """
     )
 
+    # Histórico das OS arquivadas (movido de order_status_history)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS os_arquivadas_history (
+            id TEXT PRIMARY KEY,
+
+            order_id TEXT NOT NULL,
+
+            from_status TEXT,
+            to_status TEXT NOT NULL,
+
+            note TEXT,
+
+            changed_at TEXT NOT NULL,
+
+            FOREIGN KEY (order_id)
+            REFERENCES os_arquivadas(id)
+            ON DELETE CASCADE
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_arquivadas_history_order
+        ON os_arquivadas_history (order_id, changed_at)
+        """
+    )
+
+    # Sequência dos números de OS (incrementada junto com o INSERT)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS os_sequence (
+            nome TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        );
+        """
+    )
+
+    # Peças de estoque reservadas para a OS. Sem FK em order_id:
+    # consumos sobrevivem ao arquivamento
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS os_reservas_pecas (
+            id TEXT PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            peca_id TEXT NOT NULL,
+            quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+            status TEXT NOT NULL,           -- reservada | consumida | liberada
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (peca_id) REFERENCES estoque_pecas(id)
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_reservas_order
+        ON os_reservas_pecas (order_id, created_at)
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_reservas_peca
+        ON os_reservas_pecas (peca_id, status)
+        """
+    )
+
+    ensure_modelo_id_column(cur, "service_orders")
+    ensure_modelo_id_column(cur, "os_arquivadas")
+    ensure_cliente_chave_columns(cur, "service_orders")
+    ensure_cliente_chave_columns(cur, "os_arquivadas")
+
+    ensure_os_sequence(cur)
+    ensure_os_search_index(cur)
+    ensure_os_turnaround(cur)
+    ensure_os_diario(cur)
+    ensure_entregas_arquivadas(cur)
+
+    # Navegação paginada das arquivadas (keyset por arquivada_em)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_arquivadas_arquivada_em
+        ON os_arquivadas (arquivada_em, id)
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_arquivadas_status
+        ON os_arquivadas (status, arquivada_em, id)
+        """
+    )
+
+    # Histórico por OS (última transição / linha do tempo)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_order_status_history_order
+        ON order_status_history (order_id, changed_at)
+        """
+    )
+
+    # Quadro kanban: leitura única ordenada por (status, created_at)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_service_orders_status_created
+        ON service_orders (status, created_at)
+        """
+    )
+
+    # Relatório de entregues: faixa em delivered_at (ativas + arquivadas)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_service_orders_status_delivered
+        ON service_orders (status, delivered_at)
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_arquivadas_delivered
+        ON os_arquivadas (delivered_at)
+        """
+    )
+
+    conn.commit()
+    conn.close()
+
+# ---------------- SEQUÊNCIA NÚMERO OS ----------------
+SEQUENCIA_OS = "numero_os"
+
+def format_os_number(numero: int) -> str:
+    return f"OS-{numero:04d}"
+
+def ensure_os_sequence(cur):
+    """
+    Backfill único da sequência a partir do maior número já usado
+    (ativas + arquivadas) e criação do índice único em numero_os.
+    Números repetidos pelo gerador antigo (COUNT(*)) são renumerados
+    antes de criar o índice, mantendo a OS mais antiga de cada número.
+    """
+    cur.execute(
+        "SELECT 1 FROM os_sequence WHERE nome = ?",
+        (SEQUENCIA_OS,),
+    )
+    if cur.fetchone():
+        return
+
+    cur.execute(
+        """
+        INSERT INTO os_sequence (nome, valor)
+        SELECT ?, COALESCE(MAX(numero), 0)
+        FROM (
+            SELECT CAST(SUBSTR(numero_os, 4) AS INTEGER) AS numero
+            FROM service_orders
+            WHERE numero_os LIKE 'OS-%'
+            UNION ALL
+            SELECT CAST(SUBSTR(numero_os, 4) AS INTEGER) AS numero
+            FROM os_arquivadas
+            WHERE numero_os LIKE 'OS-%'
+        )
+        """,
+        (SEQUENCIA_OS,),
+    )
+
+    cur.execute(
+        """
+        SELECT id, numero_os
+        FROM service_orders
+        WHERE numero_os IN (
+            SELECT numero_os
+            FROM service_orders
+            GROUP BY numero_os
+            HAVING COUNT(*) > 1
+        )
+        ORDER BY numero_os, created_at
+        """
+    )
+
+    vistos = set()
+    for row in cur.fetchall():
+        if row["numero_os"] not in vistos:
+            vistos.add(row["numero_os"])
+            continue
+
+        cur.execute(
+            "UPDATE service_orders SET numero_os = ? WHERE id = ?",
+            (next_os_number(cur), row["id"]),
+        )
+
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_service_orders_numero_os
+        ON service_orders (numero_os)
+        """
+    )
+
+def next_os_number(cur) -> str:
+    """
+    Reserva o próximo número dentro da transação do cursor.
+    O UPDATE trava o banco para escrita até o commit, então dois
+    cadastros simultâneos nunca recebem o mesmo número.
+    """
+    cur.execute(
+        "UPDATE os_sequence SET valor = valor + 1 WHERE nome = ?",
+        (SEQUENCIA_OS,),
+    )
+    cur.execute(
+        "SELECT valor FROM os_sequence WHERE nome = ?",
+        (SEQUENCIA_OS,),
+    )
+    return format_os_number(cur.fetchone()["valor"])
+
+# ---------------- ÍNDICE DE BUSCA (FTS5) ----------------
+# Colunas indexadas e peso de cada uma no ranking (bm25)
+COLUNAS_BUSCA = [
+    ("numero_os", 10.0),
+    ("nome", 5.0),
+    ("aparelho", 5.0),
+    ("detalhes_servico", 1.0),
+    ("servico_realizado", 1.0),
+    ("observacoes", 1.0),
+]
+
+# Tabela de origem -> índice FTS
+INDICES_BUSCA = {
+    "service_orders": "os_busca_ativas",
+    "os_arquivadas": "os_busca_arquivadas",
+}
+
+def ensure_os_search_index(cur):
+    """
+    Cria os índices FTS5 (external content) de OS ativas e arquivadas
+    e os triggers que os mantêm em sincronia com as tabelas.
+
+    O índice aponta para o rowid implícito das tabelas, que um VACUUM
+    pode renumerar: índices fora de sincronia são reconstruídos aqui
+    (ver _indice_busca_desatualizado), a cada inicialização.
+    """
+    colunas = [nome for nome, _ in COLUNAS_BUSCA]
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{c}" for c in colunas)
+    antigos = ", ".join(f"old.{c}" for c in colunas)
+
+    for tabela, indice in INDICES_BUSCA.items():
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (indice,),
+        )
+        if cur.fetchone():
+            if _indice_busca_desatualizado(cur, indice):
+                cur.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+            continue
+
+        cur.execute(
+            f"""
+            CREATE VIRTUAL TABLE {indice} USING fts5(
+                {lista},
+                content='{tabela}',
+                content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {indice}_ai
+            AFTER INSERT ON {tabela} BEGIN
+                INSERT INTO {indice} (rowid, {lista})
+                VALUES (new.rowid, {novos});
+            END
+            """
+        )
+
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {indice}_ad
+            AFTER DELETE ON {tabela} BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {lista})
+                VALUES ('delete', old.rowid, {antigos});
+            END
+            """
+        )
+
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {indice}_au
+            AFTER UPDATE ON {tabela} BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {lista})
+                VALUES ('delete', old.rowid, {antigos});
+                INSERT INTO {indice} (rowid, {lista})
+                VALUES (new.rowid, {novos});
+            END
+            """
+        )
+
+        # Backfill do histórico existente
+        cur.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+
+def _indice_busca_desatualizado(cur, indice: str) -> bool:
+    """
+    Confere o índice contra a tabela de origem ('integrity-check' com
+    rank=1 relê o conteúdo externo). Rowids renumerados fazem a
+    verificação falhar.
+    """
+    try:
+        cur.execute(f"INSERT INTO {indice} ({indice}, rank) VALUES ('integrity-check', 1)")
+    except sqlite3.DatabaseError:
+        return True
+    return False
+
+def rebuild_os_search_index():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    for indice in INDICES_BUSCA.values():
+        cur.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+
+    conn.commit()
+    conn.close()
+
+def build_fts_query(texto: str) -> str:
+    """
+    Converte o texto digitado em consulta FTS5: todos os termos
+    precisam aparecer, cada um como prefixo ("tela" acha "telas").
+    """
+    termos = re.findall(r"\w+", texto or "", flags=re.UNICODE)
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+# Marcadores do snippet(): caracteres de controle, que não aparecem no
+# texto digitado; só depois de escapar o texto viram **negrito**
+MARCA_INICIO = "\x02"
+MARCA_FIM = "\x03"
+
+_MARKDOWN_ESPECIAIS = re.compile(r"([\\`*_{}\[\]()#+\-.!|~<>$:])")
+
+def trecho_markdown(trecho: str | None) -> str:
+    """
+    Trecho do snippet() pronto para st.markdown: o texto do usuário é
+    escapado (*, _, #...) e só os termos encontrados ficam em negrito.
+    """
+    if not trecho:
+        return ""
+
+    texto = _MARKDOWN_ESPECIAIS.sub(r"\\\1", trecho)
+    return texto.replace(MARCA_INICIO, "**").replace(MARCA_FIM, "**")
+
+# ---------------- TURNAROUND (TEMPO POR ETAPA) ----------------
+def ensure_os_turnaround(cur):
+    """
+    Rollup do tempo (horas) que cada OS passou em cada status,
+    alimentado por update_order_status. Sem FK: sobrevive ao
+    arquivamento. Na criação, é preenchido a partir do histórico.
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'os_turnaround'"
+    )
+    if cur.fetchone():
+        return
+
+    cur.execute(
+        """
+        CREATE TABLE os_turnaround (
+            order_id TEXT NOT NULL,
+            etapa TEXT NOT NULL,
+            marca TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            horas REAL NOT NULL,
+            PRIMARY KEY (order_id, etapa)
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_os_turnaround_mes
+        ON os_turnaround (mes, marca)
+        """
+    )
+
+    # Backfill a partir do histórico existente (ativas + arquivadas)
+    cur.execute(
+        """
+        SELECT h.order_id, h.from_status, h.to_status, h.changed_at,
+               o.created_at, o.aparelho
+        FROM order_status_history h
+        JOIN service_orders o ON o.id = h.order_id
+        UNION ALL
+        SELECT h.order_id, h.from_status, h.to_status, h.changed_at,
+               o.created_at, o.aparelho
+        FROM os_arquivadas_history h
+        JOIN os_arquivadas o ON o.id = h.order_id
+        ORDER BY 1, 4
+        """
+    )
+
+    order_id = None
+    for row in cur.fetchall():
+        if row["order_id"] != order_id:
+            order_id = row["order_id"]
+            entrada = row["created_at"]
+
+        if row["from_status"]:
+            registrar_etapa(
+                cur, order_id, row["from_status"],
+                entrada, row["changed_at"], row["aparelho"]
+            )
+
+        if row["to_status"] == "Entregue":
+            registrar_etapa(
+                cur, order_id, "Total",
+                row["created_at"], row["changed_at"], row["aparelho"]
+            )
+
+        entrada = row["changed_at"]
+
+SQL_REGISTRAR_ETAPA = """
+    INSERT INTO os_turnaround (order_id, etapa, marca, mes, horas)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (order_id, etapa) DO UPDATE SET
+        marca = excluded.marca,
+        mes = excluded.mes,
+        horas = CASE
+            WHEN excluded.etapa = 'Total' THEN excluded.horas
+            ELSE horas + excluded.horas
+        END
+"""
+
+def etapa_params(order_id: str, etapa: str, inicio: str, fim: str, aparelho: str) -> tuple:
+    horas = (
+        datetime.fromisoformat(fim) - datetime.fromisoformat(inicio)
+    ).total_seconds() / 3600
+
+    return (order_id, etapa, marca_aparelho(aparelho), fim[:7], max(horas, 0))
+
+def registrar_etapa(cur, order_id: str, etapa: str, inicio: str, fim: str, aparelho: str):
+    """
+    Soma o tempo da etapa (retornos ao mesmo status acumulam).
+    A etapa "Total" é sobrescrita a cada nova entrega.
+    """
+    cur.execute(
+        SQL_REGISTRAR_ETAPA,
+        etapa_params(order_id, etapa, inicio, fim, aparelho),
+    )
+
+def fetch_turnaround(mes_inicio: str = None, mes_fim: str = None):
+    """Linhas do rollup cuja etapa terminou entre os meses (YYYY-MM)."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = "SELECT order_id, etapa, marca, mes, horas FROM os_turnaround WHERE 1=1"
+    params = []
+
+    if mes_inicio:
+        query += " AND mes >= ?"
+        params.append(mes_inicio)
+
+    if mes_fim:
+        query += " AND mes <= ?"
+        params.append(mes_fim)
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+# ---------------- ROLLUP DIÁRIO ----------------
+# Motivo de arquivamento que registra a entrega ao cliente (a tela
+# não usa o status "Entregue": a entrega é o próprio arquivamento)
+MOTIVO_ENTREGA = "Entregue ao cliente"
+
+# Cada OS (ativa ou arquivada) conta uma vez em (dia, status):
+# entregues no dia da entrega, as demais no dia de criação.
+# Arquivadas como entregues contam como "Entregue" (delivered_at =
+# arquivamento); as demais no último status ativo (linha "Arquivada"
+# do histórico); sem ela, entregue se houver delivered_at.
+CHAVE_DIARIO = {
+    "service_orders": """
+        SELECT
+            id,
+            substr(
+                CASE WHEN status = 'Entregue'
+                    THEN COALESCE(delivered_at, created_at)
+                    ELSE created_at
+                END, 1, 10
+            ) AS dia,
+            status,
+            valor_estimado
+        FROM service_orders
+    """,
+    "os_arquivadas": f"""
+        SELECT
+            id,
+            substr(
+                CASE WHEN status_ativo = 'Entregue'
+                    THEN COALESCE(delivered_at, created_at)
+                    ELSE created_at
+                END, 1, 10
+            ) AS dia,
+            status_ativo AS status,
+            valor_estimado
+        FROM (
+            SELECT
+                a.*,
+                CASE WHEN a.status = '{MOTIVO_ENTREGA}' THEN 'Entregue' ELSE COALESCE(
+                    (
+                        SELECT h.from_status
+                        FROM os_arquivadas_history h
+                        WHERE h.order_id = a.id AND h.note = 'Arquivada'
+                        ORDER BY h.changed_at DESC
+                        LIMIT 1
+                    ),
+                    CASE WHEN a.delivered_at IS NOT NULL THEN 'Entregue' ELSE a.status END
+                ) END AS status_ativo
+            FROM os_arquivadas a
+        )
+    """,
+}
+
+def ensure_os_diario(cur):
+    """
+    Rollup diário (dia, status) -> quantidade e receita, mantido por
+    acumular_diario nas gravações. Na criação, é preenchido a partir
+    das OS ativas e arquivadas.
+    """
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'os_diario'"
+    )
+    if cur.fetchone():
+        return
+
+    cur.execute(
+        """
+        CREATE TABLE os_diario (
+            dia TEXT NOT NULL,
+            status TEXT NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            receita REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, status)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    for tabela in CHAVE_DIARIO:
+        _acumular_diario(cur, tabela, None, 1)
+
+def ensure_entregas_arquivadas(cur):
+    """
+    OS arquivadas como entregues antes de o arquivamento gravar
+    delivered_at: preenche com arquivada_em e refaz o rollup, para
+    que passem a contar como receita no dia da entrega.
+    """
+    cur.execute(
+        """
+        UPDATE os_arquivadas
+        SET delivered_at = arquivada_em
+        WHERE status = ? AND delivered_at IS NULL
+        """,
+        (MOTIVO_ENTREGA,),
+    )
+    if cur.rowcount == 0:
+        return
+
+    cur.execute("DELETE FROM os_diario")
+    for tabela in CHAVE_DIARIO:
+        _acumular_diario(cur, tabela, None, 1)
+
+def _acumular_diario(cur, tabela: str, ids, sinal: int):
+    filtro = ""
+    params = [sinal, sinal]
+
+    if ids is not None:
+        filtro = f"WHERE id IN ({', '.join('?' for _ in ids)})"
+        params.extend(ids)
+
+    cur.execute(
+        f"""
+        INSERT INTO os_diario (dia, status, quantidade, receita)
+        SELECT dia, status, ? * COUNT(*), ? * COALESCE(SUM(valor_estimado), 0)
+        FROM ({CHAVE_DIARIO[tabela]}) {filtro}
+        GROUP BY dia, status
+        ON CONFLICT (dia, status) DO UPDATE SET
+            quantidade = quantidade + excluded.quantidade,
+            receita = receita + excluded.receita
+        """,
+        params,
+    )
+
+def acumular_diario(cur, tabela: str, ids, sinal: int):
+    """
+    Soma (sinal=1) ou retira (sinal=-1) as OS `ids` de `tabela` do
+    rollup. Para refletir uma alteração: retirar antes, somar depois,
+    na mesma transação.
+    """
+    if ids:
+        _acumular_diario(cur, tabela, tuple(ids), sinal)
+
+def rebuild_os_diario():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("DELETE FROM os_diario")
+    for tabela in CHAVE_DIARIO:
+        _acumular_diario(cur, tabela, None, 1)
+
     conn.commit()
     conn.close()
 
+def _filtro_dia(data_inicio: str = None, data_fim: str = None):
+    query = ""
+    params = []
+
+    if data_inicio:
+        query += " AND dia >= ?"
+        params.append(data_inicio)
+
+    if data_fim:
+        query += " AND dia <= ?"
+        params.append(data_fim)
+
+    return query, params
+
+def fetch_os_diario(data_inicio: str = None, data_fim: str = None, status: str = None):
+    """Linhas do rollup no período (YYYY-MM-DD), em ordem de dia."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    filtro, params = _filtro_dia(data_inicio, data_fim)
+    query = f"""
+        SELECT dia, status, quantidade, receita
+        FROM os_diario
+        WHERE quantidade > 0 {filtro}
+    """
+
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+
+    query += " ORDER BY dia, status"
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
 # ---------------- GERAR NÚMERO OS ----------------
 def generate_os_number():
-    """Gera número OS sequencial: OS-0001, OS-0002, etc."""
+    """
+    Prévia do próximo número (não reserva).
+    O número definitivo é atribuído por insert_order.
+    """
     conn = get_connection()
     cur = conn.cursor()
-    
-    cur.execute("SELECT COUNT(*) as total FROM service_orders")
+
+    cur.execute(
+        "SELECT valor FROM os_sequence WHERE nome = ?",
+        (SEQUENCIA_OS,),
+    )
     resultado = cur.fetchone()
-    total_existente = resultado["total"] if resultado else 0
-    
+    atual = resultado["valor"] if resultado else 0
+
     conn.close()
-    
-    next_number = total_existente + 1
-    return f"OS-{next_number:04d}"
+
+    return format_os_number(atual + 1)
 
 # ---------------- INSERT ----------------
 def insert_order(order: dict):
+    """
+    Insere a OS. Sem numero_os informado, o número é reservado na
+    mesma transação do INSERT. Retorna o numero_os gravado.
+    """
     conn = get_connection()
     cur = conn.cursor()
 
@@ -133,6 +826,12 @@ def insert_order(order: dict):
     if not order.get("data_entrada"):
         order["data_entrada"] = now
 
+    # Resolvido antes de abrir a escrita (pode ler o catálogo)
+    modelo_id = modelo_id_para(order["aparelho"])
+
+    if not order.get("numero_os"):
+        order["numero_os"] = next_os_number(cur)
+
     cur.execute(
         """
         INSERT INTO service_orders (
@@ -154,10 +853,13 @@ def insert_order(order: dict):
             finished_at,
             delivered_at,
             observacoes,
+            modelo_id,
+            cliente_chave,
+            fone_chave,
             created_at,
             updated_at
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             order["id"],
@@ -178,109 +880,230 @@ def insert_order(order: dict):
             order.get("finished_at"),
             order.get("delivered_at"),
             order.get("observacoes"),
+            modelo_id,
+            chave_cliente(order["nome"]),
+            chave_fone(order["fone"]),
             now,
             now
         ),
     )
 
+    acumular_diario(cur, "service_orders", [order["id"]], 1)
+
     conn.commit()
     conn.close()
+    _registrar_alteracao()
+
+    return order["numero_os"]
 
 # ---------------- ARQUIVAR OS ----------------
 def arquivar_os(order_id: str, motivo: str = "Concluída"):
     """
     Move uma OS para a tabela de arquivadas e remove da tabela ativa
     """
+    return arquivar_os_lote([order_id], motivo) > 0
+
+# ---------------- ARQUIVAR OS EM LOTE ----------------
+COLUNAS_ARQUIVO = """
+    id, numero_os, nome, fone, email, aparelho,
+    detalhes_servico, servico_realizado,
+    senha_tipo, senha_padrao, senha_tela,
+    valor_estimado, status,
+    data_entrada, started_at, finished_at,
+    delivered_at, observacoes, modelo_id,
+    cliente_chave, fone_chave, created_at, updated_at
+"""
+
+def arquivar_os_lote(order_ids: list[str], motivo: str = "Concluída") -> int:
+    """
+    Arquiva várias OS em uma única transação: copia as OS e o
+    histórico para as tabelas de arquivadas e remove da ativa.
+    Com motivo MOTIVO_ENTREGA, o arquivamento é a entrega:
+    delivered_at recebe a data do arquivamento.
+    Retorna quantas OS foram arquivadas.
+    """
+    if not order_ids:
+        return 0
+
     conn = get_connection()
     cur = conn.cursor()
 
-    # Buscar OS completa
-    cur.execute("SELECT * FROM service_orders WHERE id = ?", (order_id,))
-    order = cur.fetchone()
-    
-    if not order:
+    marcadores = ", ".join("?" for _ in order_ids)
+
+    cur.execute(
+        f"SELECT id, status FROM service_orders WHERE id IN ({marcadores})",
+        tuple(order_ids),
+    )
+    orders = cur.fetchall()
+
+    if not orders:
         conn.close()
-        return False
+        return 0
+
+    ids = tuple(order["id"] for order in orders)
+    marcadores = ", ".join("?" for _ in ids)
+    arquivada_em = datetime.utcnow().isoformat()
 
-    # Inserir na tabela de arquivadas
+    # Inserir na tabela de arquivadas (status final = motivo)
     cur.execute(
-        """
-        INSERT INTO os_arquivadas (
+        f"""
+        INSERT INTO os_arquivadas ({COLUNAS_ARQUIVO}, arquivada_em)
+        SELECT
             id, numero_os, nome, fone, email, aparelho,
             detalhes_servico, servico_realizado,
             senha_tipo, senha_padrao, senha_tela,
-            valor_estimado, status,
+            valor_estimado, ?,
             data_entrada, started_at, finished_at,
-            delivered_at, observacoes, created_at, updated_at,
-            arquivada_em
+            CASE WHEN ? THEN COALESCE(delivered_at, ?) ELSE delivered_at END,
+            observacoes, modelo_id,
+            cliente_chave, fone_chave, created_at, updated_at,
+            ?
+        FROM service_orders
+        WHERE id IN ({marcadores})
+        """,
+        (motivo, motivo == MOTIVO_ENTREGA, arquivada_em, arquivada_em, *ids),
+    )
+
+    # Preservar o histórico antes do DELETE (que o remove por cascade)
+    cur.execute(
+        f"""
+        INSERT INTO os_arquivadas_history (
+            id, order_id, from_status, to_status, note, changed_at
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        SELECT id, order_id, from_status, to_status, note, changed_at
+        FROM order_status_history
+        WHERE order_id IN ({marcadores})
         """,
-        (
-            order["id"],
-            order["numero_os"],
-            order["nome"],
-            order["fone"],
-            order["email"],
-            order["aparelho"],
-            order["detalhes_servico"],
-            order["servico_realizado"],
-            order["senha_tipo"],
-            order["senha_padrao"],
-            order["senha_tela"],
-            order["valor_estimado"],
-            motivo,
-            order["data_entrada"],
-            order["started_at"],
-            order["finished_at"],
-            order["delivered_at"],
-            order["observacoes"],
-            order["created_at"],
-            order["updated_at"],
-            datetime.utcnow().isoformat()
+        ids,
+    )
+
+    # O próprio arquivamento entra na linha do tempo
+    cur.executemany(
+        """
+        INSERT INTO os_arquivadas_history (
+            id, order_id, from_status, to_status, note, changed_at
         )
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (str(uuid.uuid4()), order["id"], order["status"], motivo, "Arquivada", arquivada_em)
+            for order in orders
+        ],
     )
 
+    # Rollup: a OS passa a contar pela tabela de arquivadas
+    acumular_diario(cur, "service_orders", ids, -1)
+    acumular_diario(cur, "os_arquivadas", ids, 1)
+
+    # Peças reservadas e não usadas voltam ao estoque
+    _liberar_reservas_os(cur, ids)
+
     # Remover da tabela ativa (e histórico por cascade)
-    cur.execute("DELETE FROM service_orders WHERE id = ?", (order_id,))
+    cur.execute(
+        f"DELETE FROM service_orders WHERE id IN ({marcadores})",
+        ids,
+    )
 
     conn.commit()
     conn.close()
-    return True
+    _registrar_alteracao()
+    _invalidar_detalhe(ids)
+    return len(ids)
 
 # ---------------- UPDATE STATUS ----------------
 def update_order_status(order_id: str, new_status: str, note: str | None = None):
+    update_orders_status([order_id], new_status, note)
+
+# ---------------- UPDATE STATUS EM LOTE ----------------
+def update_orders_status(order_ids: list[str], new_status: str, note: str | None = None) -> int:
+    """
+    Aplica o mesmo status a várias OS em uma única transação:
+    UPDATEs, histórico e turnaround gravados com executemany.
+    Retorna quantas OS mudaram de status.
+    """
+    if not order_ids:
+        return 0
+
     conn = get_connection()
     cur = conn.cursor()
 
+    marcadores = ", ".join("?" for _ in order_ids)
+
     cur.execute(
-        "SELECT status, started_at, finished_at, delivered_at FROM service_orders WHERE id = ?",
-        (order_id,),
+        f"""
+        SELECT id, status, aparelho, created_at, started_at, finished_at, delivered_at
+        FROM service_orders
+        WHERE id IN ({marcadores})
+        """,
+        tuple(order_ids),
     )
+    rows = cur.fetchall()
 
-    row = cur.fetchone()
-
-    if not row:
+    if not rows:
         conn.close()
-        return
+        return 0
+
+    # Última transição de cada OS (início do status atual)
+    cur.execute(
+        f"""
+        SELECT order_id, MAX(changed_at) AS changed_at
+        FROM order_status_history
+        WHERE order_id IN ({marcadores})
+        GROUP BY order_id
+        """,
+        tuple(order_ids),
+    )
+    ultimas = {r["order_id"]: r["changed_at"] for r in cur.fetchall()}
 
-    previous_status = row["status"]
     now = datetime.utcnow().isoformat()
 
-    started_at = row["started_at"]
-    finished_at = row["finished_at"]
-    delivered_at = row["delivered_at"]
+    updates = []
+    historico = []
+    etapas = []
 
-    if new_status == "Em reparo" and not started_at:
-        started_at = now
+    for row in rows:
+        order_id = row["id"]
+        previous_status = row["status"]
 
-    if new_status == "Pronto" and not finished_at:
-        finished_at = now
+        started_at = row["started_at"]
+        finished_at = row["finished_at"]
+        delivered_at = row["delivered_at"]
 
-    if new_status == "Entregue" and not delivered_at:
-        delivered_at = now
+        if new_status == "Em reparo" and not started_at:
+            started_at = now
 
-    cur.execute(
+        if new_status == "Pronto" and not finished_at:
+            finished_at = now
+
+        if new_status == "Entregue" and not delivered_at:
+            delivered_at = now
+
+        updates.append(
+            (new_status, started_at, finished_at, delivered_at, now, order_id)
+        )
+
+        # Histórico
+        if previous_status != new_status:
+            # Tempo no status anterior: desde a última transição (ou criação)
+            entrada = ultimas.get(order_id) or row["created_at"]
+
+            etapas.append(
+                etapa_params(order_id, previous_status, entrada, now, row["aparelho"])
+            )
+
+            if new_status == "Entregue":
+                etapas.append(
+                    etapa_params(order_id, "Total", row["created_at"], now, row["aparelho"])
+                )
+
+            historico.append(
+                (str(uuid.uuid4()), order_id, previous_status, new_status, note, now)
+            )
+
+    ids = [row["id"] for row in rows]
+    acumular_diario(cur, "service_orders", ids, -1)
+
+    cur.executemany(
         """
         UPDATE service_orders
         SET status = ?,
@@ -290,47 +1113,47 @@ def update_order_status(order_id: str, new_status: str, note: str | None = None)
             updated_at = ?
         WHERE id = ?
         """,
-        (
-            new_status,
-            started_at,
-            finished_at,
-            delivered_at,
-            now,
-            order_id,
-        ),
+        updates,
     )
 
-    # Histórico
-    if previous_status != new_status:
-        cur.execute(
-            """
-            INSERT INTO order_status_history (
-                id,
-                order_id,
-                from_status,
-                to_status,
-                note,
-                changed_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                str(uuid.uuid4()),
-                order_id,
-                previous_status,
-                new_status,
-                note,
-                now,
-            ),
+    acumular_diario(cur, "service_orders", ids, 1)
+
+    cur.executemany(SQL_REGISTRAR_ETAPA, etapas)
+
+    cur.executemany(
+        """
+        INSERT INTO order_status_history (
+            id,
+            order_id,
+            from_status,
+            to_status,
+            note,
+            changed_at
         )
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        historico,
+    )
 
     conn.commit()
     conn.close()
+    _registrar_alteracao()
+    _invalidar_detalhe(ids)
+
+    return len(historico)
 
 # ---------------- UPDATE GENERIC FIELDS ----------------
-def update_order_fields(order_id: str, fields: dict):
+def update_order_fields(order_id: str, fields: dict, expected_updated_at: str | None = None):
+    """
+    Atualiza campos editáveis da OS.
+
+    Com expected_updated_at, grava apenas se a OS não foi alterada
+    desde a leitura (controle otimista por versão).
+    Retorna o novo updated_at, ou None se nada foi gravado
+    (sem campos válidos, OS inexistente ou conflito de versão).
+    """
     if not fields:
-        return
+        return None
 
     allowed = {
         "nome",
@@ -356,27 +1179,64 @@ def update_order_fields(order_id: str, fields: dict):
             values.append(value)
 
     if not updates:
-        return
+        return None
+
+    # Aparelho editado: o modelo normalizado acompanha
+    if "aparelho" in fields:
+        updates.append("modelo_id = ?")
+        values.append(modelo_id_para(fields["aparelho"]))
+
+    # Chaves do histórico do cliente
+    if "nome" in fields:
+        updates.append("cliente_chave = ?")
+        values.append(chave_cliente(fields["nome"]))
+
+    if "fone" in fields:
+        updates.append("fone_chave = ?")
+        values.append(chave_fone(fields["fone"]))
+
+    now = datetime.utcnow().isoformat()
 
     updates.append("updated_at = ?")
-    values.append(datetime.utcnow().isoformat())
+    values.append(now)
     values.append(order_id)
 
+    where = "id = ?"
+    if expected_updated_at is not None:
+        where += " AND updated_at = ?"
+        values.append(expected_updated_at)
+
+    # Valor e status mudam a linha da OS no rollup diário
+    afeta_diario = "valor_estimado" in fields or "status" in fields
+
     conn = get_connection()
     cur = conn.cursor()
 
+    if afeta_diario:
+        acumular_diario(cur, "service_orders", [order_id], -1)
+
     cur.execute(
         f"""
         UPDATE service_orders
         SET {', '.join(updates)}
-        WHERE id = ?
+        WHERE {where}
         """,
         tuple(values),
     )
+    gravado = cur.rowcount > 0
+
+    if afeta_diario:
+        acumular_diario(cur, "service_orders", [order_id], 1)
 
     conn.commit()
     conn.close()
 
+    if gravado:
+        _registrar_alteracao()
+        _invalidar_detalhe([order_id])
+
+    return now if gravado else None
+
 # ---------------- FETCH ALL ----------------
 def fetch_orders():
     conn = get_connection()
@@ -415,6 +1275,65 @@ def fetch_orders_by_status(status: str):
 
     return [dict(r) for r in rows]
 
+# ---------------- FETCH PARA IMPRESSÃO EM LOTE ----------------
+def fetch_orders_para_impressao(
+    statuses: list[str] | None = None,
+    data_inicio: str = None,
+    data_fim: str = None,
+):
+    """OS ativas filtradas por status e/ou data de entrada."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = "SELECT * FROM service_orders WHERE 1=1"
+    params = []
+
+    if statuses:
+        query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+        params.extend(statuses)
+
+    if data_inicio:
+        query += " AND data_entrada >= ?"
+        params.append(data_inicio)
+
+    if data_fim:
+        query += " AND data_entrada < date(?, '+1 day')"
+        params.append(data_fim)
+
+    query += " ORDER BY numero_os"
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+# ---------------- FETCH KANBAN BOARD ----------------
+def fetch_kanban_board():
+    """
+    Busca todas as OS ativas em uma única consulta e agrupa por status.
+    Retorna {status: [ordens]}, cada lista ordenada por created_at.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT *
+        FROM service_orders
+        ORDER BY status, created_at ASC
+        """
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    board = {}
+    for r in rows:
+        board.setdefault(r["status"], []).append(dict(r))
+
+    return board
+
 # ---------------- FETCH BY ID ----------------
 def fetch_order_by_id(order_id: str):
     conn = get_connection()
@@ -429,20 +1348,107 @@ def fetch_order_by_id(order_id: str):
         (order_id,),
     )
 
-    row = cur.fetchone()
+    row = cur.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+# ---------------- FETCH STATUS HISTORY ----------------
+def fetch_order_status_history(order_id: str):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT *
+        FROM order_status_history
+        WHERE order_id = ?
+        ORDER BY changed_at DESC
+        """,
+        (order_id,),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+# ---------------- FETCH DETALHES (OS + HISTÓRICO) ----------------
+def fetch_order_versao(order_id: str):
+    """updated_at da OS (versão para conferir caches), ou None se não existe."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT updated_at FROM service_orders WHERE id = ?", (order_id,))
+    row = cur.fetchone()
+    conn.close()
+
+    return row["updated_at"] if row else None
+
+def fetch_order_detalhe(order_id: str):
+    """
+    OS e histórico de status, para a tela de detalhes. Só o updated_at
+    é lido a cada chamada: enquanto ele não mudar, o pacote vem do
+    cache. Retorna {"order": ..., "historico": [...]} ou None.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT updated_at FROM service_orders WHERE id = ?", (order_id,))
+    versao = cur.fetchone()
+
+    if not versao:
+        conn.close()
+        return None
+
+    with _detalhe_cache_lock:
+        detalhe = _detalhe_cache.get((order_id, versao["updated_at"]))
+        if detalhe is not None:
+            _detalhe_cache.move_to_end((order_id, versao["updated_at"]))
+
+    if detalhe is None:
+        cur.execute("SELECT * FROM service_orders WHERE id = ?", (order_id,))
+        row = cur.fetchone()
+
+        if not row:
+            conn.close()
+            return None
+
+        cur.execute(
+            """
+            SELECT *
+            FROM order_status_history
+            WHERE order_id = ?
+            ORDER BY changed_at DESC
+            """,
+            (order_id,),
+        )
+        detalhe = (dict(row), tuple(dict(r) for r in cur.fetchall()))
+
+        # A chave é a versão da linha lida (pode ter mudado após a sonda)
+        with _detalhe_cache_lock:
+            _detalhe_cache[(order_id, row["updated_at"])] = detalhe
+            while len(_detalhe_cache) > DETALHE_CACHE_MAX:
+                _detalhe_cache.popitem(last=False)
+
     conn.close()
 
-    return dict(row) if row else None
+    order, historico = detalhe
 
-# ---------------- FETCH STATUS HISTORY ----------------
-def fetch_order_status_history(order_id: str):
+    return {
+        "order": dict(order),
+        "historico": [dict(h) for h in historico],
+    }
+
+# ---------------- FETCH HISTÓRICO OS ARQUIVADA ----------------
+def fetch_os_arquivada_history(order_id: str):
     conn = get_connection()
     cur = conn.cursor()
 
     cur.execute(
         """
         SELECT *
-        FROM order_status_history
+        FROM os_arquivadas_history
         WHERE order_id = ?
         ORDER BY changed_at DESC
         """,
@@ -478,39 +1484,175 @@ def fetch_os_arquivadas(filtro_cliente: str = None, filtro_aparelho: str = None)
     
     return [dict(r) for r in rows]
 
-# ---------------- BUSCA COMPLETA (ativas + arquivadas) ----------------
-def busca_completa_os(query: str = None):
+# ---------------- FETCH OS ARQUIVADAS (PAGINADO) ----------------
+# Apenas as colunas exibidas no card; o registro completo vem de
+# fetch_os_arquivada_by_id quando o card é aberto
+COLUNAS_CARD_ARQUIVADA = """
+    id, numero_os, nome, aparelho, status, valor_estimado, arquivada_em
+"""
+
+def fetch_os_arquivadas_page(
+    status: str = None,
+    data_inicio: str = None,
+    data_fim: str = None,
+    cursor: tuple | None = None,
+    limit: int = 20,
+):
     """
-    Busca em ambas as tabelas: ativas e arquivadas
+    Página de OS arquivadas, da mais recente para a mais antiga.
+
+    cursor: (arquivada_em, id) do último card da página anterior.
+    Retorna (linhas, cursor da próxima página ou None).
     """
     conn = get_connection()
     cur = conn.cursor()
-    
-    # Buscar ativas
-    ativas_query = """
-        SELECT *, 'ativa' as tipo, status as status 
-        FROM service_orders WHERE 1=1
+
+    query = f"SELECT {COLUNAS_CARD_ARQUIVADA} FROM os_arquivadas WHERE 1=1"
+    params = []
+
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+
+    if data_inicio:
+        query += " AND arquivada_em >= ?"
+        params.append(data_inicio)
+
+    if data_fim:
+        query += " AND arquivada_em < date(?, '+1 day')"
+        params.append(data_fim)
+
+    if cursor:
+        query += " AND (arquivada_em, id) < (?, ?)"
+        params.extend(cursor)
+
+    query += " ORDER BY arquivada_em DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    cur.execute(query, params)
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+
+    proximo = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        proximo = (rows[-1]["arquivada_em"], rows[-1]["id"])
+
+    return rows, proximo
+
+# ---------------- FETCH OS ARQUIVADA BY ID ----------------
+def fetch_os_arquivada_by_id(order_id: str):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        "SELECT * FROM os_arquivadas WHERE id = ?",
+        (order_id,),
+    )
+
+    row = cur.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+# ---------------- COUNT OS ARQUIVADAS ----------------
+def count_os_arquivadas():
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT COUNT(*) AS total FROM os_arquivadas")
+    total = cur.fetchone()["total"]
+
+    conn.close()
+    return total
+
+# ---------------- BUSCA TEXTO (FTS5) ----------------
+def search_orders(texto: str, tipo: str | None = None, status: str | None = None, limit: int = 50):
     """
-    arquivadas_query = """
-        SELECT *, 'arquivada' as tipo, status_final as status 
-        FROM os_arquivadas WHERE 1=1
+    Busca por relevância em OS ativas e arquivadas (número, cliente,
+    aparelho, problema, serviço e observações).
+
+    tipo: None (ambas, num único ranking), "ativa" ou "arquivada".
+    Cada resultado traz `trecho` em markdown já escapado, com os termos
+    encontrados em **negrito**.
     """
+    consulta = build_fts_query(texto)
+    if not consulta:
+        return []
+
+    pesos = ", ".join(str(peso) for _, peso in COLUNAS_BUSCA)
+    partes = []
     params = []
-    
+
+    for tabela, indice in INDICES_BUSCA.items():
+        tipo_tabela = "ativa" if tabela == "service_orders" else "arquivada"
+        if tipo and tipo != tipo_tabela:
+            continue
+
+        arquivada_em = "o.arquivada_em" if tipo_tabela == "arquivada" else "NULL"
+        sql = f"""
+            SELECT
+                o.id,
+                o.numero_os,
+                o.nome,
+                o.aparelho,
+                o.status,
+                {arquivada_em} AS arquivada_em,
+                '{tipo_tabela}' AS tipo,
+                snippet({indice}, -1, char(2), char(3), '…', 12) AS trecho,
+                bm25({indice}, {pesos}) AS rank
+            FROM {indice}
+            JOIN {tabela} o ON o.rowid = {indice}.rowid
+            WHERE {indice} MATCH ?
+        """
+        params.append(consulta)
+
+        if status:
+            sql += " AND o.status = ?"
+            params.append(status)
+
+        partes.append(sql)
+
+    if not partes:
+        return []
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        " UNION ALL ".join(partes) + " ORDER BY rank LIMIT ?",
+        (*params, limit),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    resultados = [dict(r) for r in rows]
+    for r in resultados:
+        r["trecho"] = trecho_markdown(r["trecho"])
+
+    return resultados
+
+# ---------------- BUSCA COMPLETA (ativas + arquivadas) ----------------
+def busca_completa_os(query: str = None):
+    """
+    Busca em ambas as tabelas: ativas e arquivadas.
+    Com texto, usa o índice FTS (ordenado por relevância).
+    """
     if query:
-        ativas_query += " AND (nome LIKE ? OR aparelho LIKE ? OR numero_os LIKE ?)"
-        arquivadas_query += " AND (nome LIKE ? OR aparelho LIKE ? OR numero_os LIKE ?)"
-        params = [f"%{query}%", f"%{query}%", f"%{query}%"]
-    
-    # Executar ambas as queries
-    cur.execute(ativas_query, params)
+        return search_orders(query)
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT *, 'ativa' AS tipo FROM service_orders")
     ativas = [dict(row) for row in cur.fetchall()]
-    
-    cur.execute(arquivadas_query, params)
+
+    cur.execute("SELECT *, 'arquivada' AS tipo FROM os_arquivadas")
     arquivadas = [dict(row) for row in cur.fetchall()]
-    
+
     conn.close()
-    
+
     return ativas + arquivadas
 
 # ---------------- DELETE ----------------
@@ -518,6 +1660,9 @@ def delete_order(order_id: str):
     conn = get_connection()
     cur = conn.cursor()
 
+    acumular_diario(cur, "service_orders", [order_id], -1)
+    _liberar_reservas_os(cur, [order_id])
+
     cur.execute(
         "DELETE FROM service_orders WHERE id = ?",
         (order_id,),
@@ -525,6 +1670,8 @@ def delete_order(order_id: str):
 
     conn.commit()
     conn.close()
+    _registrar_alteracao()
+    _invalidar_detalhe([order_id])
 
 # ----------------- DELETE OS ARQUIVADA ----------------
 def excluir_os_arquivada(order_id: str):
@@ -532,6 +1679,8 @@ def excluir_os_arquivada(order_id: str):
     conn = get_connection()
     cur = conn.cursor()
     
+    acumular_diario(cur, "os_arquivadas", [order_id], -1)
+    
     cur.execute(
         "DELETE FROM os_arquivadas WHERE id = ?",
         (order_id,)
@@ -541,6 +1690,252 @@ def excluir_os_arquivada(order_id: str):
     conn.close()
     return True
 
+# ---------------- RESERVA DE PEÇAS ----------------
+# A reserva já retira a peça de estoque_pecas.quantidade (que passa
+# a ser o disponível); consumir só fecha a reserva e liberar devolve
+# a quantidade. Cada operação é um UPDATE condicional, sem ler e
+# regravar a quantidade.
+def reservar_peca(order_id: str, peca_id: str, quantidade: int = 1) -> str | None:
+    """
+    Reserva a peça para a OS. Retorna o id da reserva, ou None se
+    não houver quantidade disponível.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    now = datetime.utcnow().isoformat()
+
+    cur.execute(
+        """
+        UPDATE estoque_pecas
+        SET quantidade = quantidade - ?, updated_at = ?
+        WHERE id = ? AND quantidade >= ?
+        """,
+        (quantidade, now, peca_id, quantidade),
+    )
+
+    if cur.rowcount == 0:
+        conn.rollback()
+        conn.close()
+        return None
+
+    reserva_id = str(uuid.uuid4())
+
+    cur.execute(
+        """
+        INSERT INTO os_reservas_pecas (
+            id, order_id, peca_id, quantidade, status, created_at, updated_at
+        )
+        VALUES (?, ?, ?, ?, 'reservada', ?, ?)
+        """,
+        (reserva_id, order_id, peca_id, quantidade, now, now),
+    )
+
+    conn.commit()
+    conn.close()
+
+    return reserva_id
+
+def consumir_reserva(reserva_id: str) -> bool:
+    """Marca a peça reservada como usada no reparo."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        UPDATE os_reservas_pecas
+        SET status = 'consumida', updated_at = ?
+        WHERE id = ? AND status = 'reservada'
+        """,
+        (datetime.utcnow().isoformat(), reserva_id),
+    )
+    consumida = cur.rowcount > 0
+
+    conn.commit()
+    conn.close()
+
+    return consumida
+
+def liberar_reserva(reserva_id: str) -> bool:
+    """Cancela a reserva e devolve a quantidade ao estoque."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    liberada = _liberar_reservas(cur, "id = ?", (reserva_id,)) > 0
+
+    conn.commit()
+    conn.close()
+
+    return liberada
+
+def _liberar_reservas_os(cur, order_ids):
+    marcadores = ", ".join("?" for _ in order_ids)
+    _liberar_reservas(cur, f"order_id IN ({marcadores})", tuple(order_ids))
+
+def _liberar_reservas(cur, where: str, params: tuple) -> int:
+    now = datetime.utcnow().isoformat()
+
+    cur.execute(
+        f"""
+        SELECT id, peca_id, quantidade
+        FROM os_reservas_pecas
+        WHERE {where} AND status = 'reservada'
+        """,
+        params,
+    )
+
+    liberadas = 0
+    for r in cur.fetchall():
+        # Só devolve ao estoque quem de fato fechou a reserva
+        cur.execute(
+            """
+            UPDATE os_reservas_pecas
+            SET status = 'liberada', updated_at = ?
+            WHERE id = ? AND status = 'reservada'
+            """,
+            (now, r["id"]),
+        )
+        if cur.rowcount == 0:
+            continue
+
+        cur.execute(
+            """
+            UPDATE estoque_pecas
+            SET quantidade = quantidade + ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (r["quantidade"], now, r["peca_id"]),
+        )
+        liberadas += 1
+
+    return liberadas
+
+def fetch_reservas_os(order_id: str):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT r.*, p.descricao, p.modelo
+        FROM os_reservas_pecas r
+        LEFT JOIN estoque_pecas p ON p.id = r.peca_id
+        WHERE r.order_id = ?
+        ORDER BY r.created_at
+        """,
+        (order_id,),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+def fetch_pecas_por_modelo(modelo_id: int | None):
+    """Peças do modelo normalizado da OS (índice em estoque_pecas.modelo_id)."""
+    if modelo_id is None:
+        return []
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT id, descricao, modelo, quantidade
+        FROM estoque_pecas
+        WHERE modelo_id = ?
+        ORDER BY descricao
+        """,
+        (modelo_id,),
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+# ---------------- SLA (OS EM RISCO) ----------------
+def fetch_os_em_risco(hoje: str | None = None):
+    """
+    OS ativas em alerta ou atrasadas segundo SLA_STATUS, em uma única
+    consulta. Ordenadas da mais atrasada (em relação ao limite) para
+    a menos atrasada.
+
+    Os dias são contados no relógio de Brasília, como em avaliar_sla:
+    `hoje` vem de hoje_local() e os timestamps UTC (started_at,
+    finished_at) são ajustados antes de virar data; datas puras
+    (data_entrada vinda da tela) já são locais.
+    """
+    referencia = " ".join(
+        f"WHEN ? THEN COALESCE({regra['desde']}, data_entrada)"
+        for regra in SLA_STATUS.values()
+    )
+    alerta = " ".join("WHEN ? THEN ?" for _ in SLA_STATUS)
+    limite = " ".join("WHEN ? THEN ?" for _ in SLA_STATUS)
+
+    params = [hoje or hoje_local().isoformat(), SQLITE_UTC_PARA_LOCAL]
+    params.extend(SLA_STATUS)
+    for chave in ("alerta", "limite"):
+        for status, regra in SLA_STATUS.items():
+            params.extend([status, regra[chave]])
+    params.extend(SLA_STATUS)
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        f"""
+        SELECT *,
+            CASE
+                WHEN dias >= limite THEN 'atrasada'
+                ELSE 'alerta'
+            END AS nivel
+        FROM (
+            SELECT
+                id, numero_os, nome, aparelho, status,
+                CAST(
+                    julianday(?)
+                    - julianday(date(
+                        referencia,
+                        CASE WHEN length(referencia) > 10 THEN ? ELSE '+0 days' END
+                    ))
+                AS INTEGER) AS dias,
+                alerta,
+                limite
+            FROM (
+                SELECT
+                    id, numero_os, nome, aparelho, status,
+                    CASE status {referencia} END AS referencia,
+                    CASE status {alerta} END AS alerta,
+                    CASE status {limite} END AS limite
+                FROM service_orders
+                WHERE status IN ({", ".join("?" for _ in SLA_STATUS)})
+            )
+        )
+        WHERE dias >= alerta
+        ORDER BY dias - limite DESC, dias DESC
+        """,
+        params,
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+
+    return [dict(r) for r in rows]
+
+@lru_cache(maxsize=4)
+def _os_em_risco_cache(dia: str, geracao: int) -> tuple:
+    return tuple(fetch_os_em_risco(dia))
+
+def get_os_em_risco():
+    """
+    fetch_os_em_risco com cache por dia; qualquer gravação de OS
+    neste processo gera uma nova versão e recalcula.
+    """
+    return [
+        dict(r)
+        for r in _os_em_risco_cache(hoje_local().isoformat(), versao_dados())
+    ]
+
 # ---------------- ESTATÍSTICAS ----------------
 def get_os_stats():
     """Retorna estatísticas rápidas para dashboard"""
@@ -575,30 +1970,23 @@ def get_os_stats():
 def get_os_financeiras_por_periodo(data_inicio: str = None, data_fim: str = None):
     """
     Retorna estatísticas financeiras das OSs entregues no período
+    (ativas e arquivadas), a partir do rollup diário
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    query = """
-        SELECT 
-            COUNT(*) as total_os,
-            COALESCE(SUM(valor_estimado), 0) as valor_total
-        FROM service_orders 
-        WHERE status = 'Entregue'
-    """
-    params = []
-    
-    if data_inicio and data_fim:
-        query += " AND date(delivered_at) BETWEEN ? AND ?"
-        params.extend([data_inicio, data_fim])
-    elif data_inicio:
-        query += " AND date(delivered_at) >= ?"
-        params.append(data_inicio)
-    elif data_fim:
-        query += " AND date(delivered_at) <= ?"
-        params.append(data_fim)
+    filtro, params = _filtro_dia(data_inicio, data_fim)
     
-    cur.execute(query, params)
+    cur.execute(
+        f"""
+        SELECT 
+            COALESCE(SUM(quantidade), 0) as total_os,
+            COALESCE(SUM(receita), 0) as valor_total
+        FROM os_diario 
+        WHERE status = 'Entregue' {filtro}
+        """,
+        params,
+    )
     result = cur.fetchone()
     
     conn.close()
@@ -611,35 +1999,36 @@ def get_os_financeiras_por_periodo(data_inicio: str = None, data_fim: str = None
 def get_os_entregues_por_periodo(data_inicio: str = None, data_fim: str = None):
     """
     Retorna as OSs entregues no período para detalhamento
+    (ativas e arquivadas; arquivar como entregue grava delivered_at).
+    Filtra delivered_at por faixa, sem date(), para usar os índices.
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    query = """
-        SELECT 
-            numero_os,
-            nome,
-            aparelho,
-            valor_estimado,
-            delivered_at
-        FROM service_orders 
-        WHERE status = 'Entregue'
-    """
+    filtro = ""
     params = []
     
-    if data_inicio and data_fim:
-        query += " AND date(delivered_at) BETWEEN ? AND ?"
-        params.extend([data_inicio, data_fim])
-    elif data_inicio:
-        query += " AND date(delivered_at) >= ?"
+    if data_inicio:
+        filtro += " AND delivered_at >= ?"
         params.append(data_inicio)
-    elif data_fim:
-        query += " AND date(delivered_at) <= ?"
+    
+    if data_fim:
+        # Fim inclusivo: tudo antes do dia seguinte
+        filtro += " AND delivered_at < date(?, '+1 day')"
         params.append(data_fim)
     
-    query += " ORDER BY delivered_at DESC"
+    query = f"""
+        SELECT numero_os, nome, aparelho, valor_estimado, delivered_at
+        FROM service_orders 
+        WHERE status = 'Entregue' {filtro}
+        UNION ALL
+        SELECT numero_os, nome, aparelho, valor_estimado, delivered_at
+        FROM os_arquivadas
+        WHERE delivered_at IS NOT NULL {filtro}
+        ORDER BY delivered_at DESC
+    """
     
-    cur.execute(query, params)
+    cur.execute(query, params * 2)
     results = cur.fetchall()
     
     conn.close()
@@ -648,36 +2037,79 @@ def get_os_entregues_por_periodo(data_inicio: str = None, data_fim: str = None):
 
 def get_os_por_status_periodo(data_inicio: str = None, data_fim: str = None):
     """
-    Retorna contagem de OSs por status no período
+    Retorna contagem de OSs por status no período, a partir do
+    rollup diário (entregues contam pelo dia da entrega)
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    query = """
+    filtro, params = _filtro_dia(data_inicio, data_fim)
+    
+    cur.execute(
+        f"""
         SELECT 
             status,
-            COUNT(*) as quantidade
-        FROM service_orders 
-        WHERE 1=1
+            SUM(quantidade) as quantidade
+        FROM os_diario 
+        WHERE 1=1 {filtro}
+        GROUP BY status
+        HAVING SUM(quantidade) > 0
+        ORDER BY quantidade DESC
+        """,
+        params,
+    )
+    results = cur.fetchall()
+    
+    conn.close()
+    
+    return {row["status"]: row["quantidade"] for row in results}
+
+def get_os_por_modelo(data_inicio: str = None, data_fim: str = None):
+    """
+    Quantidade e valor das OSs (ativas e arquivadas) criadas no
+    período, por modelo normalizado (GROUP BY em modelo_id)
     """
+    conn = get_connection()
+    cur = conn.cursor()
+    
+    filtro = ""
     params = []
     
-    if data_inicio and data_fim:
-        query += " AND date(created_at) BETWEEN ? AND ?"
-        params.extend([data_inicio, data_fim])
-    elif data_inicio:
-        query += " AND date(created_at) >= ?"
+    if data_inicio:
+        filtro += " AND created_at >= ?"
         params.append(data_inicio)
-    elif data_fim:
-        query += " AND date(created_at) <= ?"
-        params.append(data_fim)
     
-    query += " GROUP BY status ORDER BY quantidade DESC"
+    if data_fim:
+        filtro += " AND created_at < date(?, '+1 day')"
+        params.append(data_fim)
     
-    cur.execute(query, params)
+    cur.execute(
+        f"""
+        SELECT
+            COALESCE(m.modelo_comercial, 'Não identificado') AS modelo,
+            COALESCE(m.fabricante, '-') AS fabricante,
+            SUM(o.quantidade) AS quantidade,
+            SUM(o.valor) AS valor
+        FROM (
+            SELECT modelo_id, COUNT(*) AS quantidade,
+                   COALESCE(SUM(valor_estimado), 0) AS valor
+            FROM (
+                SELECT modelo_id, valor_estimado FROM service_orders
+                WHERE 1=1 {filtro}
+                UNION ALL
+                SELECT modelo_id, valor_estimado FROM os_arquivadas
+                WHERE 1=1 {filtro}
+            )
+            GROUP BY modelo_id
+        ) o
+        LEFT JOIN diagnostico_modelos m ON m.id = o.modelo_id
+        GROUP BY modelo, fabricante
+        ORDER BY quantidade DESC
+        """,
+        params * 2,
+    )
     results = cur.fetchall()
     
     conn.close()
     
-    return {row["status"]: row["quantidade"] for row in results}
-
+    return [dict(row) for row in results]
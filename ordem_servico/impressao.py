@@ -0,0 +1,100 @@
+"""
+Impressão de OS em lote.
+
+Renderiza os PDFs de um conjunto de OS em um pool de processos e
+junta o resultado em um PDF único ou em um ZIP. A execução roda em
+um job de core.jobs: a tela só consulta o progresso pelo job_id.
+"""
+
+import io
+import zipfile
+from datetime import datetime
+
+from pypdf import PdfWriter
+
+from core.jobs import submeter_job
+from core.pdf import init_pdf_worker
+
+from .pdf import (
+    cached_pdf_bytes,
+    render_order_pdf,
+    store_pdf_bytes,
+)
+
+FORMATO_PDF = "pdf"
+FORMATO_ZIP = "zip"
+
+# =========================================================
+# MONTAGEM DO ARQUIVO
+# =========================================================
+
+def _juntar_pdfs(pdfs: list[bytes]) -> bytes:
+    writer = PdfWriter()
+    for pdf_bytes in pdfs:
+        writer.append(io.BytesIO(pdf_bytes))
+
+    saida = io.BytesIO()
+    writer.write(saida)
+    return saida.getvalue()
+
+
+def _zipar_pdfs(orders: list[dict], pdfs: list[bytes]) -> bytes:
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as zf:
+        for order, pdf_bytes in zip(orders, pdfs):
+            zf.writestr(f"{order['numero_os']}.pdf", pdf_bytes)
+    return saida.getvalue()
+
+# =========================================================
+# EXECUÇÃO
+# =========================================================
+
+def _executar(job, orders: list[dict], formato: str, max_workers: int | None) -> dict:
+    pdfs = {}
+
+    # PDFs já em cache não vão para o pool
+    pendentes = []
+    for order in orders:
+        pdf_bytes = cached_pdf_bytes(order)
+        if pdf_bytes is None:
+            pendentes.append((order,))
+        else:
+            pdfs[order["id"]] = pdf_bytes
+
+    job.progresso(len(pdfs), len(orders))
+
+    for (order,), pdf_bytes in job.map_processos(
+        render_order_pdf,
+        pendentes,
+        initializer=init_pdf_worker,
+        max_workers=max_workers,
+    ):
+        store_pdf_bytes(order, pdf_bytes)
+        pdfs[order["id"]] = pdf_bytes
+
+    job.progresso(mensagem="Montando o arquivo")
+
+    em_ordem = [pdfs[order["id"]] for order in orders]
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M")
+
+    if formato == FORMATO_ZIP:
+        arquivo = _zipar_pdfs(orders, em_ordem)
+        nome, mime = f"os_{carimbo}.zip", "application/zip"
+    else:
+        arquivo = _juntar_pdfs(em_ordem)
+        nome, mime = f"os_{carimbo}.pdf", "application/pdf"
+
+    return {"arquivo": arquivo, "nome_arquivo": nome, "mime": mime}
+
+
+def iniciar_impressao(orders: list[dict], formato: str = FORMATO_PDF, max_workers: int | None = None) -> str:
+    """Dispara o job em segundo plano e retorna o job_id."""
+    return submeter_job(
+        _executar,
+        orders,
+        formato,
+        max_workers,
+        tipo="impressao_os",
+        modulo="ordem_servico",
+        descricao=f"Impressão de {len(orders)} OS ({formato.upper()})",
+    )
@@ -5,40 +5,67 @@ import plotly.express as px
 from datetime import date, datetime, timedelta
 
 from core import StateManager, OSState
+from core.clientes import buscar_clientes, fetch_timeline_cliente
+from core.dates import fmt_date
+from core.jobs import STATUS_ATIVOS, status_job, resultado_job, descartar_job
+from core.jobs_view import acompanhar_job
 from .database import (
+    MOTIVO_ENTREGA,
     init_db,
     insert_order,
     fetch_orders,
-    fetch_orders_by_status,
-    fetch_order_by_id,
-    fetch_order_status_history,
+    fetch_kanban_board,
+    fetch_orders_para_impressao,
+    fetch_order_detalhe,
+    fetch_order_versao,
     update_order_status,
+    update_orders_status,
     update_order_fields,
-    generate_os_number,
-    get_os_stats,
     get_os_financeiras_por_periodo,
     get_os_por_status_periodo,
     get_os_entregues_por_periodo,
+    fetch_turnaround,
+    fetch_os_diario,
+    get_os_por_modelo,
+    reservar_peca,
+    consumir_reserva,
+    liberar_reserva,
+    fetch_reservas_os,
+    fetch_pecas_por_modelo,
     delete_order,
     excluir_os_arquivada,
     arquivar_os,
-    fetch_os_arquivadas,
-    busca_completa_os, 
+    arquivar_os_lote,
+    fetch_os_arquivadas_page,
+    count_os_arquivadas,
+    fetch_os_arquivada_by_id,
+    fetch_os_arquivada_history,
+    search_orders,
+    get_os_em_risco,
 )
 
 from .utils import (
     build_new_order,
     status_list_kanban,
     status_list_completa,
-    dias_na_loja,
+    avaliar_sla,
+    referencia_sla,
+    resumo_turnaround,
     build_whatsapp_message,
-    build_pdf_bytes,
     widget_key,
 )
 
+from .pdf import build_pdf_bytes
+from .whatsapp import gerar_avisos_retirada, avisos_csv
+
+from .impressao import (
+    FORMATO_PDF,
+    FORMATO_ZIP,
+    iniciar_impressao,
+)
+
 from .view import (
     currency,
-    fmt_date,
     info_box,
     fmt_date_short,
 )
@@ -61,9 +88,100 @@ def close_pattern_editor(order_id: str):
     """Callback para fechar o editor de padrão"""
     st.session_state[f"edit_pattern_{order_id}"] = False
 
+def change_kanban_status(order_id: str):
+    """Callback do selectbox do card: grava o novo status"""
+    update_order_status(order_id, st.session_state[f"kanban_status_{order_id}"])
+    invalidate_cached_order(order_id)
+
+def load_more_kanban(status: str):
+    """Callback do botão 'Carregar mais' da coluna"""
+    limite = StateManager.get(MODULE, f"kanban_limite_{status}", KANBAN_PAGE_SIZE)
+    StateManager.set(MODULE, f"kanban_limite_{status}", limite + KANBAN_PAGE_SIZE)
+
+# =========================================================
+# OS ABERTA (CACHE NA SESSÃO)
+# =========================================================
+def _get_cached_detalhe(order_id: str):
+    """
+    OS e histórico da tela de detalhes guardados na sessão. A cada
+    rerun só o updated_at da OS é lido; o pacote é recarregado quando
+    a versão muda (gravação nesta ou em outra sessão).
+
+    "versao_edicao" guarda a versão que o usuário abriu: as gravações
+    conferem contra ela, para que uma alteração de outra sessão
+    recarregada no meio da edição ainda apareça como conflito.
+    """
+    cache = StateManager.get(MODULE, "os_cache") or {}
+    versao = fetch_order_versao(order_id)
+
+    if versao is None:
+        if cache.pop(order_id, None) is not None:
+            StateManager.set(MODULE, "os_cache", cache)
+        return None
+
+    anterior = cache.get(order_id)
+
+    if anterior is None or anterior["order"]["updated_at"] != versao:
+        detalhe = fetch_order_detalhe(order_id)
+        if not detalhe:
+            return None
+        detalhe["versao_edicao"] = (
+            anterior["versao_edicao"] if anterior else detalhe["order"]["updated_at"]
+        )
+        cache[order_id] = detalhe
+        StateManager.set(MODULE, "os_cache", cache)
+
+    return cache[order_id]
+
+def get_cached_order(order_id: str):
+    detalhe = _get_cached_detalhe(order_id)
+    return detalhe["order"] if detalhe else None
+
+def get_cached_history(order_id: str):
+    detalhe = _get_cached_detalhe(order_id)
+    return detalhe["historico"] if detalhe else []
+
+def get_versao_edicao(order_id: str):
+    """Versão da OS que o usuário abriu (base das gravações)"""
+    detalhe = _get_cached_detalhe(order_id)
+    return detalhe["versao_edicao"] if detalhe else None
+
+def invalidate_cached_order(order_id: str | None = None):
+    """Descarta a OS (ou todas, sem order_id) do cache da sessão"""
+    if order_id is None:
+        StateManager.set(MODULE, "os_cache", {})
+        return
+
+    cache = StateManager.get(MODULE, "os_cache") or {}
+    cache.pop(order_id, None)
+
+def salvar_campos_os(order: dict, fields: dict):
+    """
+    Grava campos com verificação de versão (updated_at).
+    Se outra pessoa alterou a OS, avisa e interrompe a execução.
+    """
+    versao = get_versao_edicao(order["id"]) or order["updated_at"]
+    novo_updated_at = update_order_fields(order["id"], fields, versao)
+    invalidate_cached_order(order["id"])
+
+    if novo_updated_at is None:
+        st.error(
+            "⚠️ Esta OS foi alterada por outra pessoa enquanto você editava. "
+            "Os dados foram recarregados; confira e salve novamente."
+        )
+        st.stop()
+
+    return novo_updated_at
+
 
 MODULE = "ordem_servico"
 
+# Cards exibidos por coluna antes do "Carregar mais"
+KANBAN_PAGE_SIZE = 10
+
+# Cards por página no navegador de arquivadas
+ARQUIVADAS_PAGE_SIZE = 20
+
 def app():
     """
     Função principal do módulo de Ordem de Serviço
@@ -84,26 +202,51 @@ def app():
     # ======================================================
     st.header("Ordem de Serviço")
     
-    # Estatísticas rápidas
-    stats = get_os_stats()
+    # Quadro carregado uma única vez: alimenta o header e o kanban
+    board = fetch_kanban_board()
+    status_counts = {status: len(orders) for status, orders in board.items()}
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total OS", stats["total"])
+        st.metric("Total OS", sum(status_counts.values()))
     
     with col2:
-        em_andamento = stats["status_counts"].get("Em reparo", 0) + \
-                      stats["status_counts"].get("Em análise", 0)
+        em_andamento = status_counts.get("Em reparo", 0) + \
+                      status_counts.get("Em análise", 0)
         st.metric("Em andamento", em_andamento)
     
     with col3:
-        pronto = stats["status_counts"].get("Pronto", 0)
+        pronto = status_counts.get("Pronto", 0)
         st.metric("Prontos para entrega", pronto)
     
     with col4:
-        arquivadas = len(fetch_os_arquivadas())
-        st.metric("OS Arquivadas", arquivadas)
+        st.metric("OS Arquivadas", count_os_arquivadas())
+    
+    # SLA: aparelhos parados além do prazo do status atual
+    em_risco = get_os_em_risco()
+    if em_risco:
+        atrasadas = sum(1 for o in em_risco if o["nivel"] == "atrasada")
+        em_alerta = len(em_risco) - atrasadas
+        
+        with st.expander(f"🚨 {atrasadas} atrasada(s) · ⚠️ {em_alerta} em alerta"):
+            df_risco = pd.DataFrame(em_risco)
+            df_risco["nivel"] = df_risco["nivel"].map(
+                {"atrasada": "🔴 Atrasada", "alerta": "⚠️ Alerta"}
+            )
+            st.dataframe(
+                df_risco[["nivel", "numero_os", "nome", "aparelho", "status", "dias", "limite"]].rename(columns={
+                    "nivel": "SLA",
+                    "numero_os": "OS",
+                    "nome": "Cliente",
+                    "aparelho": "Aparelho",
+                    "status": "Status",
+                    "dias": "Dias no status",
+                    "limite": "Limite (dias)",
+                }),
+                hide_index=True,
+                width="stretch"
+            )
     
     st.markdown("---")
     
@@ -200,10 +343,9 @@ def app():
                     st.error("Preencha os campos obrigatórios (*)")
                     return
                 
-                numero_os = generate_os_number()
-                
+                # Número reservado dentro da transação do insert
                 order = build_new_order(
-                    numero_os=numero_os,
+                    numero_os=None,
                     nome=nome,
                     fone=fone,
                     email=email,
@@ -218,7 +360,7 @@ def app():
                 
                 order["data_entrada"] = data_entrada.isoformat()
                 
-                insert_order(order)
+                numero_os = insert_order(order)
                 
                 st.success(f"Ordem de Serviço {numero_os} criada com sucesso!")
                 st.rerun()
@@ -231,6 +373,62 @@ def app():
         
         # Status que aparecem no kanban (apenas ativos)
         statuses = status_list_kanban()
+        
+        # Ações em lote (fechamento do dia)
+        with st.expander("☑️ Ações em lote"):
+            ordens_ativas = {
+                order["id"]: order
+                for status in statuses
+                for order in board.get(status, [])
+            }
+            
+            selecionadas = st.multiselect(
+                "Ordens de serviço",
+                list(ordens_ativas),
+                format_func=lambda oid: (
+                    f"{ordens_ativas[oid]['numero_os']} - {ordens_ativas[oid]['nome']} "
+                    f"({ordens_ativas[oid]['status']})"
+                ),
+                key="kanban_lote_ids"
+            )
+            
+            col_lote1, col_lote2 = st.columns(2)
+            
+            with col_lote1:
+                # Só status do quadro: Entregue/Cancelado saem pelo
+                # arquivamento, senão as OS somem do Kanban sem arquivar
+                status_lote = st.selectbox(
+                    "Novo status",
+                    statuses,
+                    key="kanban_lote_status"
+                )
+                if st.button("Aplicar status", disabled=not selecionadas, width="stretch"):
+                    alteradas = update_orders_status(selecionadas, status_lote)
+                    invalidate_cached_order()
+                    st.success(f"{alteradas} OS movida(s) para {status_lote}.")
+                    st.rerun()
+            
+            with col_lote2:
+                motivo_lote = st.selectbox(
+                    "Motivo do arquivamento",
+                    [MOTIVO_ENTREGA, "Cancelado pelo cliente", "Outro"],
+                    key="kanban_lote_motivo"
+                )
+                if st.button("🗄️ Arquivar selecionadas", disabled=not selecionadas, width="stretch"):
+                    arquivadas_lote = arquivar_os_lote(selecionadas, motivo_lote)
+                    invalidate_cached_order()
+                    st.success(f"{arquivadas_lote} OS arquivada(s).")
+                    st.rerun()
+        
+        # Impressão em lote (roda em segundo plano)
+        with st.expander("🖨️ Impressão em lote"):
+            render_impressao_lote()
+        
+        # Avisos de retirada das OS prontas
+        prontas = board.get("Pronto", [])
+        with st.expander(f"📲 Avisos de retirada ({len(prontas)})"):
+            render_avisos_retirada(prontas)
+        
         cols = st.columns(len(statuses))
         
         for i, status in enumerate(statuses):
@@ -238,70 +436,11 @@ def app():
                 # Header da coluna
                 st.markdown(f"### {status}")
                 
-                # Buscar OS deste status
-                orders = fetch_orders_by_status(status)
-                
-                if not orders:
-                    st.caption("Sem ordens")
-                    continue
+                # OS deste status (já carregadas no header)
+                orders = board.get(status, [])
                 
-                # Renderizar cada card
-                for order in orders:
-                    with st.container(border=True):
-                        # LINHA 1: NOME CLICKÁVEL (ocupa toda a largura)
-                        if st.button(
-                            f"**{order['numero_os']}** - {order['nome']}",
-                            key=f"kanban_open_{order['id']}",
-                            width="stretch"
-                        ):
-                            StateManager.set(MODULE, OSState.OS_SELECIONADA, order["id"])
-                            st.rerun()
-                        
-                        # LINHA 2: INFORMAÇÕES EM DUAS COLUNAS
-                        col_info, col_valor = st.columns([3, 1])
-                        
-                        with col_info:
-                            # Aparelho
-                            st.caption(f"📱 {order['aparelho']}")
-                        
-                        with col_valor:
-                            # Valor estimado (ocupa espaço vertical das duas linhas)
-                            valor = order.get("valor_estimado") or 0
-                            if valor > 0:
-                                # Container para centralizar verticalmente
-                                st.markdown(
-                                    f"""
-                                    <div style="display: flex; align-items: center; height: 100%; justify-content: center;">
-                                        <span style="font-weight: bold; font-size: 14px;">{currency(valor)}</span>
-                                    </div>
-                                    """, 
-                                    unsafe_allow_html=True
-                                )
-                            else:
-                                st.caption("Sem valor")
-
-                        # Dias na loja
-                        dias = dias_na_loja(order["data_entrada"])
-                        if dias >= 6:
-                            st.error(f"🔴 {dias} dias na loja")
-                        elif dias >= 3:
-                            st.warning(f"⚠️ {dias} dias na loja")
-                        else:
-                            st.caption(f"⏱️ {dias} dia(s) na loja")
-                        
-                        # LINHA 3: CONTROLE DE STATUS
-                        status_options = status_list_kanban()
-                        novo_status = st.selectbox(
-                            "Status",
-                            status_options,
-                            index=status_options.index(order["status"]),
-                            key=f"kanban_status_{order['id']}",
-                            label_visibility="collapsed"
-                        )
-                        
-                        if novo_status != order["status"]:
-                            update_order_status(order["id"], novo_status)
-                            st.rerun()
+                # Cards paginados; cada card é um fragmento próprio
+                render_kanban_column(status, orders)
     
     # ======================================================
     # 🔍 TAB 3: BUSCAR
@@ -313,7 +452,7 @@ def app():
         
         with col1:
             query = st.text_input(
-                "Buscar por cliente, aparelho ou número",
+                "Buscar por cliente, aparelho, número, problema ou serviço",
                 placeholder="Digite para buscar..."
             )
         
@@ -323,14 +462,15 @@ def app():
                 ["Ativas", "Arquivadas"],
                 index=0,
                 horizontal=True,
-                key="filtro_tipo_radio"
+                key="filtro_tipo_radio",
+                help="Com texto na busca, ativas e arquivadas aparecem juntas"
             )
         
         with col3:
             # Selectbox de status apenas para arquivadas
             if filtro_tipo == "Arquivadas":
                 # Opções de status para arquivadas (motivos)
-                status_options = ["Todos", "Entregue ao cliente", "Cancelado pelo cliente", "Outro"]
+                status_options = ["Todos", MOTIVO_ENTREGA, "Cancelado pelo cliente", "Outro"]
                 filtro_status = st.selectbox(
                     "Status", 
                     status_options, 
@@ -343,38 +483,77 @@ def app():
             
             StateManager.set(MODULE, OSState.FILTRO_STATUS, filtro_status)
         
-        # Buscar dados baseado nos filtros
+        # Período de arquivamento (apenas arquivadas)
+        data_inicio_arq = data_fim_arq = None
         if filtro_tipo == "Arquivadas":
-            resultados = fetch_os_arquivadas(query)
+            col_data1, col_data2 = st.columns(2)
+            with col_data1:
+                data_inicio_arq = st.date_input(
+                    "Arquivadas a partir de",
+                    value=None,
+                    format="DD/MM/YYYY",
+                    key="filtro_arq_inicio"
+                )
+            with col_data2:
+                data_fim_arq = st.date_input(
+                    "Arquivadas até",
+                    value=None,
+                    format="DD/MM/YYYY",
+                    key="filtro_arq_fim"
+                )
+        
+        proximo_cursor = None
+        
+        # Buscar dados baseado nos filtros
+        if query:
+            # Índice FTS: um único ranking com ativas e arquivadas,
+            # cobre problema/serviço/observações
+            resultados = search_orders(
+                query,
+                status=filtro_status if filtro_status != "Todos" else None,
+            )
+
+        elif filtro_tipo == "Arquivadas":
+            # Pilha de cursores (keyset); volta à 1ª página se o filtro mudar
+            filtros = (
+                filtro_status,
+                data_inicio_arq.isoformat() if data_inicio_arq else None,
+                data_fim_arq.isoformat() if data_fim_arq else None,
+            )
+            if StateManager.get(MODULE, "arquivadas_filtros") != filtros:
+                StateManager.set(MODULE, "arquivadas_filtros", filtros)
+                StateManager.set(MODULE, "arquivadas_cursores", [None])
+            
+            cursores = StateManager.get(MODULE, "arquivadas_cursores")
+            
+            resultados, proximo_cursor = fetch_os_arquivadas_page(
+                status=filtros[0] if filtros[0] != "Todos" else None,
+                data_inicio=filtros[1],
+                data_fim=filtros[2],
+                cursor=cursores[-1],
+                limit=ARQUIVADAS_PAGE_SIZE,
+            )
 
             # Adicionar campo 'tipo' para cada resultado
             for result in resultados:
                 result['tipo'] = 'arquivada'
-        
-            # Aplicar filtro de motivo se selecionado
-            if filtro_status != "Todos":
-                resultados = [r for r in resultados if r.get("status") == filtro_status]
 
         else:  # Ativas
             resultados = fetch_orders()
             # Adicionar campo 'tipo' para cada resultado
             for result in resultados:
                 result['tipo'] = 'ativa'
-
-            if query:
-                query_lower = query.lower()
-                resultados = [
-                    o for o in resultados
-                    if (query_lower in o["nome"].lower() or
-                        query_lower in o["aparelho"].lower() or
-                        query_lower in o["numero_os"].lower())
-                ]
         
         # Exibir resultados
         if not resultados:
             st.info("Nenhuma ordem de serviço encontrada.")
         else:
-            st.info(f"Encontradas {len(resultados)} OS{'s' if len(resultados) > 1 else ''}")
+            if filtro_tipo == "Arquivadas" and not query:
+                st.info(f"Página {len(cursores)} · {len(resultados)} OS arquivada(s)")
+            elif query:
+                st.info(f"Encontradas {len(resultados)} OS{'s' if len(resultados) > 1 else ''} (ativas e arquivadas)")
+            else:
+                st.info(f"Encontradas {len(resultados)} OS{'s' if len(resultados) > 1 else ''}")
             
             for result in resultados:
                 tipo = result.get('tipo', 'ativa')
@@ -392,11 +571,17 @@ def app():
                         
                         status = result['status']
                         st.caption(f"📊 {status}")
+                        
+                        # Trecho com os termos encontrados (busca FTS),
+                        # já escapado por search_orders
+                        if result.get("trecho"):
+                            st.caption(f"🔎 {result['trecho']}")
                     
                     with col_b:
                         if tipo == 'ativa':
                             if st.button("Abrir", key=f"busca_open_{result['id']}"):
                                 StateManager.set(MODULE, OSState.OS_SELECIONADA, result["id"])
+                                invalidate_cached_order(result["id"])
                                 st.rerun()
                         else:
                             st.caption(f"Arquivada: {fmt_date_short(result.get('arquivada_em'))}")
@@ -409,7 +594,49 @@ def app():
                     
                     # Renderizar modal de visualização se solicitado
                     if tipo == 'arquivada' and st.session_state.get(f"view_arquivada_{result['id']}"):
-                        render_detalhes_os_arquivada(result, 'busca')
+                        # Registro completo só ao abrir
+                        os_arquivada = fetch_os_arquivada_by_id(result["id"])
+                        if os_arquivada:
+                            render_detalhes_os_arquivada(os_arquivada, 'busca')
+        
+        # Paginação das arquivadas
+        if filtro_tipo == "Arquivadas" and not query:
+            col_ant, col_prox = st.columns(2)
+            
+            with col_ant:
+                if st.button("⬅️ Página anterior", disabled=len(cursores) == 1, width="stretch"):
+                    StateManager.set(MODULE, "arquivadas_cursores", cursores[:-1])
+                    st.rerun()
+            
+            with col_prox:
+                if st.button("Próxima página ➡️", disabled=proximo_cursor is None, width="stretch"):
+                    StateManager.set(MODULE, "arquivadas_cursores", cursores + [proximo_cursor])
+                    st.rerun()
+        
+        # Histórico do cliente em todos os módulos
+        st.markdown("---")
+        st.markdown("#### 👤 Histórico do cliente")
+        busca_cliente = st.text_input(
+            "Nome do cliente",
+            placeholder="Digite o início do nome...",
+            key="busca_cliente_timeline"
+        )
+        
+        if busca_cliente:
+            clientes = buscar_clientes(busca_cliente)
+            if not clientes:
+                st.info("Nenhum cliente encontrado.")
+            else:
+                chave = st.selectbox(
+                    "Cliente",
+                    [c["cliente_chave"] for c in clientes],
+                    format_func=lambda k: next(
+                        f"{c['nome']} ({c['registros']} registro(s))"
+                        for c in clientes if c["cliente_chave"] == k
+                    ),
+                    key="busca_cliente_chave"
+                )
+                render_timeline_cliente(chave, None, "busca")
     
     # ======================================================
     # 📈 TAB 4: RELATÓRIOS (CÓDIGO DIRETO)
@@ -504,26 +731,19 @@ def app():
                 )
                 st.plotly_chart(fig_status, width='stretch')
         
-        # Gráfico 2: Evolução Temporal (se houver dados)
-        if os_entregues:
+        # Gráfico 2: Evolução Temporal (rollup diário)
+        entregas_diarias = fetch_os_diario(data_inicio_str, data_fim_str, status="Entregue")
+        if stats_status and entregas_diarias:
             with col_chart2:
-                df_entregues = pd.DataFrame(os_entregues)
-                df_entregues["delivered_at"] = pd.to_datetime(df_entregues["delivered_at"])
-                df_entregues["data"] = df_entregues["delivered_at"].dt.date
-                
-                # Agrupar por data
-                df_agrupado = df_entregues.groupby("data").agg({
-                    "numero_os": "count",
-                    "valor_estimado": "sum"
-                }).reset_index()
-                df_agrupado.rename(columns={"numero_os": "Quantidade", "valor_estimado": "Valor"}, inplace=True)
+                df_agrupado = pd.DataFrame(entregas_diarias)
+                df_agrupado["dia"] = pd.to_datetime(df_agrupado["dia"])
                 
                 fig_evolucao = px.line(
                     df_agrupado,
-                    x="data",
-                    y="Valor",
+                    x="dia",
+                    y="receita",
                     title="Evolução do Valor de OSs Entregues",
-                    labels={"data": "Data", "Valor": "Valor (R$)"}
+                    labels={"dia": "Data", "receita": "Valor (R$)"}
                 )
                 st.plotly_chart(fig_evolucao, width='stretch')
         
@@ -564,6 +784,58 @@ def app():
         else:
             st.info("Nenhuma OS entregue no período selecionado.")
         
+        # OS por modelo normalizado (core.modelos)
+        st.markdown("### 📱 OS por Modelo")
+        por_modelo = get_os_por_modelo(data_inicio_str, data_fim_str)
+        if por_modelo:
+            df_modelo = pd.DataFrame(por_modelo)
+            fig_modelo = px.bar(
+                df_modelo.head(15),
+                x="modelo",
+                y="quantidade",
+                color="fabricante",
+                title="Modelos com mais OSs no período",
+                labels={"modelo": "Modelo", "quantidade": "OSs", "fabricante": "Fabricante"}
+            )
+            st.plotly_chart(fig_modelo, width='stretch')
+        else:
+            st.info("Nenhuma OS no período selecionado.")
+        
+        # Tempo por etapa (rollup os_turnaround)
+        st.markdown("### ⏱️ Tempo por Etapa")
+        
+        turnaround = fetch_turnaround(
+            data_inicio_str[:7] if data_inicio_str else None,
+            data_fim_str[:7] if data_fim_str else None,
+        )
+        
+        if turnaround:
+            agrupar = st.radio(
+                "Agrupar por",
+                ["Marca", "Mês"],
+                horizontal=True,
+                key="turnaround_agrupar"
+            )
+            
+            df_turnaround = resumo_turnaround(
+                turnaround,
+                agrupar_por="marca" if agrupar == "Marca" else "mes"
+            )
+            
+            fig_turnaround = px.bar(
+                df_turnaround,
+                x="Etapa",
+                y="Mediana (dias)",
+                color="Grupo",
+                barmode="group",
+                title="Mediana de dias por etapa"
+            )
+            st.plotly_chart(fig_turnaround, width='stretch')
+            
+            st.dataframe(df_turnaround, width='stretch', hide_index=True)
+        else:
+            st.info("Sem transições de status no período selecionado.")
+        
         # Ação Rápida (Opcional)
         st.markdown("### ⚡ Ação Rápida")
         if st.button("🔄 Atualizar Dados", help="Recalcular todas as estatísticas"):
@@ -576,12 +848,348 @@ def app():
     if os_selecionada:
         render_detalhes_os(os_selecionada)
 
+# ======================================================
+# IMPRESSÃO EM LOTE
+# ======================================================
+def render_impressao_lote():
+    """Filtros, disparo e resultado do job de impressão."""
+    job_id = StateManager.get(MODULE, "impressao_job")
+    job = status_job(job_id) if job_id else None
+
+    if job and job["status"] in STATUS_ATIVOS:
+        acompanhar_job(job_id, "Gerando PDFs...")
+        return
+
+    if job and job["status"] == "concluido":
+        resultado = resultado_job(job_id)
+
+        if resultado:
+            st.success(f"{job['total']} OS prontas para impressão.")
+            st.download_button(
+                "⬇️ Baixar arquivo",
+                resultado["arquivo"],
+                file_name=resultado["nome_arquivo"],
+                mime=resultado["mime"],
+                width="stretch"
+            )
+        else:
+            st.info("O arquivo não está mais disponível. Gere a impressão novamente.")
+
+    if job and job["status"] == "erro":
+        st.error(f"Erro na impressão em lote: {job['erro']}")
+
+    if job and job["status"] in ("cancelado", "interrompido"):
+        st.warning(f"Impressão em lote {job['status']}.")
+
+    if job and st.button("Nova impressão", width="stretch"):
+        descartar_job(job_id)
+        StateManager.set(MODULE, "impressao_job", None)
+        st.rerun()
+
+    if job:
+        return
+
+    col_imp1, col_imp2 = st.columns(2)
+
+    with col_imp1:
+        statuses_impressao = st.multiselect(
+            "Status",
+            status_list_completa(),
+            default=["Pronto"],
+            key="impressao_status"
+        )
+        formato = st.radio(
+            "Formato",
+            ["PDF único", "ZIP"],
+            horizontal=True,
+            key="impressao_formato"
+        )
+
+    with col_imp2:
+        entrada_inicio = st.date_input(
+            "Entrada a partir de",
+            value=None,
+            format="DD/MM/YYYY",
+            key="impressao_inicio"
+        )
+        entrada_fim = st.date_input(
+            "Entrada até",
+            value=None,
+            format="DD/MM/YYYY",
+            key="impressao_fim"
+        )
+
+    if st.button("🖨️ Gerar impressão", width="stretch"):
+        orders = fetch_orders_para_impressao(
+            statuses_impressao,
+            entrada_inicio.isoformat() if entrada_inicio else None,
+            entrada_fim.isoformat() if entrada_fim else None,
+        )
+
+        if not orders:
+            st.info("Nenhuma OS encontrada com esses filtros.")
+            return
+
+        job_id = iniciar_impressao(
+            orders,
+            FORMATO_ZIP if formato == "ZIP" else FORMATO_PDF
+        )
+        StateManager.set(MODULE, "impressao_job", job_id)
+        st.rerun()
+
+def render_avisos_retirada(orders: list[dict]):
+    """Mensagens e links wa.me de todas as OS prontas."""
+    if not orders:
+        st.info("Nenhuma OS pronta para retirada.")
+        return
+
+    avisos = gerar_avisos_retirada(orders)
+    sem_fone = [a for a in avisos if not a["link"]]
+
+    st.download_button(
+        "💾 Exportar CSV",
+        avisos_csv(avisos),
+        file_name=f"avisos_retirada_{date.today().isoformat()}.csv",
+        mime="text/csv",
+        width="stretch"
+    )
+
+    st.markdown("\n".join(
+        f"- [{a['numero_os']} · {a['nome']} · {a['aparelho']}]({a['link']})"
+        for a in avisos
+        if a["link"]
+    ))
+
+    if sem_fone:
+        st.warning(
+            "Sem telefone válido: "
+            + ", ".join(f"{a['numero_os']} ({a['nome']})" for a in sem_fone)
+        )
+
+
+# ======================================================
+# KANBAN (FRAGMENTOS)
+# ======================================================
+@st.fragment
+def render_kanban_column(status: str, orders: list[dict]):
+    """
+    Coluna do kanban com paginação.
+    "Carregar mais" reexecuta apenas esta coluna.
+    """
+    if not orders:
+        st.caption("Sem ordens")
+        return
+
+    limite = StateManager.get(MODULE, f"kanban_limite_{status}", KANBAN_PAGE_SIZE)
+
+    for order in orders[:limite]:
+        render_kanban_card(order)
+
+    restantes = len(orders) - limite
+    if restantes > 0:
+        st.button(
+            f"Carregar mais ({restantes})",
+            key=f"kanban_more_{status}",
+            on_click=load_more_kanban,
+            args=(status,),
+            width="stretch"
+        )
+
+@st.fragment
+def render_kanban_card(order: dict):
+    """
+    Card de uma OS no kanban.
+
+    A troca de status reexecuta só este card: ele passa a indicar o
+    novo status e a OS aparece na coluna certa na próxima recarga do
+    quadro.
+    """
+    with st.container(border=True):
+        # LINHA 1: NOME CLICKÁVEL (ocupa toda a largura)
+        if st.button(
+            f"**{order['numero_os']}** - {order['nome']}",
+            key=f"kanban_open_{order['id']}",
+            width="stretch"
+        ):
+            StateManager.set(MODULE, OSState.OS_SELECIONADA, order["id"])
+            invalidate_cached_order(order["id"])
+            st.rerun()
+
+        # LINHA 2: INFORMAÇÕES EM DUAS COLUNAS
+        col_info, col_valor = st.columns([3, 1])
+
+        with col_info:
+            # Aparelho
+            st.caption(f"📱 {order['aparelho']}")
+
+        with col_valor:
+            # Valor estimado (ocupa espaço vertical das duas linhas)
+            valor = order.get("valor_estimado") or 0
+            if valor > 0:
+                # Container para centralizar verticalmente
+                st.markdown(
+                    f"""
+                    <div style="display: flex; align-items: center; height: 100%; justify-content: center;">
+                        <span style="font-weight: bold; font-size: 14px;">{currency(valor)}</span>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+            else:
+                st.caption("Sem valor")
+
+        # Dias contados pelo SLA do status atual (a mesma base da cor)
+        dias, nivel = avaliar_sla(order)
+        if referencia_sla(order) == "data_entrada":
+            onde = "na loja"
+        else:
+            onde = f"em {order['status']}"
+
+        if nivel == "atrasada":
+            st.error(f"🔴 {dias} dias {onde}")
+        elif nivel == "alerta":
+            st.warning(f"⚠️ {dias} dias {onde}")
+        else:
+            st.caption(f"⏱️ {dias} dia(s) {onde}")
+
+        # LINHA 3: CONTROLE DE STATUS
+        status_options = status_list_kanban()
+        novo_status = st.selectbox(
+            "Status",
+            status_options,
+            index=status_options.index(order["status"]),
+            key=f"kanban_status_{order['id']}",
+            on_change=change_kanban_status,
+            args=(order["id"],),
+            label_visibility="collapsed"
+        )
+
+        if novo_status != order["status"]:
+            st.caption(f"➡️ Movida para **{novo_status}**")
+
+
+# ======================================================
+# HISTÓRICO DO CLIENTE (TIMELINE)
+# ======================================================
+
+def load_more_timeline(estado_key: str, nome: str, fone: str | None):
+    """Callback do 'Carregar mais': busca a próxima página pelo cursor"""
+    estado = StateManager.get(MODULE, estado_key)
+    itens, cursor = fetch_timeline_cliente(nome, fone, estado["cursor"])
+    StateManager.set(MODULE, estado_key, {
+        "cliente": estado["cliente"],
+        "itens": estado["itens"] + itens,
+        "cursor": cursor,
+    })
+
+@st.fragment
+def render_timeline_cliente(nome: str, fone: str | None, contexto: str):
+    """Vendas, OS e diagnósticos do cliente, carregando os mais antigos sob demanda."""
+    estado_key = f"timeline_{contexto}"
+    estado = StateManager.get(MODULE, estado_key)
+    
+    # Primeira página (ou outro cliente no mesmo contexto)
+    if not estado or estado["cliente"] != (nome, fone):
+        itens, cursor = fetch_timeline_cliente(nome, fone)
+        estado = {"cliente": (nome, fone), "itens": itens, "cursor": cursor}
+        StateManager.set(MODULE, estado_key, estado)
+    
+    if not estado["itens"]:
+        st.caption("Nenhum registro anterior deste cliente.")
+        return
+    
+    for item in estado["itens"]:
+        st.markdown(
+            f"**{fmt_date(item['data'])}** · {item['tipo']} · {item['titulo']}"
+        )
+        if item["detalhe"]:
+            st.caption(item["detalhe"])
+    
+    if estado["cursor"]:
+        st.button(
+            "Carregar mais",
+            key=f"{estado_key}_mais",
+            on_click=load_more_timeline,
+            args=(estado_key, nome, fone),
+            width="stretch"
+        )
+
+# ======================================================
+# PEÇAS DA OS (RESERVA NO ESTOQUE)
+# ======================================================
+
+RESERVA_ICONES = {"reservada": "🟡", "consumida": "✅", "liberada": "↩️"}
+
+@st.fragment
+def render_pecas_os(order: dict):
+    """Reservas da OS e peças disponíveis para o modelo do aparelho."""
+    st.subheader("Peças")
+    
+    for reserva in fetch_reservas_os(order["id"]):
+        col_peca, col_usar, col_liberar = st.columns([3, 1, 1])
+        
+        with col_peca:
+            st.write(
+                f"{RESERVA_ICONES.get(reserva['status'], '')} "
+                f"{reserva['quantidade']}x {reserva['descricao'] or 'Peça removida'} "
+                f"({reserva['status']})"
+            )
+        
+        if reserva["status"] != "reservada":
+            continue
+        
+        with col_usar:
+            if st.button("Usar", key=f"reserva_usar_{reserva['id']}", width="stretch"):
+                consumir_reserva(reserva["id"])
+                st.rerun(scope="fragment")
+        
+        with col_liberar:
+            if st.button("Liberar", key=f"reserva_liberar_{reserva['id']}", width="stretch"):
+                liberar_reserva(reserva["id"])
+                st.rerun(scope="fragment")
+    
+    pecas = fetch_pecas_por_modelo(order.get("modelo_id"))
+    
+    if not pecas:
+        st.caption("Nenhuma peça cadastrada no estoque para este modelo.")
+        return
+    
+    pecas_por_id = {peca["id"]: peca for peca in pecas}
+    
+    col_sel, col_qtd, col_btn = st.columns([3, 1, 1], vertical_alignment="bottom")
+    
+    with col_sel:
+        peca_id = st.selectbox(
+            "Peça disponível",
+            list(pecas_por_id),
+            format_func=lambda pid: (
+                f"{pecas_por_id[pid]['descricao']} — {pecas_por_id[pid]['quantidade']} em estoque"
+            ),
+            key=widget_key("reserva_peca", order["id"])
+        )
+    
+    with col_qtd:
+        quantidade = st.number_input(
+            "Qtd",
+            min_value=1,
+            value=1,
+            step=1,
+            key=widget_key("reserva_qtd", order["id"])
+        )
+    
+    with col_btn:
+        if st.button("Reservar", key=widget_key("reserva_btn", order["id"]), width="stretch"):
+            if reservar_peca(order["id"], peca_id, int(quantidade)):
+                st.rerun(scope="fragment")
+            st.error("Quantidade indisponível no estoque.")
+
+
 # ======================================================
 # FUNÇÃO SEPARADA PARA DETALHES DA OS (componente complexo)
 # ======================================================
 def render_detalhes_os(order_id):
     """Renderiza os detalhes de uma OS específica"""
-    order = fetch_order_by_id(order_id)
+    order = get_cached_order(order_id)
     
     if not order:
         st.error("Ordem de Serviço não encontrada.")
@@ -590,6 +1198,12 @@ def render_detalhes_os(order_id):
     
     st.markdown("---")
     
+    if get_versao_edicao(order_id) != order["updated_at"]:
+        st.info(
+            "🔄 Esta OS foi alterada em outra sessão e os dados abaixo já "
+            "foram atualizados. Clique em Recarregar antes de editar."
+        )
+    
     # Header dos detalhes
     col_title, col_actions = st.columns([3, 1])
     
@@ -597,6 +1211,10 @@ def render_detalhes_os(order_id):
         st.header(f"Ordem de Serviço {order['numero_os']}")
     
     with col_actions:
+        if st.button("🔄 Recarregar", help="Buscar a versão mais recente desta OS"):
+            invalidate_cached_order(order_id)
+            st.rerun()
+        
         if st.button("✖️ Fechar"):
             StateManager.set(MODULE, OSState.OS_SELECIONADA, None)
             st.rerun()
@@ -652,6 +1270,9 @@ def render_detalhes_os(order_id):
             
             st.subheader("Status")
             st.write(f"**Atual:** {order['status']}")
+        
+        with st.expander("🕘 Histórico do cliente"):
+            render_timeline_cliente(order["nome"], order["fone"], order["id"])
     
     with tab_servico:
         st.subheader("Problema Relatado")
@@ -668,7 +1289,7 @@ def render_detalhes_os(order_id):
         )
         
         if st.button("💾 Salvar serviço realizado"):
-            update_order_fields(order_id, {"servico_realizado": servico})
+            salvar_campos_os(order, {"servico_realizado": servico})
             st.success("Serviço atualizado!")
             st.rerun()
         
@@ -683,14 +1304,17 @@ def render_detalhes_os(order_id):
         )
         
         if st.button("💾 Salvar observações"):
-            update_order_fields(order_id, {"observacoes": obs})
+            salvar_campos_os(order, {"observacoes": obs})
             st.success("Observações salvas!")
             st.rerun()
+        
+        st.markdown("---")
+        render_pecas_os(order)
     
     with tab_historico:
         st.subheader("Histórico de Status")
         
-        history = fetch_order_status_history(order_id)
+        history = get_cached_history(order_id)
         
         if not history:
             st.info("Nenhum histórico registrado.")
@@ -741,7 +1365,7 @@ def render_detalhes_os(order_id):
                         "aparelho": novo_aparelho,
                         "valor_estimado": novo_valor
                     }
-                    update_order_fields(order_id, update_data)
+                    salvar_campos_os(order, update_data)
                     st.session_state[f"edit_mode_{order_id}"] = False
                     st.success("Informações atualizadas!")
                     st.rerun()
@@ -779,7 +1403,7 @@ def render_detalhes_os(order_id):
                         "senha_tela": nova_senha if nova_senha else None,
                         "senha_padrao": None  # Limpar padrão se existir
                     }
-                    update_order_fields(order_id, update_data)
+                    salvar_campos_os(order, update_data)
                     st.success("Senha alfanumérica salva!")
                     st.rerun()
 
@@ -826,7 +1450,7 @@ def render_detalhes_os(order_id):
                                 "senha_padrao": novo_padrao,
                                 "senha_tela": None  # Limpar senha alfanumérica se existir
                             }
-                            update_order_fields(order_id, update_data)
+                            salvar_campos_os(order, update_data)
                             st.success("✅ Padrão atualizado!")
                             st.session_state[f"edit_pattern_{order_id}"] = False
                             st.rerun()
@@ -855,7 +1479,7 @@ def render_detalhes_os(order_id):
                             "senha_padrao": None,
                             "senha_tela": None
                         }
-                        update_order_fields(order_id, update_data)
+                        salvar_campos_os(order, update_data)
                         st.success("Senha removida!")
                         st.rerun()
 
@@ -870,7 +1494,7 @@ def render_detalhes_os(order_id):
                     if novo_tipo_senha != "Padrão 3x3":
                         update_data["senha_padrao"] = None
                         
-                    update_order_fields(order_id, update_data)
+                    salvar_campos_os(order, update_data)
                     st.success("Tipo de senha atualizado!")
                     st.rerun()
                     
@@ -904,7 +1528,7 @@ def render_detalhes_os(order_id):
             st.warning("Arquivar OS")
             motivo = st.selectbox(
                 "Motivo do arquivamento",
-                ["Entregue ao cliente", "Cancelado pelo cliente", "Outro"],
+                [MOTIVO_ENTREGA, "Cancelado pelo cliente", "Outro"],
                 key=f"motivo_{order_id}"
             )
             
@@ -1025,6 +1649,24 @@ def render_detalhes_os_arquivada(os_arquivada, contexto='default'):
             if os_arquivada.get("senha_tela"):
                 st.write(f"Senha: {os_arquivada['senha_tela']}")
         
+        # Histórico preservado no arquivamento
+        history = fetch_os_arquivada_history(os_id)
+        if history:
+            with st.expander("📜 Histórico de Status"):
+                for h in history:
+                    col_h1, col_h2 = st.columns([3, 1])
+                    with col_h1:
+                        if h["from_status"]:
+                            st.write(f"**{h['from_status']}** → **{h['to_status']}**")
+                        else:
+                            st.write(f"**Criado como {h['to_status']}**")
+                        
+                        if h.get("note"):
+                            st.caption(f"Nota: {h['note']}")
+                    
+                    with col_h2:
+                        st.caption(fmt_date(h["changed_at"], True))
+        
         st.markdown("---")
         
         # Botões com keys baseadas apenas no OS_ID
@@ -4,8 +4,10 @@ Módulo para Pattern Lock Android usando Custom Components V2
 
 import streamlit as st
 import streamlit.components.v2 as components
-import math
 import json
+from functools import lru_cache
+
+from .pattern_render import parse_pattern, render_pattern_svg
 
 def create_pattern_component():
     """
@@ -497,8 +499,9 @@ def validate_pattern(pattern_str: str) -> tuple[bool, str]:
     
     return True, ""
 
+@lru_cache(maxsize=1024)
 def render_pattern_grid(pattern_str: str) -> str:
-    """Renderiza uma visualização estática do padrão com linhas"""
+    """Renderiza uma visualização estática do padrão (SVG memoizado)"""
     if not pattern_str:
         return "<div style='text-align: center; color: #999; padding: 20px;'>Nenhum padrão definido</div>"
     
@@ -507,128 +510,15 @@ def render_pattern_grid(pattern_str: str) -> str:
     if not is_valid:
         return f"<div style='text-align: center; color: #f44336; padding: 10px;'>⚠️ {error_msg}</div>"
     
-    numbers = [int(n.strip()) for n in pattern_str.split('-')]
+    numbers = parse_pattern(pattern_str)
     
-    # Calcular posições dos pontos em um grid 3x3
-    positions = []
-    for i in range(1, 10):
-        row = (i - 1) // 3
-        col = (i - 1) % 3
-        x = col * 50 + 25  # centro do ponto (25px em um grid de 50px)
-        y = row * 50 + 25
-        positions.append((x, y, i))
-    
-    # Container principal
-    grid_html = f"""
-    <div style="
-        position: relative;
-        width: 150px;
-        height: 150px;
-        margin: 0 auto;
-    ">
-    """
-    
-    # Desenhar linhas primeiro (para ficarem atrás dos pontos)
-    if len(numbers) > 1:
-        for i in range(len(numbers) - 1):
-            from_num = numbers[i]
-            to_num = numbers[i + 1]
-            
-            from_idx = from_num - 1
-            to_idx = to_num - 1
-            
-            x1, y1, _ = positions[from_idx]
-            x2, y2, _ = positions[to_idx]
-            
-            # Calcular ângulo e comprimento da linha
-            dx = x2 - x1
-            dy = y2 - y1
-            length = (dx**2 + dy**2)**0.5
-            angle = math.degrees(math.atan2(dy, dx))
-            
-            grid_html += f"""
-            <div style="
-                position: absolute;
-                left: {x1}px;
-                top: {y1}px;
-                width: {length}px;
-                height: 4px;
-                background: #2196f3;
-                transform: rotate({angle}deg);
-                transform-origin: 0 0;
-                z-index: 1;
-            "></div>
-            """
-    
-    # Desenhar pontos
-    for x, y, num in positions:
-        if num in numbers:
-            position_in_pattern = numbers.index(num) + 1
-            hue = 200 + (position_in_pattern * 15)
-            color = f"hsl({hue}, 70%, 50%)"
-            
-            grid_html += f"""
-            <div style="
-                position: absolute;
-                left: {x-15}px;
-                top: {y-15}px;
-                width: 30px;
-                height: 30px;
-                background: {color};
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-                border: 2px solid #1976d2;
-                box-shadow: 0 2px 8px rgba(33, 150, 243, 0.4);
-                z-index: 2;
-            ">{num}</div>
-            """
-        else:
-            grid_html += f"""
-            <div style="
-                position: absolute;
-                left: {x-15}px;
-                top: {y-15}px;
-                width: 30px;
-                height: 30px;
-                background: #e0e0e0;
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                color: #666;
-                font-weight: bold;
-                font-size: 14px;
-                border: 2px solid #bdbdbd;
-                z-index: 2;
-            ">{num}</div>
-            """
-    
-    grid_html += "</div>"
-    
-    info_html = f"""
-    <div style="
-        text-align: center;
-        margin-top: 10px;
-        padding: 10px;
-        background: #f8f9fa;
-        border-radius: 6px;
-        border: 1px solid #e9ecef;
-    ">
-        <div style="font-family: 'Courier New', monospace; font-size: 16px; font-weight: bold; color: #333;">
-            {pattern_str}
-        </div>
-        <div style="font-size: 12px; color: #666; margin-top: 5px;">
-            {len(numbers)} pontos • Mínimo: 3 • Máximo: 9
-        </div>
+    return f"""
+    <div style="text-align: center;">{render_pattern_svg(pattern_str)}</div>
+    <div style="text-align: center; margin-top: 10px; padding: 10px; background: #f8f9fa; border-radius: 6px; border: 1px solid #e9ecef;">
+        <div style="font-family: 'Courier New', monospace; font-size: 16px; font-weight: bold; color: #333;">{pattern_str}</div>
+        <div style="font-size: 12px; color: #666; margin-top: 5px;">{len(numbers)} pontos • Mínimo: 3 • Máximo: 9</div>
     </div>
     """
-    
-    return grid_html + info_html
 
 def pattern_editor_modal(order_id: str, current_pattern: str = "") -> str:
     """
@@ -0,0 +1,135 @@
+"""
+Renderização e codificação do padrão Android (3x3).
+
+Funções puras (sem Streamlit), memoizadas por string de padrão,
+para o SVG da tela de detalhes. Um padrão também pode ser guardado
+como inteiro compacto (0 a 986.327) via encode_pattern/decode_pattern.
+"""
+
+from functools import lru_cache
+from math import perm
+
+MIN_PONTOS = 3
+MAX_PONTOS = 9
+
+# Centro de cada ponto (1..9) no SVG de 150x150
+POSICOES = {
+    n: (25 + ((n - 1) % 3) * 50, 25 + ((n - 1) // 3) * 50)
+    for n in range(1, 10)
+}
+
+# =========================================================
+# CODIFICAÇÃO COMPACTA
+# =========================================================
+
+# Primeiro código de cada tamanho: os padrões de 3 pontos ocupam
+# 0..503, os de 4 pontos 504..3527, e assim por diante
+OFFSETS = {}
+_total = 0
+for _k in range(MIN_PONTOS, MAX_PONTOS + 1):
+    OFFSETS[_k] = _total
+    _total += perm(9, _k)
+
+TOTAL_PADROES = _total
+
+# Peso de cada posição no ranking da permutação (código de Lehmer)
+PESOS = {
+    k: tuple(perm(8 - i, k - 1 - i) for i in range(k))
+    for k in range(MIN_PONTOS, MAX_PONTOS + 1)
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_pattern(pattern_str: str) -> tuple[int, ...] | None:
+    """'1-5-9' → (1, 5, 9); None se o padrão for inválido."""
+    try:
+        numbers = tuple(int(n) for n in (pattern_str or "").split("-"))
+    except ValueError:
+        return None
+
+    if not MIN_PONTOS <= len(numbers) <= MAX_PONTOS:
+        return None
+    if len(set(numbers)) != len(numbers):
+        return None
+    if not all(1 <= n <= 9 for n in numbers):
+        return None
+
+    return numbers
+
+
+@lru_cache(maxsize=4096)
+def encode_pattern(pattern_str: str) -> int | None:
+    numbers = parse_pattern(pattern_str)
+    if numbers is None:
+        return None
+
+    restantes = list(range(1, 10))
+    codigo = 0
+
+    for n, peso in zip(numbers, PESOS[len(numbers)]):
+        idx = restantes.index(n)
+        codigo += idx * peso
+        restantes.pop(idx)
+
+    return OFFSETS[len(numbers)] + codigo
+
+
+@lru_cache(maxsize=4096)
+def decode_pattern(codigo: int) -> str | None:
+    if not 0 <= codigo < TOTAL_PADROES:
+        return None
+
+    k = max(t for t, inicio in OFFSETS.items() if inicio <= codigo)
+    codigo -= OFFSETS[k]
+
+    restantes = list(range(1, 10))
+    numbers = []
+
+    for peso in PESOS[k]:
+        idx, codigo = divmod(codigo, peso)
+        numbers.append(restantes.pop(idx))
+
+    return "-".join(str(n) for n in numbers)
+
+
+def is_valid_code(codigo: int) -> bool:
+    return 0 <= codigo < TOTAL_PADROES
+
+# =========================================================
+# RENDERIZAÇÃO
+# =========================================================
+
+@lru_cache(maxsize=1024)
+def render_pattern_svg(pattern_str: str, size: int = 150) -> str:
+    """SVG compacto: pontos numerados e linhas ligando a sequência."""
+    numbers = parse_pattern(pattern_str) or ()
+    ordem = {n: i for i, n in enumerate(numbers, start=1)}
+
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 150 150" font-family="sans-serif" font-size="14" '
+        f'font-weight="bold" text-anchor="middle">'
+    ]
+
+    if len(numbers) > 1:
+        pontos = " ".join(f"{POSICOES[n][0]},{POSICOES[n][1]}" for n in numbers)
+        partes.append(
+            f'<polyline points="{pontos}" fill="none" stroke="#2196f3" '
+            f'stroke-width="4" stroke-linecap="round" stroke-linejoin="round"/>'
+        )
+
+    for n, (x, y) in POSICOES.items():
+        if n in ordem:
+            cor = f"hsl({200 + ordem[n] * 15},70%,50%)"
+            partes.append(
+                f'<circle cx="{x}" cy="{y}" r="15" fill="{cor}" stroke="#1976d2" stroke-width="2"/>'
+                f'<text x="{x}" y="{y + 5}" fill="#fff">{n}</text>'
+            )
+        else:
+            partes.append(
+                f'<circle cx="{x}" cy="{y}" r="15" fill="#e0e0e0" stroke="#bdbdbd" stroke-width="2"/>'
+                f'<text x="{x}" y="{y + 5}" fill="#666">{n}</text>'
+            )
+
+    partes.append("</svg>")
+    return "".join(partes)
@@ -0,0 +1,110 @@
+"""
+PDF da Ordem de Serviço.
+
+Os recursos fixos do cabeçalho (logo, fontes, textos da loja) vêm
+de core.pdf, carregados uma única vez por processo, e o PDF de cada
+OS fica em cache por (id, updated_at, status): downloads e
+reimpressões de uma OS que não mudou não renderizam de novo.
+"""
+
+import threading
+from collections import OrderedDict
+
+from core.pdf import DocumentoPDF
+
+TITULO = "Bestcell - Ordem de Serviço"
+
+# Quantidade de PDFs mantidos em memória
+PDF_CACHE_MAX = 128
+
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+
+# =========================================================
+# DOCUMENTO
+# =========================================================
+
+class OrdemServicoPDF(DocumentoPDF):
+    """Documento da OS: cabeçalho da loja com o título da OS."""
+
+    def cabecalho(self):
+        super().cabecalho(TITULO)
+
+
+def render_order_pdf(order: dict) -> bytes:
+    pdf = OrdemServicoPDF()
+    pdf.add_page()
+    pdf.cabecalho()
+
+    pdf.ln(15)
+    pdf.fonte_padrao("B", 12)
+    pdf.linha(7, f"OS: {order['numero_os']}")
+
+    pdf.ln(5)
+    pdf.fonte_padrao("", 11)
+
+    lines = [
+        f"Cliente: {order['nome']}",
+        f"Telefone: {order['fone'] or '-'}",
+        f"Email: {order['email'] or '-'}",
+        f"Aparelho: {order['aparelho']}",
+        f"Data de entrada: {order['data_entrada'][:10]}",
+        f"Status: {order['status']}",
+        "",
+        "Problema relatado:",
+        f"{order['detalhes_servico']}",
+        "",
+        "Serviço realizado:",
+        f"{order.get('servico_realizado') or 'Aguardando'}",
+        "",
+        f"Valor estimado: R$ {order.get('valor_estimado') or 0:.2f}",
+    ]
+
+    for line in lines:
+        if line:
+            pdf.paragrafo(7, line)
+        else:
+            pdf.ln(5)
+
+    return bytes(pdf.output())
+
+# =========================================================
+# CACHE POR VERSÃO DA OS
+# =========================================================
+
+def pdf_cache_key(order: dict) -> tuple:
+    # O status entra na chave porque o arquivamento troca o status
+    # sem alterar updated_at
+    return order["id"], order.get("updated_at"), order.get("status")
+
+
+def cached_pdf_bytes(order: dict) -> bytes | None:
+    key = pdf_cache_key(order)
+
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            return _pdf_cache[key]
+
+    return None
+
+
+def store_pdf_bytes(order: dict, pdf_bytes: bytes):
+    key = pdf_cache_key(order)
+
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf_bytes
+        _pdf_cache.move_to_end(key)
+        while len(_pdf_cache) > PDF_CACHE_MAX:
+            _pdf_cache.popitem(last=False)
+
+
+def build_pdf_bytes(order: dict) -> bytes:
+    """PDF da OS, renderizado só quando a OS mudou."""
+    pdf_bytes = cached_pdf_bytes(order)
+
+    if pdf_bytes is None:
+        pdf_bytes = render_order_pdf(order)
+        store_pdf_bytes(order, pdf_bytes)
+
+    return pdf_bytes
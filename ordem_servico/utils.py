@@ -1,36 +1,8 @@
 from datetime import date, datetime
 import uuid
 import pandas as pd
-from fpdf import FPDF
-from pathlib import Path
 
-# =========================================================
-# DATAS
-# =========================================================
-
-def normalize_date(value) -> date | None:
-    if value is None:
-        return None
-    if isinstance(value, date) and not isinstance(value, datetime):
-        return value
-    if isinstance(value, datetime):
-        return value.date()
-    if isinstance(value, pd.Timestamp):
-        return value.to_pydatetime().date()
-    if isinstance(value, str):
-        return datetime.fromisoformat(value[:10]).date()
-    raise TypeError(f"Tipo inválido para data: {type(value)}")
-
-def normalize_datetime(value) -> datetime | None:
-    if value is None:
-        return None
-    if isinstance(value, datetime):
-        return value
-    if isinstance(value, pd.Timestamp):
-        return value.to_pydatetime()
-    if isinstance(value, str):
-        return datetime.fromisoformat(value)
-    raise TypeError(f"Tipo inválido para data: {type(value)}")
+from core.dates import hoje_local, local_date, normalize_date
 
 # =========================================================
 # STATUS (KANBAN)
@@ -60,6 +32,45 @@ def status_list():
     """Função original mantida para compatibilidade"""
     return status_list_completa()
 
+# =========================================================
+# SLA POR STATUS
+# =========================================================
+
+# Dias no status (contados a partir de `desde`) para entrar em alerta
+# e para ser considerada atrasada
+SLA_STATUS = {
+    "Recebido": {"desde": "data_entrada", "alerta": 1, "limite": 2},
+    "Em análise": {"desde": "data_entrada", "alerta": 2, "limite": 3},
+    "Em reparo": {"desde": "started_at", "alerta": 3, "limite": 6},
+    "Pronto": {"desde": "finished_at", "alerta": 7, "limite": 15},
+}
+
+def referencia_sla(order: dict) -> str:
+    """
+    Coluna de onde avaliar_sla conta os dias: a do status atual
+    (started_at, finished_at...) ou data_entrada, se ela faltar.
+    """
+    regra = SLA_STATUS.get(order.get("status"))
+    if regra and order.get(regra["desde"]):
+        return regra["desde"]
+    return "data_entrada"
+
+def avaliar_sla(order: dict, hoje: date | None = None) -> tuple[int, str | None]:
+    """
+    Retorna (dias, nível) da OS no status atual.
+    Nível: "atrasada", "alerta" ou None (dentro do prazo).
+    """
+    regra = SLA_STATUS.get(order.get("status"))
+    dias = dias_na_loja(order.get(referencia_sla(order)), hoje)
+
+    if not regra:
+        return dias, None
+    if dias >= regra["limite"]:
+        return dias, "atrasada"
+    if dias >= regra["alerta"]:
+        return dias, "alerta"
+    return dias, None
+
 def is_finished(status: str) -> bool:
     return status in {"Entregue", "Cancelado"}
 
@@ -71,6 +82,76 @@ def is_overdue(data_prevista, status):
     prev = normalize_date(data_prevista)
     return prev < date.today()
 
+# =========================================================
+# MARCA DO APARELHO
+# =========================================================
+
+# Primeira palavra do aparelho -> marca
+MARCAS_ALIAS = {
+    "apple": "Apple",
+    "iphone": "Apple",
+    "ipad": "Apple",
+    "samsung": "Samsung",
+    "galaxy": "Samsung",
+    "xiaomi": "Xiaomi",
+    "redmi": "Xiaomi",
+    "poco": "Xiaomi",
+    "motorola": "Motorola",
+    "moto": "Motorola",
+    "lg": "LG",
+}
+
+def marca_aparelho(aparelho: str | None) -> str:
+    partes = (aparelho or "").strip().split()
+    if not partes:
+        return "Outros"
+    primeira = partes[0].lower()
+    return MARCAS_ALIAS.get(primeira, partes[0].capitalize())
+
+# =========================================================
+# TURNAROUND (TEMPO POR ETAPA)
+# =========================================================
+
+# Etapas exibidas no relatório; "Total" = entrada até a entrega
+ETAPAS_TURNAROUND = ["Recebido", "Em análise", "Em reparo", "Pronto", "Total"]
+
+def resumo_turnaround(rows: list[dict], agrupar_por: str = "marca") -> pd.DataFrame:
+    """
+    Mediana e p90 (em dias) do tempo em cada etapa,
+    agrupados por marca ou mês.
+    """
+    colunas = ["Etapa", "Grupo", "OSs", "Mediana (dias)", "P90 (dias)"]
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+
+    df = df[df["etapa"].isin(ETAPAS_TURNAROUND)].copy()
+    df["dias"] = df["horas"] / 24
+
+    resumo = (
+        df.groupby(["etapa", agrupar_por])["dias"]
+        .agg(
+            OSs="count",
+            mediana="median",
+            p90=lambda s: s.quantile(0.9),
+        )
+        .reset_index()
+    )
+
+    resumo["ordem"] = resumo["etapa"].map(ETAPAS_TURNAROUND.index)
+    resumo = resumo.sort_values(["ordem", agrupar_por])
+
+    resumo = resumo.rename(columns={
+        "etapa": "Etapa",
+        agrupar_por: "Grupo",
+        "mediana": "Mediana (dias)",
+        "p90": "P90 (dias)",
+    })
+    resumo[["Mediana (dias)", "P90 (dias)"]] = resumo[["Mediana (dias)", "P90 (dias)"]].round(1)
+
+    return resumo[colunas]
+
 # =========================================================
 # WIDGET KEYS
 # =========================================================
@@ -83,7 +164,7 @@ def widget_key(field, order_id):
 # =========================================================
 
 def build_new_order(
-    numero_os: str,
+    numero_os: str | None,
     nome: str,
     fone: str,
     email: str | None,
@@ -144,130 +225,23 @@ def build_whatsapp_message(order: dict) -> str:
         f"Status: {order['status']}\n"
     )
 
-# =========================================================
-# PDF DA ORDEM DE SERVIÇO
-# =========================================================
-
-def build_pdf_bytes(order: dict) -> bytes:
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=12)
-    pdf.add_page()
-
-    # Tentar encontrar logo
-    base_dir = Path(__file__).resolve().parent.parent
-    logo_candidates = [
-        base_dir / "assets" / "logo.png",
-        base_dir / "assets" / "logo.jpg",
-        base_dir / "assets" / "logo.jpeg",
-    ]
-
-    for logo_path in logo_candidates:
-        if logo_path.exists():
-            try:
-                pdf.image(str(logo_path), x=10, y=10, w=40)
-                break
-            except:
-                pass
-
-    pdf.set_xy(55, 10)
-    pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 7, "Bestcell - Ordem de Serviço", ln=True)
-
-    pdf.set_x(55)
-    pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, "WhatsApp: (14) 99639-4412", ln=True)
-    pdf.set_x(55)
-    pdf.cell(0, 6, "Rua Duque de Caxias, 135 - Centro", ln=True)
-    pdf.set_x(55)
-    pdf.cell(0, 6, "Ourinhos - SP", ln=True)
-
-    pdf.ln(15)
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 7, f"OS: {order['numero_os']}", ln=True)
-    
-    pdf.ln(5)
-    pdf.set_font("Helvetica", "", 11)
-    
-    lines = [
-        f"Cliente: {order['nome']}",
-        f"Telefone: {order['fone'] or '-'}",
-        f"Email: {order['email'] or '-'}",
-        f"Aparelho: {order['aparelho']}",
-        f"Data de entrada: {order['data_entrada'][:10]}",
-        f"Status: {order['status']}",
-        "",
-        f"Problema relatado:",
-        f"{order['detalhes_servico']}",
-        "",
-        f"Serviço realizado:",
-        f"{order.get('servico_realizado') or 'Aguardando'}",
-        "",
-        f"Valor estimado: R$ {order.get('valor_estimado') or 0:.2f}",
-    ]
-    
-    for line in lines:
-        if line:
-            pdf.multi_cell(0, 7, line)
-        else:
-            pdf.ln(5)
-
-    return pdf.output(dest="S").encode("latin1")
-
-# =========================================================
-# SENHA / PATTERN LOCK
-# =========================================================
-
-def format_senha(order: dict) -> str:
-    senha_tipo = order.get("senha_tipo")
-    if senha_tipo == "Padrão 3x3":
-        padrao = order.get("senha_padrao") or "-"
-        return f"Padrão 3x3: {padrao}"
-    if senha_tipo == "Numérica":
-        return order.get("senha_tela") or "-"
-    if senha_tipo == "Sem senha":
-        return "-"
-    return order.get("senha_tela") or "-"
-
-def render_pattern_grid(seq: str, empty_char: str = "•") -> str:
-    digits = []
-    for part in (seq or "").replace(",", "-").split("-"):
-        part = part.strip()
-        if part.isdigit() and part not in digits:
-            digits.append(part)
-    
-    grid = []
-    for i in range(1, 10):
-        if str(i) in digits:
-            grid.append(str(i))
-        else:
-            grid.append(empty_char)
-    
-    return (
-        f"{grid[0]} {grid[1]} {grid[2]}\n"
-        f"{grid[3]} {grid[4]} {grid[5]}\n"
-        f"{grid[6]} {grid[7]} {grid[8]}"
-    )
-
 # =========================================================
 # CONTADOR DE DIAS NA LOJA
 # =========================================================    
 
-def dias_na_loja(data_entrada) -> int:
+def dias_na_loja(data_entrada, hoje: date | None = None) -> int:
+    """
+    Dias desde a data, contados no dia de Brasília: timestamps UTC são
+    ajustados como em fetch_os_em_risco, para o card e o alerta de SLA
+    virarem o dia juntos.
+    """
     if not data_entrada:
         return 0
     
-    # Converter para datetime se for string
-    if isinstance(data_entrada, str):
-        try:
-            entrada = datetime.fromisoformat(data_entrada)
-        except ValueError:
-            # Formato alternativo para compatibilidade
-            entrada = datetime.strptime(data_entrada[:10], "%Y-%m-%d")
-    else:
-        entrada = data_entrada
-    
-    # Garantir que é um objeto de data
-    if isinstance(entrada, datetime):
-        entrada = entrada.date()
+    try:
+        entrada = local_date(data_entrada)
+    except ValueError:
+        # Formato alternativo para compatibilidade
+        entrada = datetime.strptime(data_entrada[:10], "%Y-%m-%d").date()
     
-    return (date.today() - entrada).days
+    return ((hoje or hoje_local()) - entrada).days
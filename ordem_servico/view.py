@@ -1,6 +1,4 @@
-import pandas as pd
-from datetime import timedelta
-from datetime import date, datetime
+from core.dates import parse_label_datetime
 
 # ======================================================
 # FORMATAÇÃO DE MOEDA
@@ -11,32 +9,6 @@ def currency(v):
     except Exception:
         return v
 
-# ======================================================
-# FORMATAÇÃO DE DATAS (UTC → LOCAL)
-# ======================================================
-def fmt_date(value, with_time=False):
-    if not value:
-        return ""
-
-    try:
-        dt = pd.to_datetime(value, format="mixed")
-
-        # Se não houver horário explícito, é data pura
-        if dt.hour == 0 and dt.minute == 0 and dt.second == 0 and not with_time:
-            return dt.strftime("%d/%m/%Y")
-
-        # Caso tenha horário, converte UTC → Brasília
-        dt_local = dt - timedelta(hours=3)
-
-        return (
-            dt_local.strftime("%d/%m/%Y %H:%M")
-            if with_time
-            else dt_local.strftime("%d/%m/%Y")
-        )
-
-    except Exception:
-        return str(value)
-
 # ======================================================
 # FORMATAÇÃO DE DATA CURTA (DD/MM)
 # ======================================================
@@ -45,8 +17,7 @@ def fmt_date_short(value):
     if not value:
         return ""
     try:
-        dt = pd.to_datetime(value, format="mixed")
-        return dt.strftime("%d/%m")
+        return parse_label_datetime(value).strftime("%d/%m")
     except Exception:
         return str(value)
 
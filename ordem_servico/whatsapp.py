@@ -0,0 +1,139 @@
+"""
+Avisos de retirada via WhatsApp.
+
+Para as OS prontas, monta em uma passada a mensagem de retirada e o
+link wa.me com o telefone normalizado. Cada aviso fica em cache por
+(id, updated_at): reabrir a lista só gera de novo as OS que mudaram.
+"""
+
+import csv
+import io
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+# DDD da loja, usado quando o telefone foi cadastrado sem DDD
+DDD_PADRAO = "14"
+DDI_BRASIL = "55"
+
+LOJA_ENDERECO = "Rua Duque de Caxias, 135 - Centro - Ourinhos/SP"
+
+# Quantidade de avisos mantidos em memória
+AVISO_CACHE_MAX = 512
+
+_aviso_cache = OrderedDict()
+_aviso_cache_lock = threading.Lock()
+
+# =========================================================
+# TELEFONE E LINK
+# =========================================================
+
+def normalizar_fone(fone: str | None) -> str | None:
+    """
+    Telefone em formato internacional só com dígitos
+    ("(14) 99639-4412" → "5514996394412"), ou None se inválido.
+    """
+    digitos = re.sub(r"\D", "", fone or "").lstrip("0")
+
+    if digitos.startswith(DDI_BRASIL) and len(digitos) in (12, 13):
+        return digitos
+
+    if len(digitos) in (8, 9):
+        digitos = DDD_PADRAO + digitos
+
+    if len(digitos) in (10, 11):
+        return DDI_BRASIL + digitos
+
+    return None
+
+
+def link_whatsapp(numero: str, mensagem: str) -> str:
+    return f"https://wa.me/{numero}?text={quote(mensagem)}"
+
+# =========================================================
+# MENSAGEM
+# =========================================================
+
+def build_aviso_retirada(order: dict) -> str:
+    linhas = [
+        "*Bestcell - Aparelho pronto para retirada*\n",
+        f"Olá, {order['nome']}!",
+        f"Seu {order['aparelho']} (OS {order['numero_os']}) está pronto.\n",
+    ]
+
+    if order.get("servico_realizado"):
+        linhas.append(f"Serviço realizado: {order['servico_realizado']}")
+
+    valor = order.get("valor_estimado") or 0
+    if valor:
+        linhas.append(f"Valor: R$ {valor:.2f}")
+
+    linhas.extend([
+        "",
+        f"Retire na loja: {LOJA_ENDERECO}",
+        "Em caso de dúvida, fale conosco: (14) 99639-4412",
+    ])
+
+    return "\n".join(linhas)
+
+# =========================================================
+# LOTE COM CACHE POR VERSÃO DA OS
+# =========================================================
+
+def _montar_aviso(order: dict) -> dict:
+    mensagem = build_aviso_retirada(order)
+    numero = normalizar_fone(order.get("fone"))
+
+    return {
+        "order_id": order["id"],
+        "numero_os": order["numero_os"],
+        "nome": order["nome"],
+        "aparelho": order["aparelho"],
+        "fone": order.get("fone") or "",
+        "numero": numero,
+        "mensagem": mensagem,
+        "link": link_whatsapp(numero, mensagem) if numero else None,
+    }
+
+
+def aviso_retirada(order: dict) -> dict:
+    """Aviso da OS, montado só quando a OS mudou."""
+    key = (order["id"], order.get("updated_at"))
+
+    with _aviso_cache_lock:
+        if key in _aviso_cache:
+            _aviso_cache.move_to_end(key)
+            return _aviso_cache[key]
+
+    aviso = _montar_aviso(order)
+
+    with _aviso_cache_lock:
+        _aviso_cache[key] = aviso
+        while len(_aviso_cache) > AVISO_CACHE_MAX:
+            _aviso_cache.popitem(last=False)
+
+    return aviso
+
+
+def gerar_avisos_retirada(orders: list[dict]) -> list[dict]:
+    return [aviso_retirada(order) for order in orders]
+
+
+def avisos_csv(avisos: list[dict]) -> bytes:
+    """CSV (UTF-8 com BOM, abre direto no Excel) com mensagem e link."""
+    saida = io.StringIO()
+    writer = csv.writer(saida, delimiter=";")
+
+    writer.writerow(["OS", "Cliente", "Aparelho", "Telefone", "Link", "Mensagem"])
+    for aviso in avisos:
+        writer.writerow([
+            aviso["numero_os"],
+            aviso["nome"],
+            aviso["aparelho"],
+            aviso["fone"],
+            aviso["link"] or "",
+            aviso["mensagem"],
+        ])
+
+    return saida.getvalue().encode("utf-8-sig")
@@ -0,0 +1,114 @@
+"""
+Configuração comum dos testes.
+
+config.py cria a pasta de laudos (caminho do Windows, relativo à pasta
+atual) ao ser importado: os testes rodam a partir de uma pasta
+temporária, para que ela, os bancos e os arquivos gerados não caiam
+dentro do repositório.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+_TMP = Path(tempfile.mkdtemp(prefix="bestsystem_testes_"))
+os.chdir(_TMP)
+
+# Fora do Windows, PLATFORM_TOOLS é um nome de pasta relativo
+if os.name != "nt":
+    Path(r"C:\platform-tools").mkdir(exist_ok=True)
+
+import config  # noqa: E402
+
+config.DB_PATH = _TMP / "bestsystem.db"
+config.EXTRATOS_DIR = _TMP / "extratos"
+config.SNAPSHOT_DIR = _TMP / "snapshots"
+
+
+@pytest.fixture(autouse=True)
+def banco(tmp_path, monkeypatch):
+    """Banco SQLite vazio para cada teste (em todos os módulos do sistema)."""
+    db_path = tmp_path / "bestsystem.db"
+
+    for modulo in list(sys.modules.values()):
+        arquivo = getattr(modulo, "__file__", None) or ""
+        if arquivo.startswith(str(RAIZ)) and hasattr(modulo, "DB_PATH"):
+            monkeypatch.setattr(modulo, "DB_PATH", db_path)
+
+    return db_path
+
+
+@pytest.fixture
+def nova_venda():
+    """Cria uma venda parcelada no banco de vendas; retorna (sale_id, parcel_ids)."""
+    from vendas.database import init_db, insert_parcels, insert_sale
+
+    init_db()
+    contador = iter(range(1, 1000))
+
+    def criar(cliente: str, parcelas: int = 3, valor_parcela: float = 100.0, data_venda: str = "2026-01-10"):
+        n = next(contador)
+        sale_id = f"venda-{n}"
+
+        insert_sale({
+            "id": sale_id,
+            "cliente": cliente,
+            "aparelho": "Galaxy A12",
+            "valor_entrada": 0,
+            "tipo_venda": "Parcelado",
+            "valor_total": parcelas * valor_parcela,
+            "data_venda": data_venda,
+            "frequencia_pagamento": "Mensal",
+            "created_at": datetime.utcnow().isoformat(),
+        })
+
+        parcel_ids = [f"{sale_id}-p{i}" for i in range(1, parcelas + 1)]
+        insert_parcels([
+            {
+                "id": parcel_id,
+                "sale_id": sale_id,
+                "parcela_num": i,
+                "valor_original": valor_parcela,
+                "vencimento": f"2026-{i + 1:02d}-10",
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            for i, parcel_id in enumerate(parcel_ids, start=1)
+        ])
+
+        return sale_id, parcel_ids
+
+    return criar
+
+
+@pytest.fixture
+def nova_os():
+    """Cria uma OS ativa no banco de ordens de serviço; retorna o id."""
+    from ordem_servico.database import init_db, insert_order
+
+    init_db()
+    contador = iter(range(1, 1000))
+
+    def criar(nome: str = "Cliente Teste", status: str = "Em análise", **campos):
+        order_id = f"os-{next(contador)}"
+
+        insert_order({
+            "id": order_id,
+            "nome": nome,
+            "fone": "(14) 99639-4412",
+            "email": None,
+            "aparelho": "Moto G22",
+            "detalhes_servico": "Não liga",
+            "status": status,
+            **campos,
+        })
+
+        return order_id
+
+    return criar
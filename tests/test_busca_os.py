@@ -0,0 +1,51 @@
+from ordem_servico.database import arquivar_os, search_orders
+
+
+def test_busca_une_ativas_e_arquivadas_em_um_ranking(nova_os):
+    ativa = nova_os("Maria Tela", detalhes_servico="Tela quebrada")
+    arquivada = nova_os("João Bateria", detalhes_servico="Trocar tela e bateria")
+    nova_os("Pedro Som", detalhes_servico="Alto-falante mudo")
+    arquivar_os(arquivada)
+
+    resultados = search_orders("tela")
+
+    assert {(r["id"], r["tipo"]) for r in resultados} == {
+        (ativa, "ativa"),
+        (arquivada, "arquivada"),
+    }
+    ranks = [r["rank"] for r in resultados]
+    assert ranks == sorted(ranks)
+
+
+def test_trecho_escapa_o_markdown_do_texto(nova_os):
+    nova_os(detalhes_servico="Tela *piscando* #2 e_b [urgente]")
+
+    trecho = search_orders("piscando")[0]["trecho"]
+
+    assert trecho == r"Tela \***piscando**\* \#2 e\_b \[urgente\]"
+
+
+def test_init_db_reconstroi_indice_com_rowids_renumerados(nova_os):
+    from ordem_servico.database import get_connection, init_db
+
+    outra = nova_os("Bruno Bateria", detalhes_servico="Bateria fraca")
+    alvo = nova_os("Ana Tela", detalhes_servico="Tela trincada")
+
+    # Efeito de um VACUUM que renumera os rowids (tabela sem INTEGER
+    # PRIMARY KEY): as linhas trocam de rowid sem passar pelos triggers
+    conn = get_connection()
+    gatilho = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'os_busca_ativas_au'"
+    ).fetchone()[0]
+    conn.execute("DROP TRIGGER os_busca_ativas_au")
+    conn.execute("UPDATE service_orders SET rowid = rowid + 10")
+    conn.execute("UPDATE service_orders SET rowid = CASE id WHEN ? THEN 1 ELSE 2 END", (alvo,))
+    conn.execute(gatilho)
+    conn.commit()
+    conn.close()
+
+    assert [r["id"] for r in search_orders("trincada")] == [outra]
+
+    init_db()
+
+    assert [r["id"] for r in search_orders("trincada")] == [alvo]
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+from core.dates import local_date, normalize_date, normalize_datetime, parse_date_column
+
+
+def test_normalize_date_formatos():
+    assert normalize_date("2026-03-05") == date(2026, 3, 5)
+    assert normalize_date("2026-03-05T14:30:00.123456") == date(2026, 3, 5)
+    assert normalize_date(datetime(2026, 3, 5, 23, 59)) == date(2026, 3, 5)
+    assert normalize_date(pd.Timestamp("2026-03-05 10:00")) == date(2026, 3, 5)
+    assert normalize_date(date(2026, 3, 5)) == date(2026, 3, 5)
+
+
+def test_normalize_date_vazios():
+    assert normalize_date(None) is None
+    assert normalize_date(pd.NaT) is None
+    assert normalize_date(float("nan")) is None
+
+
+def test_normalize_datetime_vazios():
+    assert normalize_datetime(None) is None
+    assert normalize_datetime(pd.NaT) is None
+    assert normalize_datetime("2026-03-05T14:30:00") == datetime(2026, 3, 5, 14, 30)
+
+
+def test_normalize_date_em_coluna_com_nat():
+    coluna = parse_date_column(pd.Series(["2026-03-05T10:00:00", None, "inválida"]))
+
+    assert [normalize_date(v) for v in coluna] == [date(2026, 3, 5), None, None]
+
+
+def test_local_date_ajusta_so_timestamps():
+    assert local_date("2026-10-19T02:30:00") == date(2026, 10, 18)
+    assert local_date("2026-10-19T03:00:00") == date(2026, 10, 19)
+    assert local_date("2026-10-19") == date(2026, 10, 19)
+    assert local_date(date(2026, 10, 19)) == date(2026, 10, 19)
+    assert local_date(None) is None
@@ -0,0 +1,74 @@
+"""Pacote de detalhes da OS: cache por versão (updated_at) no processo e na sessão."""
+
+import pytest
+import streamlit as st
+
+from ordem_servico import database as os_db
+from ordem_servico import ordem_servico as tela
+
+
+@pytest.fixture(autouse=True)
+def sessao_limpa():
+    st.session_state.clear()
+    with os_db._detalhe_cache_lock:
+        os_db._detalhe_cache.clear()
+    yield
+    st.session_state.clear()
+
+
+def _gravar_sem_versao(order_id, observacoes):
+    """Altera a OS sem mudar o updated_at (o cache não tem como perceber)."""
+    conn = os_db.get_connection()
+    conn.execute(
+        "UPDATE service_orders SET observacoes = ? WHERE id = ?",
+        (observacoes, order_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_detalhe_vem_do_cache_enquanto_a_versao_nao_muda(nova_os):
+    order_id = nova_os()
+    versao = os_db.fetch_order_versao(order_id)
+
+    assert os_db.fetch_order_detalhe(order_id)["order"]["updated_at"] == versao
+
+    _gravar_sem_versao(order_id, "fora do sistema")
+    assert os_db.fetch_order_detalhe(order_id)["order"]["observacoes"] is None
+
+    novo = os_db.update_order_fields(order_id, {"observacoes": "nova"}, versao)
+    detalhe = os_db.fetch_order_detalhe(order_id)
+    assert detalhe["order"]["updated_at"] == novo
+    assert detalhe["order"]["observacoes"] == "nova"
+
+    assert os_db.fetch_order_versao("nao-existe") is None
+    assert os_db.fetch_order_detalhe("nao-existe") is None
+
+
+def test_sessao_recarrega_a_os_alterada_em_outra_sessao(nova_os):
+    order_id = nova_os()
+    versao_aberta = tela.get_cached_order(order_id)["updated_at"]
+
+    # Outra sessão grava: o próximo rerun já mostra os dados novos
+    os_db.update_order_fields(order_id, {"observacoes": "outra sessão"}, versao_aberta)
+    order = tela.get_cached_order(order_id)
+    assert order["observacoes"] == "outra sessão"
+
+    # ...mas a gravação desta sessão ainda confere contra a versão aberta
+    assert tela.get_versao_edicao(order_id) == versao_aberta
+    assert os_db.update_order_fields(
+        order_id, {"observacoes": "esta sessão"}, tela.get_versao_edicao(order_id)
+    ) is None
+
+    tela.invalidate_cached_order(order_id)
+    assert tela.get_versao_edicao(order_id) == order["updated_at"]
+
+
+def test_sessao_descarta_a_os_excluida(nova_os):
+    order_id = nova_os()
+    assert tela.get_cached_order(order_id) is not None
+
+    os_db.delete_order(order_id)
+
+    assert tela.get_cached_order(order_id) is None
+    assert tela.get_cached_history(order_id) == []
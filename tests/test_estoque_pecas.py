@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from estoque.database import atualizar_peca, buscar_peca_por_id, excluir_peca, init_db, inserir_peca
+from ordem_servico.database import consumir_reserva, reservar_peca
+
+
+@pytest.fixture
+def peca(nova_os):
+    # nova_os cria as tabelas de OS (inclui os_reservas_pecas)
+    init_db()
+    agora = datetime.utcnow().isoformat()
+
+    inserir_peca({
+        "id": "peca-1",
+        "descricao": "Tela Moto G22",
+        "modelo": "Moto G22",
+        "quantidade": 5,
+        "observacoes": "",
+        "created_at": agora,
+        "updated_at": agora,
+    })
+
+    return buscar_peca_por_id("peca-1")
+
+
+def test_edicao_com_versao_antiga_nao_desfaz_reserva(peca, nova_os):
+    assert reservar_peca(nova_os(), peca["id"], 2)
+
+    # Formulário aberto antes da reserva, salvo com a quantidade lida
+    gravado = atualizar_peca(
+        peca["id"], "Tela Moto G22 (nova)", peca["modelo"], peca["quantidade"], "",
+        expected_updated_at=peca["updated_at"],
+    )
+
+    assert gravado is None
+    assert buscar_peca_por_id(peca["id"])["quantidade"] == 3
+
+
+def test_edicao_com_versao_atual_grava(peca):
+    novo_updated_at = atualizar_peca(
+        peca["id"], peca["descricao"], peca["modelo"], 8, "",
+        expected_updated_at=peca["updated_at"],
+    )
+
+    atual = buscar_peca_por_id(peca["id"])
+    assert novo_updated_at == atual["updated_at"]
+    assert atual["quantidade"] == 8
+
+
+def test_excluir_peca_reservada_e_recusado(peca, nova_os):
+    reserva_id = reservar_peca(nova_os(), peca["id"], 1)
+
+    assert excluir_peca(peca["id"]) is False
+    assert buscar_peca_por_id(peca["id"])
+
+    consumir_reserva(reserva_id)
+
+    assert excluir_peca(peca["id"]) is True
+    assert buscar_peca_por_id(peca["id"]) is None
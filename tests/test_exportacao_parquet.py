@@ -0,0 +1,65 @@
+import exportacao_parquet
+from exportacao_parquet import exportar_snapshot, ler_tabela_atual
+from vendas.database import (
+    add_parcel_adjustment,
+    close_sale_critical,
+    delete_parcel_adjustments,
+    update_closed_sale_recovery,
+)
+
+
+def _pagamento(parcel_id: str, valor: float = 100.0) -> dict:
+    return {
+        "id": f"{parcel_id}-pg",
+        "parcel_id": parcel_id,
+        "tipo": "pagamento",
+        "valor": valor,
+        "descricao": "Pagamento",
+        "created_at": "2026-02-10T12:00:00",
+    }
+
+
+def _ids(destino, tabela: str) -> set:
+    return {linha["id"] for linha in ler_tabela_atual(destino, tabela)}
+
+
+def test_exportacao_incremental_acrescenta_linhas_novas(tmp_path, banco, monkeypatch, nova_venda):
+    monkeypatch.setattr(exportacao_parquet, "DB_PATH", banco)
+
+    primeira, _ = nova_venda("Ana Souza", parcelas=2)
+    exportar_snapshot(tmp_path)
+
+    segunda, _ = nova_venda("Bruno Lima", parcelas=2)
+    exportar_snapshot(tmp_path)
+
+    assert _ids(tmp_path, "sales") == {primeira, segunda}
+    assert len(_ids(tmp_path, "parcels")) == 4
+
+
+def test_alteracoes_e_remocoes_chegam_ao_snapshot(tmp_path, banco, monkeypatch, nova_venda):
+    monkeypatch.setattr(exportacao_parquet, "DB_PATH", banco)
+
+    ajustada, parcelas_ajustada = nova_venda("Carla Dias")
+    encerrada, parcelas_encerrada = nova_venda("Diego Alves")
+    add_parcel_adjustment(_pagamento(parcelas_ajustada[0]))
+    add_parcel_adjustment(_pagamento(parcelas_encerrada[0], 50.0))
+    exportar_snapshot(tmp_path)
+
+    assert len(_ids(tmp_path, "parcel_adjustments")) == 2
+
+    # Ajustes removidos, venda encerrada e valor recuperado depois do corte
+    delete_parcel_adjustments(ajustada)
+    close_sale_critical(encerrada, "Inadimplência")
+    exportar_snapshot(tmp_path)
+
+    update_closed_sale_recovery(encerrada, 80.0)
+    exportar_snapshot(tmp_path)
+
+    assert _ids(tmp_path, "parcel_adjustments") == set()
+    assert _ids(tmp_path, "sales") == {ajustada}
+    assert _ids(tmp_path, "parcels") == set(parcelas_ajustada)
+
+    [fechada] = ler_tabela_atual(tmp_path, "sales_closed")
+    assert fechada["id"] == encerrada
+    assert fechada["valor_recebido"] == 50.0
+    assert fechada["valor_recuperado"] == 80.0
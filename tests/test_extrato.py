@@ -0,0 +1,64 @@
+import io
+from pathlib import Path
+
+from pypdf import PdfReader
+
+from vendas.extrato import (
+    build_client_statement,
+    gerar_extratos_em_lote,
+    statement_file_name,
+)
+
+
+def _trechos(pdf_bytes: bytes):
+    """(x, texto) de cada trecho desenhado nas páginas."""
+    trechos = []
+
+    for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+        largura = float(page.mediabox.width)
+
+        def visitor(texto, cm, tm, font_dict, font_size):
+            if texto.strip():
+                trechos.append((tm[4] * cm[0] + cm[4], texto.strip(), largura))
+
+        page.extract_text(visitor_text=visitor)
+
+    return trechos
+
+
+def test_extrato_tabela_dentro_da_pagina(nova_venda):
+    nova_venda("Maria Ñusta 李", parcelas=3)
+
+    pdf_bytes = build_client_statement("Maria Ñusta 李")
+    trechos = _trechos(pdf_bytes)
+    textos = " ".join(t for _, t, _ in trechos)
+
+    assert "Maria Ñusta" in textos
+    assert "Vencimento" in textos
+    assert "Saldo em aberto" in textos
+
+    # Nada começa na margem direita (10 mm) e a tabela parte da esquerda
+    margem = 10 * 72 / 25.4
+    assert all(0 <= x < largura - margem for x, _, largura in trechos)
+    assert min(x for x, texto, _ in trechos if texto == "Parcela") < 2 * margem
+
+
+def test_statement_file_name_distingue_clientes():
+    nomes = {
+        statement_file_name(cliente)
+        for cliente in ["José Silva", "Jose Silva", "José Silva!", "José  Silva"]
+    }
+
+    assert len(nomes) == 4
+    assert all(nome.startswith("extrato_Jos") and nome.endswith(".pdf") for nome in nomes)
+
+
+def test_lote_nao_sobrescreve_clientes_parecidos(nova_venda, tmp_path):
+    nova_venda("José Silva")
+    nova_venda("Jose Silva")
+
+    arquivos = gerar_extratos_em_lote(tmp_path / "extratos", max_workers=2)
+
+    assert len(arquivos) == 2
+    assert len({Path(a).name for a in arquivos}) == 2
+    assert all(Path(a).stat().st_size > 0 for a in arquivos)
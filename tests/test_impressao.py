@@ -0,0 +1,80 @@
+import io
+import time
+import zipfile
+
+import pytest
+from pypdf import PdfReader
+
+from core.jobs import CONCLUIDO, STATUS_ATIVOS, init_jobs_db, resultado_job, status_job
+from ordem_servico.impressao import FORMATO_PDF, FORMATO_ZIP, iniciar_impressao
+
+
+def _orders(prefixo: str, quantidade: int = 3):
+    return [
+        {
+            "id": f"{prefixo}-{n}",
+            "numero_os": f"OS-{prefixo}-{n}",
+            "nome": f"Cliente {n}",
+            "fone": "(14) 99639-4412",
+            "email": None,
+            "aparelho": "Moto G22",
+            "data_entrada": "2026-10-19",
+            "status": "Pronto",
+            "detalhes_servico": "Não liga",
+            "servico_realizado": "Troca do conector de carga",
+            "valor_estimado": 120,
+            "updated_at": "2026-10-19T12:00:00",
+        }
+        for n in range(1, quantidade + 1)
+    ]
+
+
+def _aguardar(job_id: str, limite: float = 60) -> dict:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        job = status_job(job_id)
+        if job["status"] not in STATUS_ATIVOS:
+            return job
+        time.sleep(0.1)
+    pytest.fail("O job de impressão não terminou a tempo.")
+
+
+def test_impressao_em_lote_pdf_unico():
+    init_jobs_db()
+    orders = _orders("pdf")
+
+    job_id = iniciar_impressao(orders, FORMATO_PDF, max_workers=2)
+    job = _aguardar(job_id)
+
+    assert job["status"] == CONCLUIDO, job["erro"]
+    assert job["feitos"] == job["total"] == 3
+
+    resultado = resultado_job(job_id)
+    reader = PdfReader(io.BytesIO(resultado["arquivo"]))
+
+    assert resultado["mime"] == "application/pdf"
+    assert len(reader.pages) == 3
+    assert [
+        f"OS: OS-pdf-{n}" in reader.pages[n - 1].extract_text()
+        for n in (1, 2, 3)
+    ] == [True, True, True]
+
+
+def test_impressao_em_lote_zip():
+    init_jobs_db()
+    orders = _orders("zip", 2)
+
+    job_id = iniciar_impressao(orders, FORMATO_ZIP, max_workers=2)
+    job = _aguardar(job_id)
+
+    assert job["status"] == CONCLUIDO, job["erro"]
+
+    resultado = resultado_job(job_id)
+
+    with zipfile.ZipFile(io.BytesIO(resultado["arquivo"])) as zf:
+        assert sorted(zf.namelist()) == ["OS-zip-1.pdf", "OS-zip-2.pdf"]
+
+        for nome in zf.namelist():
+            reader = PdfReader(io.BytesIO(zf.read(nome)))
+            assert len(reader.pages) == 1
+            assert nome.removesuffix(".pdf") in reader.pages[0].extract_text()
@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from core import jobs
+from core.jobs import (
+    CANCELADO,
+    CONCLUIDO,
+    STATUS_ATIVOS,
+    JobContext,
+    cancelar_job,
+    descartar_job,
+    init_jobs_db,
+    resultado_job,
+    status_job,
+    submeter_job,
+)
+from diagnostico.utils import executar_comando
+
+
+@pytest.fixture(autouse=True)
+def tabela_jobs():
+    init_jobs_db()
+
+
+def _aguardar(job_id: str, limite: float = 10) -> dict:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        job = status_job(job_id)
+        if job["status"] not in STATUS_ATIVOS:
+            return job
+        time.sleep(0.05)
+    pytest.fail("O job não terminou a tempo.")
+
+
+def _esperar_liberacao(job, liberar: threading.Event):
+    liberar.wait(5)
+    job.verificar_cancelamento()
+    return "pronto"
+
+
+def test_job_descartado_enquanto_roda_e_cancelado():
+    liberar = threading.Event()
+    job_id = submeter_job(_esperar_liberacao, liberar, tipo="teste")
+
+    descartar_job(job_id)
+    assert JobContext(job_id).cancelado
+
+    liberar.set()
+    assert _aguardar(job_id)["status"] == CANCELADO
+    assert resultado_job(job_id) is None
+
+
+def test_cancelar_depois_de_terminar_nao_falha():
+    job_id = submeter_job(lambda job: "pronto", tipo="teste")
+
+    assert _aguardar(job_id)["status"] == CONCLUIDO
+    assert resultado_job(job_id) == "pronto"
+
+    cancelar_job(job_id)
+    descartar_job(job_id)
+    assert resultado_job(job_id) is None
+
+
+def test_resultados_em_memoria_tem_limite(monkeypatch):
+    monkeypatch.setattr(jobs, "RESULTADOS_MAX", 2)
+
+    ids = [submeter_job(lambda job, n=n: bytes(n), tipo="teste") for n in range(3)]
+    for job_id in ids:
+        _aguardar(job_id)
+
+    guardados = [job_id for job_id in ids if resultado_job(job_id) is not None]
+    assert len(guardados) == 2
+
+
+def test_resultado_expira(monkeypatch):
+    job_id = submeter_job(lambda job: b"pdf", tipo="teste")
+    _aguardar(job_id)
+    assert resultado_job(job_id) == b"pdf"
+
+    monkeypatch.setattr(jobs, "RESULTADO_TTL", 0)
+    time.sleep(0.01)
+    assert resultado_job(job_id) is None
+
+
+def test_comando_em_andamento_para_ao_cancelar():
+    inicio = time.monotonic()
+    resultado = executar_comando(
+        [sys.executable, "-c", "import time; time.sleep(30)"],
+        timeout=30,
+        cancelado=lambda: time.monotonic() - inicio > 0.3,
+    )
+
+    assert time.monotonic() - inicio < 5
+    assert not resultado["ok"]
+    assert resultado["stderr"].startswith("Comando cancelado")
+
+
+def test_comando_sem_cancelamento_devolve_a_saida():
+    resultado = executar_comando([sys.executable, "-c", "print('ok')"], timeout=10)
+
+    assert resultado["ok"]
+    assert resultado["stdout"].strip() == "ok"
@@ -0,0 +1,118 @@
+"""Resolução de modelos de aparelho (core.modelos) e o backfill de `modelo_id`."""
+
+import pytest
+
+from core import modelos
+from diagnostico import database as diag_db
+from ordem_servico import database as os_db
+
+
+@pytest.fixture
+def catalogo():
+    """Banco com o catálogo de modelos e o índice em memória zerado."""
+    diag_db.init_db()
+    os_db.init_db()
+    modelos.init_modelos_db()
+    modelos.invalidar_modelos()
+
+    a12 = diag_db.cadastrar_modelo_aparelho("Samsung", "SM-A125M", "Galaxy A12")
+    g8 = diag_db.cadastrar_modelo_aparelho("Motorola", "XT2045-1", "Moto G8 Power")
+    return {"a12": a12, "g8": g8}
+
+
+def _modelo_da_os(os_id):
+    conn = os_db.get_connection()
+    row = conn.execute(
+        "SELECT modelo_id FROM service_orders WHERE id = ?", (os_id,)
+    ).fetchone()
+    conn.close()
+    return row["modelo_id"]
+
+
+def _sem_modelo(os_id):
+    conn = os_db.get_connection()
+    conn.execute("UPDATE service_orders SET modelo_id = NULL WHERE id = ?", (os_id,))
+    conn.commit()
+    conn.close()
+
+
+def test_resolver_texto_inteiro_trecho_e_aproximado(catalogo):
+    assert modelos.modelo_id_para("Samsung Galaxy A-12") == catalogo["a12"]
+    assert modelos.modelo_id_para("sm-a125m") == catalogo["a12"]
+
+    # Trecho: o modelo no meio de uma descrição livre
+    assert modelos.modelo_id_para("A12 tela quebrada") == catalogo["a12"]
+
+    # Aproximado: erro de digitação acima do limiar
+    assert modelos.modelo_id_para("Moto G8 Pwer") == catalogo["g8"]
+
+    assert modelos.modelo_id_para("Nokia 3310") is None
+    assert modelos.modelo_id_para("") is None
+
+
+def test_alias_tem_precedencia_sobre_o_catalogo(catalogo):
+    assert modelos.modelo_id_para("Moto G8 Power") == catalogo["g8"]
+
+    modelos.cadastrar_alias("Moto G8 Power", catalogo["a12"])
+    assert modelos.modelo_id_para("Motorola Moto G8 Power") == catalogo["a12"]
+
+    modelos.excluir_alias(modelos.chave_modelo("Moto G8 Power"))
+    assert modelos.modelo_id_para("Motorola Moto G8 Power") == catalogo["g8"]
+
+
+def test_backfill_resolve_pendentes_e_acompanha_alias(catalogo, nova_os):
+    os_a12 = nova_os(aparelho="Galaxy A12")
+    os_alias = nova_os(aparelho="Galáxia Pro")
+    assert _modelo_da_os(os_a12) == catalogo["a12"]
+    assert _modelo_da_os(os_alias) is None
+
+    _sem_modelo(os_a12)
+    assert modelos.reindexar_modelos() == 1
+    assert _modelo_da_os(os_a12) == catalogo["a12"]
+
+    # Alias novo resolve a linha que tinha ficado sem modelo
+    modelos.cadastrar_alias("Galáxia Pro", catalogo["g8"])
+    assert _modelo_da_os(os_alias) == catalogo["g8"]
+
+
+def test_atualizar_modelo_reprocessa_linhas_ja_resolvidas(catalogo, nova_os):
+    os_id = nova_os(aparelho="Galaxy A12")
+    assert _modelo_da_os(os_id) == catalogo["a12"]
+
+    diag_db.atualizar_modelo_aparelho(catalogo["a12"], "Samsung", "SM-A125M", "Galaxy A12s")
+    diag_db.atualizar_modelo_aparelho(catalogo["g8"], "Motorola", "XT2045-1", "Galaxy A12")
+
+    assert _modelo_da_os(os_id) == catalogo["g8"]
+
+
+def test_init_so_reprocessa_sem_modelo_quando_o_catalogo_muda(catalogo, nova_os, monkeypatch):
+    os_id = nova_os(aparelho="Nokia 3310")
+    assert _modelo_da_os(os_id) is None
+
+    chamadas = []
+    original = modelos.reindexar_modelos
+    monkeypatch.setattr(
+        modelos, "reindexar_modelos",
+        lambda *a, **k: chamadas.append(a) or original(*a, **k),
+    )
+
+    modelos.init_modelos_db()
+    assert chamadas == []
+
+    diag_db.cadastrar_modelo_aparelho("Nokia", "TA-1030", "Nokia 3310")
+    chamadas.clear()
+    _sem_modelo(os_id)
+
+    # Catálogo gravado igual ao atual: nada a fazer na inicialização
+    modelos.init_modelos_db()
+    assert chamadas == []
+
+    # Catálogo alterado fora do sistema: a inicialização reprocessa
+    conn = diag_db.get_connection()
+    conn.execute("UPDATE aparelho_reindexacao SET assinatura = 'antiga'")
+    conn.commit()
+    conn.close()
+
+    modelos.init_modelos_db()
+    assert len(chamadas) == 1
+    assert _modelo_da_os(os_id) is not None
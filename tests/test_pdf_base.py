@@ -0,0 +1,58 @@
+"""
+core.pdf reaproveita fonte e logo já interpretados mexendo em
+atributos internos do fpdf2 (versão fixada em requirements.txt).
+Estes testes falham se uma atualização do fpdf2 mudar esses detalhes.
+"""
+
+import datetime
+import io
+
+import pytest
+
+import core.pdf
+from core.pdf import FONTE_UTF8, DocumentoPDF, _font_files, _fonte_modelo, _logo_bytes
+
+
+class DocumentoPublico(DocumentoPDF):
+    """Mesmo documento, montado só com a API pública do fpdf2."""
+
+    def _adicionar_fonte(self, caminho: str, estilo: str):
+        self.add_font(FONTE_UTF8, estilo, caminho)
+
+    def logo(self, x: float = 10, y: float = 10, w: float = 40):
+        self.image(io.BytesIO(_logo_bytes()), x=x, y=y, w=w)
+
+
+def _gerar(classe) -> bytes:
+    pdf = classe()
+    pdf.set_creation_date(datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc))
+    pdf.add_page()
+    pdf.cabecalho("Extrato de Carnê")
+    pdf.fonte_padrao("B", 12)
+    pdf.paragrafo(7, "José da Conceição — Ação 123 €")
+    pdf.fonte_padrao("", 10)
+    pdf.linha(6, "Peça: tela ção")
+    return bytes(pdf.output())
+
+
+def test_fonte_e_logo_em_cache_geram_o_mesmo_pdf_da_api_publica():
+    if not _font_files() or not _logo_bytes():
+        pytest.skip("Sem fonte UTF-8 ou logo neste ambiente")
+
+    assert _gerar(DocumentoPDF) == _gerar(DocumentoPublico)
+
+
+def test_atributos_internos_usados_pelo_cache():
+    if not _font_files():
+        pytest.skip("Sem fonte UTF-8 neste ambiente")
+
+    modelo = _fonte_modelo(_font_files()[0], "")
+    for atributo in ("i", "ttfont", "subset", "missing_glyphs", "biggest_size_pt", "_hbfont", "color_font", "is_cff", "fontkey"):
+        assert hasattr(modelo, atributo), atributo
+
+    nome, info, _ = core.pdf._logo_decodificado()
+    assert {"i", "usages"} <= set(info)
+
+    pdf = DocumentoPDF()
+    assert nome not in pdf.image_cache.images
+    assert isinstance(pdf.image_cache.icc_profiles, dict)
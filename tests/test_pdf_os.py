@@ -0,0 +1,65 @@
+import io
+
+from pypdf import PdfReader
+
+import core.pdf
+from ordem_servico.pdf import build_pdf_bytes, render_order_pdf
+
+
+def _order(**campos):
+    order = {
+        "id": "os-1",
+        "numero_os": "OS-0001",
+        "nome": "José da Conceição",
+        "fone": "(14) 99639-4412",
+        "email": None,
+        "aparelho": "Galaxy A12",
+        "data_entrada": "2026-10-19T12:00:00",
+        "status": "Pronto",
+        "detalhes_servico": "Tela quebrada e bateria estufada. " * 10,
+        "servico_realizado": "Troca de tela",
+        "valor_estimado": 250.5,
+        "updated_at": "2026-10-19T12:00:00",
+    }
+    order.update(campos)
+    return order
+
+
+def _texto(pdf_bytes: bytes) -> str:
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
+def test_render_order_pdf_tem_todas_as_linhas():
+    texto = _texto(render_order_pdf(_order()))
+
+    assert "OS: OS-0001" in texto
+    assert "Cliente: José da Conceição" in texto
+    assert "Problema relatado:" in texto
+    assert "Serviço realizado:" in texto
+    assert "Valor estimado: R$ 250.50" in texto
+
+
+def test_render_order_pdf_documentos_seguidos_independentes():
+    primeiro = _texto(render_order_pdf(_order(nome="Ana Ñusta")))
+    segundo = _texto(render_order_pdf(_order(nome="Bruno Øster")))
+
+    assert "Ana Ñusta" in primeiro and "Bruno" not in primeiro
+    assert "Bruno Øster" in segundo and "Ana" not in segundo
+
+
+def test_render_order_pdf_sem_fonte_utf8(monkeypatch):
+    monkeypatch.setattr(core.pdf, "_font_files", lambda: None)
+
+    texto = _texto(render_order_pdf(_order(nome="Maria 中文")))
+
+    assert "Cliente: Maria ??" in texto
+
+
+def test_build_pdf_bytes_cache_por_versao():
+    order = _order(id="os-cache")
+
+    assert build_pdf_bytes(order) is build_pdf_bytes(dict(order))
+    assert build_pdf_bytes(order) is not build_pdf_bytes(
+        _order(id="os-cache", updated_at="2026-10-20T08:00:00")
+    )
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from ordem_servico.database import (
+    MOTIVO_ENTREGA,
+    arquivar_os_lote,
+    get_connection,
+    get_os_entregues_por_periodo,
+    get_os_financeiras_por_periodo,
+    get_os_por_status_periodo,
+    init_db,
+    update_orders_status,
+)
+
+
+def test_arquivar_como_entregue_conta_como_receita(nova_os):
+    order_id = nova_os(valor_estimado=250)
+    update_orders_status([order_id], "Pronto")
+
+    assert get_os_financeiras_por_periodo() == {"total_os": 0, "valor_total": 0}
+
+    arquivar_os_lote([order_id], MOTIVO_ENTREGA)
+    hoje = datetime.utcnow().date().isoformat()
+
+    assert get_os_financeiras_por_periodo(hoje, hoje) == {"total_os": 1, "valor_total": 250}
+    assert get_os_por_status_periodo() == {"Entregue": 1}
+
+    entregues = get_os_entregues_por_periodo(hoje, hoje)
+    assert [e["valor_estimado"] for e in entregues] == [250]
+    assert entregues[0]["delivered_at"].startswith(hoje)
+
+
+def test_arquivar_cancelada_nao_conta_como_receita(nova_os):
+    order_id = nova_os(valor_estimado=180)
+    update_orders_status([order_id], "Em análise")
+
+    arquivar_os_lote([order_id], "Cancelado pelo cliente")
+
+    assert get_os_financeiras_por_periodo() == {"total_os": 0, "valor_total": 0}
+    assert get_os_entregues_por_periodo() == []
+
+
+def test_init_db_corrige_entregas_arquivadas_antigas(nova_os):
+    order_id = nova_os(valor_estimado=90)
+    arquivar_os_lote([order_id], MOTIVO_ENTREGA)
+
+    # Como gravava a versão anterior: sem delivered_at, rollup em "Em análise"
+    conn = get_connection()
+    conn.execute("UPDATE os_arquivadas SET delivered_at = NULL")
+    conn.execute("DELETE FROM os_diario")
+    conn.execute(
+        "INSERT INTO os_diario (dia, status, quantidade, receita) VALUES ('2026-01-01', 'Em análise', 1, 90)"
+    )
+    conn.commit()
+    conn.close()
+
+    init_db()
+
+    assert get_os_financeiras_por_periodo()["valor_total"] == 90
+    assert get_os_por_status_periodo() == {"Entregue": 1}
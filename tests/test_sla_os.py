@@ -0,0 +1,52 @@
+from datetime import date
+
+from ordem_servico.database import fetch_os_em_risco, fetch_order_by_id
+from ordem_servico.utils import avaliar_sla, referencia_sla
+
+
+def _em_risco(hoje: str) -> dict:
+    return {o["id"]: o for o in fetch_os_em_risco(hoje)}
+
+
+def test_timestamp_utc_apos_meia_noite_conta_no_dia_local(nova_os):
+    # 02:30 UTC do dia 19 = 23:30 do dia 18 em Brasília
+    order_id = nova_os(status="Em reparo", started_at="2026-10-19T02:30:00")
+
+    # Alerta de "Em reparo" a partir de 3 dias: 18 → 21
+    risco = _em_risco("2026-10-21")
+    assert risco[order_id]["dias"] == 3
+    assert risco[order_id]["nivel"] == "alerta"
+
+    assert order_id not in _em_risco("2026-10-20")
+
+
+def test_data_pura_nao_e_ajustada(nova_os):
+    order_id = nova_os(status="Recebido", data_entrada="2026-10-19")
+
+    assert order_id not in _em_risco("2026-10-19")
+    assert _em_risco("2026-10-20")[order_id]["dias"] == 1
+
+
+def test_consulta_e_card_contam_os_mesmos_dias(nova_os):
+    order_id = nova_os(status="Em reparo", started_at="2026-10-19T02:30:00")
+    order = fetch_order_by_id(order_id)
+
+    for hoje in ("2026-10-21", "2026-10-24"):
+        dias, nivel = avaliar_sla(order, date.fromisoformat(hoje))
+        risco = _em_risco(hoje)[order_id]
+        assert (dias, nivel) == (risco["dias"], risco["nivel"])
+
+
+def test_referencia_do_card_segue_o_status(nova_os):
+    em_reparo = fetch_order_by_id(nova_os(
+        status="Em reparo", data_entrada="2026-10-01", started_at="2026-10-18T12:00:00",
+    ))
+    recebida = fetch_order_by_id(nova_os(status="Recebido", data_entrada="2026-10-01"))
+    sem_inicio = fetch_order_by_id(nova_os(status="Em reparo", data_entrada="2026-10-01"))
+
+    assert referencia_sla(em_reparo) == "started_at"
+    assert referencia_sla(recebida) == "data_entrada"
+    assert referencia_sla(sem_inicio) == "data_entrada"
+
+    # O número exibido é o mesmo que definiu a cor: 2 dias em reparo, não 19 na loja
+    assert avaliar_sla(em_reparo, date(2026, 10, 20)) == (2, None)
@@ -0,0 +1,67 @@
+import pytest
+
+from core.clientes import fetch_timeline_cliente
+from diagnostico import database as diag_db
+from ordem_servico import database as os_db
+
+
+@pytest.fixture(autouse=True)
+def tabelas():
+    """A linha do tempo consulta as tabelas de todos os módulos."""
+    diag_db.init_db()
+    os_db.init_db()
+
+
+def _diagnostico(diag_id: str, cliente: str, created_at: str):
+    diag_db.inserir_diagnostico({
+        "id": diag_id,
+        "tipo": "Android",
+        "cliente": cliente,
+        "aparelho": "Galaxy A12",
+        "status": "Concluído",
+        "created_at": created_at,
+    })
+
+
+def _paginas(nome: str, limit: int) -> list[dict]:
+    itens, cursor = fetch_timeline_cliente(nome, limit=limit)
+    while cursor:
+        pagina, cursor = fetch_timeline_cliente(nome, cursor=cursor, limit=limit)
+        itens += pagina
+    return itens
+
+
+def test_timeline_intercala_origens_pelo_dia_local(nova_venda, nova_os):
+    cliente = "Maria Souza"
+
+    venda_10, _ = nova_venda(cliente, data_venda="2026-03-10")
+    venda_11, _ = nova_venda(cliente, data_venda="2026-03-11")
+    # 01:00 UTC do dia 11 = 22:00 do dia 10 em Brasília
+    os_10 = nova_os(nome=cliente, data_entrada="2026-03-11T01:00:00")
+    os_12 = nova_os(nome=cliente, data_entrada="2026-03-12")
+    _diagnostico("diag-10", cliente, "2026-03-10T23:30:00")
+    _diagnostico("diag-12", cliente, "2026-03-12T15:00:00")
+
+    esperado = [
+        ("2026-03-12", os_12),
+        ("2026-03-12", "diag-12"),
+        ("2026-03-11", venda_11),
+        ("2026-03-10", os_10),
+        ("2026-03-10", venda_10),
+        ("2026-03-10", "diag-10"),
+    ]
+
+    for limit in (1, 2, 4, 50):
+        itens = _paginas(cliente, limit)
+        assert [(i["data"], i["id"]) for i in itens] == esperado
+
+
+def test_timeline_ultima_pagina_sem_cursor(nova_venda):
+    nova_venda("João Lima", data_venda="2026-03-10")
+    nova_venda("João Lima", data_venda="2026-03-11")
+
+    itens, cursor = fetch_timeline_cliente("joao lima", limit=2)
+    assert len(itens) == 2 and cursor is None
+
+    itens, cursor = fetch_timeline_cliente("João Lima", limit=1)
+    assert cursor == ("2026-03-11", "sales", itens[0]["id"])
@@ -0,0 +1,64 @@
+from vendas.database import (
+    add_parcel_adjustment,
+    delete_parcel_adjustments,
+    fetch_events_since,
+    fetch_last_event_seq,
+    fetch_reminder_clients_changed,
+)
+
+
+def _ajuste(parcel_id: str, n: int = 1) -> dict:
+    return {
+        "id": f"{parcel_id}-a{n}",
+        "parcel_id": parcel_id,
+        "tipo": "pagamento",
+        "valor": 50.0,
+        "descricao": "Pagamento parcial",
+        "created_at": "2026-02-10T12:00:00",
+    }
+
+
+def _clientes_alterados(desde_seq: int) -> list[str]:
+    # Janelas de vencimento vazias: só os eventos contam
+    return fetch_reminder_clients_changed(desde_seq, "2000-01-01", "2000-01-01", "2000-01-01", "2000-01-01")
+
+
+def test_parcelas_e_ajustes_geram_eventos(nova_venda):
+    sale_id, parcel_ids = nova_venda("Ana Souza")
+    add_parcel_adjustment(_ajuste(parcel_ids[0]))
+
+    eventos = fetch_events_since(0)
+    tipos = [e["tipo"] for e in eventos]
+
+    assert tipos.count("parcel_inserted") == len(parcel_ids)
+    assert tipos[-1] == "adjustment_added"
+
+    ajuste = eventos[-1]
+    assert ajuste["sale_id"] == sale_id
+    assert ajuste["cliente"] == "Ana Souza"
+    assert ajuste["payload"]["parcel_id"] == parcel_ids[0]
+
+
+def test_remover_ajustes_gera_evento_para_os_lembretes(nova_venda):
+    sale_id, parcel_ids = nova_venda("Bruno Lima")
+    nova_venda("Carla Dias")
+    add_parcel_adjustment(_ajuste(parcel_ids[0]))
+
+    seq = fetch_last_event_seq()
+    delete_parcel_adjustments(sale_id)
+
+    assert fetch_last_event_seq() > seq
+    assert _clientes_alterados(seq) == ["Bruno Lima"]
+
+    evento = fetch_events_since(seq)[0]
+    assert evento["tipo"] == "adjustments_deleted"
+    assert evento["payload"] == {"removidos": 1}
+
+
+def test_remover_sem_ajustes_nao_gera_evento(nova_venda):
+    sale_id, _ = nova_venda("Diego Alves")
+
+    seq = fetch_last_event_seq()
+    delete_parcel_adjustments(sale_id)
+
+    assert fetch_last_event_seq() == seq
@@ -1,7 +1,11 @@
 import sqlite3
+import json
 from config import DB_PATH
 from datetime import datetime
 
+from core.clientes import ensure_cliente_chave_columns, chave_cliente
+from core.modelos import ensure_modelo_id_column, modelo_id_para
+
 # ---------------- CONNECTION ----------------
 def get_connection():
     conn = sqlite3.connect(DB_PATH)
@@ -102,7 +106,64 @@ def init_db():
         """
     )
 
+    # ---- PAYMENT REMINDERS (FILA DE COBRANÇA) ----
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payment_reminders (
+            id TEXT PRIMARY KEY,
+            cliente TEXT NOT NULL,
+            tipo TEXT NOT NULL,             -- atraso | vencimento
+            total REAL NOT NULL,
+            mensagem TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            status TEXT NOT NULL,           -- pendente | enviado
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payment_reminder_parcels (
+            reminder_id TEXT NOT NULL,
+            parcel_id TEXT NOT NULL,
+            PRIMARY KEY (reminder_id, parcel_id),
+            FOREIGN KEY (reminder_id) REFERENCES payment_reminders(id) ON DELETE CASCADE
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payment_reminder_state (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+        """
+    )
+
+    # ---- EVENT LOG (APPEND-ONLY) ----
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vendas_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,             -- sale_inserted | parcel_inserted | adjustment_added | adjustments_deleted | sale_archived | sale_deleted | sale_closed | closed_sale_recovered | closed_sale_deleted
+            sale_id TEXT NOT NULL,
+            entity_id TEXT,
+            cliente TEXT,
+            payload TEXT,
+            created_at TEXT NOT NULL
+        );
+        """
+    )
+
     ensure_sales_closed_columns(cur)
+    ensure_modelo_id_column(cur, "sales")
+    ensure_modelo_id_column(cur, "sales_archive")
+    ensure_cliente_chave_columns(cur, "sales")
+    ensure_cliente_chave_columns(cur, "sales_archive")
+    ensure_vendas_indexes(cur)
     
     conn.commit()
     conn.close()
@@ -121,6 +182,80 @@ def ensure_sales_closed_columns(cur):
         )
 
 
+def ensure_vendas_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_parcels_vencimento ON parcels(vencimento)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_parcels_sale ON parcels(sale_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_parcels_created ON parcels(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_adjustments_parcel ON parcel_adjustments(parcel_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_adjustments_created ON parcel_adjustments(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminders_cliente ON payment_reminders(cliente, status)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_vendas_events_sale ON vendas_events(sale_id, seq)")
+
+
+# ---------------- EVENT LOG ----------------
+def _append_event(
+    cur,
+    tipo: str,
+    sale_id: str,
+    entity_id: str | None = None,
+    cliente: str | None = None,
+    payload: dict | None = None,
+):
+    """
+    Registra um evento de escrita na mesma transação do cursor.
+    O seq (AUTOINCREMENT) é estritamente crescente e nunca reutilizado.
+    """
+    cur.execute(
+        """
+        INSERT INTO vendas_events (
+            tipo, sale_id, entity_id, cliente, payload, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            tipo,
+            sale_id,
+            entity_id,
+            cliente,
+            json.dumps(payload, ensure_ascii=False) if payload else None,
+            datetime.utcnow().isoformat(),
+        )
+    )
+
+
+def fetch_events_since(seq: int = 0, limit: int | None = None):
+    """Eventos com seq maior que o informado, em ordem de escrita."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = "SELECT * FROM vendas_events WHERE seq > ? ORDER BY seq"
+    params = [seq]
+
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    events = []
+    for r in rows:
+        event = dict(r)
+        event["payload"] = json.loads(event["payload"]) if event["payload"] else {}
+        events.append(event)
+
+    return events
+
+
+def fetch_last_event_seq() -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM vendas_events")
+    seq = cur.fetchone()["seq"]
+    conn.close()
+    return seq
+
+
 # ---------------- INSERTS ----------------
 def insert_sale(sale: dict):
     conn = get_connection()
@@ -129,6 +264,7 @@ def insert_sale(sale: dict):
     # 🔒 Garantia absoluta de string (sem timezone, sem hora)
     data_venda = str(sale["data_venda"])[:10]
     created_at = str(sale["created_at"])
+    modelo_id = modelo_id_para(sale["aparelho"])
 
     cur.execute(
         """
@@ -141,9 +277,11 @@ def insert_sale(sale: dict):
             valor_total,
             data_venda,
             frequencia_pagamento,
+            modelo_id,
+            cliente_chave,
             created_at
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             sale["id"],
@@ -154,10 +292,20 @@ def insert_sale(sale: dict):
             sale["valor_total"],
             data_venda,   # 🔹 STRING YYYY-MM-DD
             sale["frequencia_pagamento"],
+            modelo_id,
+            chave_cliente(sale["cliente"]),
             created_at,
         )
     )
 
+    _append_event(
+        cur,
+        "sale_inserted",
+        sale["id"],
+        cliente=sale["cliente"],
+        payload={"valor_total": sale["valor_total"], "data_venda": data_venda},
+    )
+
     conn.commit()
     conn.close()
 
@@ -187,6 +335,23 @@ def insert_parcels(parcels: list[dict]):
         for p in parcels
     ])
 
+    sale_ids = sorted({p["sale_id"] for p in parcels})
+    cur.execute(
+        f"SELECT id, cliente FROM sales WHERE id IN ({', '.join('?' for _ in sale_ids)})",
+        sale_ids,
+    )
+    clientes = {r["id"]: r["cliente"] for r in cur.fetchall()}
+
+    for p in parcels:
+        _append_event(
+            cur,
+            "parcel_inserted",
+            p["sale_id"],
+            entity_id=p["id"],
+            cliente=clientes.get(p["sale_id"]),
+            payload={"vencimento": p["vencimento"], "valor": p["valor_original"]},
+        )
+
     conn.commit()
     conn.close()
 
@@ -211,6 +376,31 @@ def add_parcel_adjustment(adjustment: dict):
         )
     )
 
+    cur.execute(
+        """
+        SELECT p.sale_id, s.cliente
+        FROM parcels p
+        JOIN sales s ON s.id = p.sale_id
+        WHERE p.id = ?
+        """,
+        (adjustment["parcel_id"],)
+    )
+    parcela = cur.fetchone()
+
+    if parcela:
+        _append_event(
+            cur,
+            "adjustment_added",
+            parcela["sale_id"],
+            entity_id=adjustment["id"],
+            cliente=parcela["cliente"],
+            payload={
+                "parcel_id": adjustment["parcel_id"],
+                "tipo": adjustment["tipo"],
+                "valor": adjustment["valor"],
+            },
+        )
+
     conn.commit()
     conn.close()
 
@@ -348,6 +538,314 @@ def fetch_closed_sale_adjustments(closed_sale_id):
     conn.close()
     return [dict(r) for r in rows]
 
+# ---------------- EXTRATO (CARNÊ) ----------------
+def fetch_statement_rows(cliente: str | None = None):
+    """
+    Retorna as parcelas das vendas ativas com os ajustes já somados
+    por parcela, em uma única consulta.
+    Sem cliente, retorna todos os clientes (uso em lote).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = """
+        SELECT
+            s.id AS sale_id,
+            s.cliente,
+            s.aparelho,
+            s.data_venda,
+            s.valor_total,
+            p.id AS parcel_id,
+            p.parcela_num,
+            p.valor_original,
+            p.vencimento,
+            COALESCE(SUM(CASE WHEN a.tipo = 'pagamento' THEN a.valor END), 0) AS pago,
+            COALESCE(SUM(CASE WHEN a.tipo = 'acrescimo' THEN a.valor END), 0) AS acrescimo,
+            COALESCE(SUM(CASE WHEN a.tipo = 'desconto' THEN a.valor END), 0) AS desconto
+        FROM sales s
+        JOIN parcels p ON p.sale_id = s.id
+        LEFT JOIN parcel_adjustments a ON a.parcel_id = p.id
+    """
+    params = []
+
+    if cliente:
+        query += " WHERE s.cliente = ?"
+        params.append(cliente)
+
+    query += """
+        GROUP BY p.id
+        ORDER BY s.cliente, s.data_venda, s.id, p.parcela_num
+    """
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+# ---------------- LEMBRETES DE PAGAMENTO ----------------
+def fetch_reminder_state():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT chave, valor FROM payment_reminder_state")
+    rows = cur.fetchall()
+    conn.close()
+    return {r["chave"]: r["valor"] for r in rows}
+
+
+def save_reminder_state(values: dict):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.executemany(
+        """
+        INSERT INTO payment_reminder_state (chave, valor)
+        VALUES (?, ?)
+        ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor
+        """,
+        [(k, None if v is None else str(v)) for k, v in values.items()]
+    )
+
+    conn.commit()
+    conn.close()
+
+
+def fetch_reminder_clients_all(limite: str):
+    """
+    Clientes com parcelas vencendo até `limite` ou com lembrete
+    pendente (execução completa).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT DISTINCT s.cliente
+        FROM parcels p
+        JOIN sales s ON s.id = p.sale_id
+        WHERE p.vencimento <= ?
+
+        UNION
+
+        SELECT cliente
+        FROM payment_reminders
+        WHERE status = 'pendente'
+        """,
+        (limite,)
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+    return [r["cliente"] for r in rows]
+
+
+def fetch_reminder_clients_changed(
+    desde_seq: int,
+    hoje_anterior: str,
+    hoje: str,
+    limite_anterior: str,
+    limite: str,
+):
+    """
+    Clientes afetados desde a última execução: qualquer escrita
+    registrada em vendas_events após `desde_seq` (vendas, parcelas,
+    ajustes e remoções de ajustes, arquivamentos, exclusões e
+    encerramentos), mais parcelas
+    que entraram na janela de vencimento ou passaram a estar em atraso.
+    As faixas de data usam o índice de vencimento.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT cliente
+        FROM vendas_events
+        WHERE seq > ?
+          AND cliente IS NOT NULL
+
+        UNION
+
+        SELECT s.cliente
+        FROM parcels p
+        JOIN sales s ON s.id = p.sale_id
+        WHERE p.vencimento > ? AND p.vencimento <= ?
+
+        UNION
+
+        SELECT s.cliente
+        FROM parcels p
+        JOIN sales s ON s.id = p.sale_id
+        WHERE p.vencimento >= ? AND p.vencimento < ?
+        """,
+        (
+            desde_seq,
+            limite_anterior, limite,
+            hoje_anterior, hoje,
+        )
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+    return [r["cliente"] for r in rows]
+
+
+def fetch_due_parcels_for_clients(clientes: list[str], limite: str):
+    """
+    Parcelas com saldo em aberto e vencimento até `limite`
+    dos clientes informados, com os ajustes já somados.
+    """
+    if not clientes:
+        return []
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    placeholders = ",".join("?" for _ in clientes)
+
+    cur.execute(
+        f"""
+        SELECT
+            s.cliente,
+            s.aparelho,
+            p.id AS parcel_id,
+            p.parcela_num,
+            p.vencimento,
+            ROUND(
+                p.valor_original
+                + COALESCE(SUM(CASE WHEN a.tipo = 'acrescimo' THEN a.valor END), 0)
+                - COALESCE(SUM(CASE WHEN a.tipo = 'desconto' THEN a.valor END), 0)
+                - COALESCE(SUM(CASE WHEN a.tipo = 'pagamento' THEN a.valor END), 0),
+                2
+            ) AS saldo
+        FROM parcels p
+        JOIN sales s ON s.id = p.sale_id
+        LEFT JOIN parcel_adjustments a ON a.parcel_id = p.id
+        WHERE s.cliente IN ({placeholders})
+          AND p.vencimento <= ?
+        GROUP BY p.id
+        HAVING saldo > 0
+        ORDER BY s.cliente, p.vencimento, p.parcela_num
+        """,
+        [*clientes, limite]
+    )
+
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def sync_client_reminders(reminders: dict):
+    """
+    Atualiza a fila para os clientes informados em uma transação.
+
+    reminders: {cliente: lembrete | None}. Se o último lembrete do
+    cliente tiver o mesmo fingerprint, nada muda (enviado continua
+    enviado). Caso contrário o pendente anterior é substituído.
+    Retorna a quantidade de lembretes criados.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    criados = 0
+
+    try:
+        for cliente, reminder in reminders.items():
+            cur.execute(
+                """
+                SELECT fingerprint
+                FROM payment_reminders
+                WHERE cliente = ?
+                ORDER BY created_at DESC
+                LIMIT 1
+                """,
+                (cliente,)
+            )
+            ultimo = cur.fetchone()
+
+            if reminder and ultimo and ultimo["fingerprint"] == reminder["fingerprint"]:
+                continue
+
+            cur.execute(
+                "DELETE FROM payment_reminders WHERE cliente = ? AND status = 'pendente'",
+                (cliente,)
+            )
+
+            if not reminder:
+                continue
+
+            cur.execute(
+                """
+                INSERT INTO payment_reminders (
+                    id, cliente, tipo, total, mensagem,
+                    fingerprint, status, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, 'pendente', ?)
+                """,
+                (
+                    reminder["id"],
+                    cliente,
+                    reminder["tipo"],
+                    reminder["total"],
+                    reminder["mensagem"],
+                    reminder["fingerprint"],
+                    reminder["created_at"],
+                )
+            )
+
+            cur.executemany(
+                """
+                INSERT INTO payment_reminder_parcels (reminder_id, parcel_id)
+                VALUES (?, ?)
+                """,
+                [(reminder["id"], pid) for pid in reminder["parcel_ids"]]
+            )
+            criados += 1
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return criados
+
+
+def fetch_payment_reminders(status: str | None = None):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = "SELECT * FROM payment_reminders"
+    params = []
+
+    if status:
+        query += " WHERE status = ?"
+        params.append(status)
+
+    query += " ORDER BY tipo, cliente"
+
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def mark_reminder_sent(reminder_id: str):
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        UPDATE payment_reminders
+        SET status = 'enviado',
+            sent_at = ?
+        WHERE id = ?
+        """,
+        (datetime.utcnow().isoformat(), reminder_id)
+    )
+
+    conn.commit()
+    conn.close()
+
 
 # ---------------- ARCHIVE ----------------
 def archive_sale(sale_id):
@@ -364,8 +862,9 @@ def archive_sale(sale_id):
         """
         INSERT INTO sales_archive (
             id, cliente, aparelho, valor_entrada,
-            tipo_venda, valor_total, data_venda, frequencia_pagamento, created_at, archived_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            tipo_venda, valor_total, data_venda, frequencia_pagamento, modelo_id,
+            cliente_chave, created_at, archived_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             sale["id"],
@@ -376,12 +875,15 @@ def archive_sale(sale_id):
             sale["valor_total"],
             sale["data_venda"],
             sale["frequencia_pagamento"],
+            sale["modelo_id"],
+            sale["cliente_chave"],
             sale["created_at"],
             datetime.utcnow().isoformat(),
         )
     )
 
     cur.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+    _append_event(cur, "sale_archived", sale_id, cliente=sale["cliente"])
     conn.commit()
     conn.close()
 
@@ -389,7 +891,11 @@ def archive_sale(sale_id):
 def delete_sale(sale_id):
     conn = get_connection()
     cur = conn.cursor()
+    cur.execute("SELECT cliente FROM sales WHERE id = ?", (sale_id,))
+    sale = cur.fetchone()
     cur.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+    if sale:
+        _append_event(cur, "sale_deleted", sale_id, cliente=sale["cliente"])
     conn.commit()
     conn.close()
 
@@ -407,6 +913,19 @@ def delete_parcel_adjustments(sale_id):
         """,
         (sale_id,)
     )
+    removidos = cur.rowcount
+
+    if removidos:
+        cur.execute("SELECT cliente FROM sales WHERE id = ?", (sale_id,))
+        sale = cur.fetchone()
+
+        _append_event(
+            cur,
+            "adjustments_deleted",
+            sale_id,
+            cliente=sale["cliente"] if sale else None,
+            payload={"removidos": removidos},
+        )
 
     conn.commit()
     conn.close()
@@ -495,6 +1014,14 @@ def close_sale_critical(sale_id: str, motivo: str):
         # Finalmente remove a venda
         cur.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
 
+        _append_event(
+            cur,
+            "sale_closed",
+            sale_id,
+            cliente=sale["cliente"],
+            payload={"motivo": motivo, "valor_perdido": valor_perdido},
+        )
+
         conn.commit()
         # st.success("Venda encerrada por exceção com sucesso.")
 
@@ -519,15 +1046,35 @@ def update_closed_sale_recovery(sale_id, valor):
         (valor, sale_id)
     )
 
+    if cur.rowcount:
+        cur.execute("SELECT cliente FROM sales_closed WHERE id = ?", (sale_id,))
+
+        _append_event(
+            cur,
+            "closed_sale_recovered",
+            sale_id,
+            cliente=cur.fetchone()["cliente"],
+            payload={"valor": valor},
+        )
+
+    conn.commit()
+    conn.close()
+
 #--- development utility function ---
 def delete_closed_sale(cliente):
     conn = get_connection()
     cur = conn.cursor()
 
+    cur.execute("SELECT id FROM sales_closed WHERE cliente = ?", (cliente,))
+    sale_ids = [r["id"] for r in cur.fetchall()]
+
     cur.execute(
         "DELETE FROM sales_closed WHERE cliente = ?",
         (cliente,)
     )
 
+    for sale_id in sale_ids:
+        _append_event(cur, "closed_sale_deleted", sale_id, cliente=cliente)
+
     conn.commit()
     conn.close()
@@ -0,0 +1,238 @@
+"""
+Extrato de carnê por cliente (PDF).
+
+Gera o extrato de um cliente a partir de sales, parcels e
+parcel_adjustments, e permite gerar em lote os extratos de todos os
+clientes com saldo em aberto usando um pool de processos.
+"""
+
+import hashlib
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from config import EXTRATOS_DIR
+from core.dates import fmt_date, normalize_date
+from core.pdf import DocumentoPDF, init_pdf_worker
+
+from .database import fetch_statement_rows
+from .view import currency
+
+TITULO = "Bestcell - Extrato de Carnê"
+
+# Larguras das colunas da tabela de parcelas (mm)
+COLUNAS_PARCELAS = [
+    ("Parcela", 20),
+    ("Vencimento", 30),
+    ("Valor", 32),
+    ("Pago", 32),
+    ("Saldo", 32),
+    ("Situação", 44),
+]
+
+# =========================================================
+# AGRUPAMENTO
+# =========================================================
+
+def _parcel_status(saldo: float, vencimento: date, hoje: date) -> str:
+    if saldo <= 0:
+        return "Pago"
+    if vencimento < hoje:
+        return "Atrasado"
+    return "Em dia"
+
+
+def group_statements(rows: list[dict], hoje: date | None = None) -> dict:
+    """
+    Agrupa as linhas de fetch_statement_rows por cliente e venda.
+
+    Retorna {cliente: [venda, ...]}, onde cada venda contém a lista
+    de parcelas com valor, pago, saldo e situação.
+    """
+    hoje = hoje or date.today()
+    extratos = {}
+    vendas_por_id = {}
+
+    for r in rows:
+        venda = vendas_por_id.get(r["sale_id"])
+
+        if venda is None:
+            venda = {
+                "sale_id": r["sale_id"],
+                "aparelho": r["aparelho"],
+                "data_venda": r["data_venda"],
+                "valor_total": r["valor_total"],
+                "parcelas": [],
+            }
+            vendas_por_id[r["sale_id"]] = venda
+            extratos.setdefault(r["cliente"], []).append(venda)
+
+        valor = round(r["valor_original"] + r["acrescimo"] - r["desconto"], 2)
+        saldo = round(valor - r["pago"], 2)
+        vencimento = normalize_date(r["vencimento"])
+
+        venda["parcelas"].append({
+            "parcela_num": r["parcela_num"],
+            "vencimento": r["vencimento"],
+            "valor": valor,
+            "pago": round(r["pago"], 2),
+            "saldo": saldo,
+            "status": _parcel_status(saldo, vencimento, hoje),
+        })
+
+    return extratos
+
+
+def saldo_em_aberto(vendas: list[dict]) -> float:
+    return round(
+        sum(
+            max(p["saldo"], 0)
+            for v in vendas
+            for p in v["parcelas"]
+        ),
+        2,
+    )
+
+# =========================================================
+# PDF DO EXTRATO
+# =========================================================
+
+def build_statement_pdf_bytes(cliente: str, vendas: list[dict], emitido_em=None) -> bytes:
+    pdf = DocumentoPDF()
+    pdf.add_page()
+    pdf.cabecalho(TITULO)
+
+    pdf.ln(15)
+    pdf.fonte_padrao("B", 12)
+    pdf.linha(7, f"Cliente: {cliente}")
+
+    pdf.fonte_padrao("", 10)
+    pdf.linha(6, f"Emitido em: {fmt_date(emitido_em or date.today().isoformat())}")
+
+    for venda in vendas:
+        pdf.ln(5)
+        pdf.fonte_padrao("B", 11)
+        pdf.paragrafo(
+            7,
+            f"{venda['aparelho']} - Venda em {fmt_date(venda['data_venda'])}"
+            f" - Total: {currency(venda['valor_total'])}"
+        )
+
+        pdf.fonte_padrao("B", 9)
+        for titulo, largura in COLUNAS_PARCELAS:
+            pdf.cell(largura, 6, pdf.texto(titulo), border=1, align="C")
+        pdf.ln()
+
+        pdf.fonte_padrao("", 9)
+        for p in venda["parcelas"]:
+            valores = [
+                str(p["parcela_num"]),
+                fmt_date(p["vencimento"]),
+                currency(p["valor"]),
+                currency(p["pago"]),
+                currency(max(p["saldo"], 0)),
+                p["status"],
+            ]
+            for (_, largura), valor in zip(COLUNAS_PARCELAS, valores):
+                pdf.cell(largura, 6, pdf.texto(valor), border=1, align="C")
+            pdf.ln()
+
+    pdf.ln(5)
+    pdf.fonte_padrao("B", 12)
+    pdf.linha(7, f"Saldo em aberto: {currency(saldo_em_aberto(vendas))}")
+
+    return bytes(pdf.output())
+
+
+def build_client_statement(cliente: str) -> bytes | None:
+    """Gera o extrato de um único cliente (uso na tela de parcelas)."""
+    extratos = group_statements(fetch_statement_rows(cliente))
+    vendas = extratos.get(cliente)
+
+    if not vendas:
+        return None
+
+    return build_statement_pdf_bytes(cliente, vendas)
+
+# =========================================================
+# GERAÇÃO EM LOTE
+# =========================================================
+
+def statement_file_name(cliente: str) -> str:
+    """
+    Nome do arquivo do extrato. O sufixo vem do nome exato do cliente:
+    "José Silva" e "Jose Silva" viram arquivos diferentes no lote.
+    """
+    nome = re.sub(r"[^\w\s-]", "", (cliente or "sem_nome").strip(), flags=re.UNICODE)
+    nome = re.sub(r"\s+", "_", nome)[:80] or "sem_nome"
+    sufixo = hashlib.sha1((cliente or "").encode("utf-8")).hexdigest()[:8]
+    return f"extrato_{nome}_{sufixo}.pdf"
+
+
+def _write_statement(output_dir: str, cliente: str, vendas: list[dict], emitido_em: str) -> str:
+    path = Path(output_dir) / statement_file_name(cliente)
+    path.write_bytes(build_statement_pdf_bytes(cliente, vendas, emitido_em))
+    return str(path)
+
+
+def _extratos_pendentes() -> dict:
+    """Cliente -> vendas, só para quem tem saldo em aberto."""
+    extratos = group_statements(fetch_statement_rows())
+    return {
+        cliente: vendas
+        for cliente, vendas in extratos.items()
+        if saldo_em_aberto(vendas) > 0
+    }
+
+
+def gerar_extratos_em_lote(output_dir=None, max_workers: int | None = None) -> list[Path]:
+    """
+    Gera um PDF por cliente com saldo em aberto e grava no diretório.
+    Os dados são lidos em uma única consulta; apenas a renderização
+    é distribuída entre os processos.
+    """
+    output_dir = Path(output_dir or EXTRATOS_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    pendentes = _extratos_pendentes()
+
+    if not pendentes:
+        return []
+
+    emitido_em = date.today().isoformat()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_pdf_worker) as executor:
+        futures = [
+            executor.submit(_write_statement, str(output_dir), cliente, vendas, emitido_em)
+            for cliente, vendas in pendentes.items()
+        ]
+        return [Path(f.result()) for f in futures]
+
+
+def gerar_extratos_job(job, output_dir=None, max_workers: int | None = None) -> list[str]:
+    """
+    Versão de gerar_extratos_em_lote para core.jobs: reporta o
+    progresso por cliente e pode ser cancelada no meio do lote.
+    """
+    output_dir = Path(output_dir or EXTRATOS_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    pendentes = _extratos_pendentes()
+    job.progresso(0, len(pendentes))
+
+    emitido_em = date.today().isoformat()
+    chamadas = [
+        (str(output_dir), cliente, vendas, emitido_em)
+        for cliente, vendas in pendentes.items()
+    ]
+
+    return [
+        caminho
+        for _, caminho in job.map_processos(
+            _write_statement,
+            chamadas,
+            initializer=init_pdf_worker,
+            max_workers=max_workers,
+        )
+    ]
@@ -0,0 +1,159 @@
+"""
+Fila de lembretes de cobrança (WhatsApp).
+
+Seleciona parcelas vencidas ou que vencem nos próximos N dias,
+agrupa por cliente e grava uma mensagem pronta por cliente na
+tabela payment_reminders, com estado pendente/enviado.
+
+A geração é incremental: só os clientes com eventos em vendas_events
+desde a última execução (ou com parcelas que mudaram de faixa de
+vencimento) são recalculados, então rodar a cada hora é barato.
+"""
+
+import hashlib
+import uuid
+from datetime import date, datetime, timedelta
+
+from core.dates import fmt_date, normalize_date
+
+from .database import (
+    fetch_last_event_seq,
+    fetch_reminder_state,
+    save_reminder_state,
+    fetch_reminder_clients_all,
+    fetch_reminder_clients_changed,
+    fetch_due_parcels_for_clients,
+    sync_client_reminders,
+)
+from .view import currency
+
+DIAS_ANTECEDENCIA_PADRAO = 3
+
+# =========================================================
+# MENSAGENS
+# =========================================================
+
+def build_reminder_message(cliente: str, parcelas: list[dict], hoje: date) -> str:
+    atrasadas = [p for p in parcelas if normalize_date(p["vencimento"]) < hoje]
+    a_vencer = [p for p in parcelas if normalize_date(p["vencimento"]) >= hoje]
+
+    linhas = [
+        "*Lembrete de pagamento - Bestcell*\n",
+        f"Olá, {cliente}!\n",
+    ]
+
+    if atrasadas:
+        linhas.append("Parcelas em atraso:")
+        linhas.extend(
+            f"• {p['aparelho']} - Parcela {p['parcela_num']} - "
+            f"venceu em {fmt_date(p['vencimento'])} - {currency(p['saldo'])}"
+            for p in atrasadas
+        )
+        linhas.append("")
+
+    if a_vencer:
+        linhas.append("Próximos vencimentos:")
+        linhas.extend(
+            f"• {p['aparelho']} - Parcela {p['parcela_num']} - "
+            f"vence em {fmt_date(p['vencimento'])} - {currency(p['saldo'])}"
+            for p in a_vencer
+        )
+        linhas.append("")
+
+    total = sum(p["saldo"] for p in parcelas)
+    linhas.append(f"Total: {currency(total)}\n")
+
+    if atrasadas:
+        linhas.append("Multa diária por atraso: R$ 3,90.")
+
+    linhas.append("Em caso de dúvida, fale conosco: (14) 99639-4412")
+
+    return "\n".join(linhas)
+
+
+def build_client_reminder(cliente: str, parcelas: list[dict], hoje: date) -> dict | None:
+    if not parcelas:
+        return None
+
+    atrasado = any(normalize_date(p["vencimento"]) < hoje for p in parcelas)
+
+    # Muda quando o conjunto de parcelas, saldos ou situação muda
+    assinatura = "|".join(
+        f"{p['parcel_id']}:{p['saldo']:.2f}:{normalize_date(p['vencimento']) < hoje:d}"
+        for p in sorted(parcelas, key=lambda p: p["parcel_id"])
+    )
+
+    return {
+        "id": str(uuid.uuid4()),
+        "tipo": "atraso" if atrasado else "vencimento",
+        "total": round(sum(p["saldo"] for p in parcelas), 2),
+        "mensagem": build_reminder_message(cliente, parcelas, hoje),
+        "fingerprint": hashlib.sha1(assinatura.encode("utf-8")).hexdigest(),
+        "parcel_ids": [p["parcel_id"] for p in parcelas],
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+# =========================================================
+# GERAÇÃO INCREMENTAL
+# =========================================================
+
+def gerar_lembretes(dias: int = DIAS_ANTECEDENCIA_PADRAO, completo: bool = False) -> dict:
+    """
+    Atualiza a fila de lembretes.
+
+    Sem estado anterior (ou com `completo=True`, ou se `dias` mudou)
+    recalcula todos os clientes com parcelas até o limite; caso
+    contrário recalcula apenas os clientes afetados desde a última
+    execução.
+    """
+    hoje = date.today()
+    limite = hoje + timedelta(days=dias)
+
+    # Lido antes das consultas: eventos gravados durante a execução
+    # ficam com seq maior e entram na próxima rodada
+    ultimo_seq = fetch_last_event_seq()
+
+    estado = fetch_reminder_state()
+
+    incremental = (
+        not completo
+        and estado.get("last_event_seq") is not None
+        and estado.get("dias") == str(dias)
+    )
+
+    if incremental:
+        clientes = fetch_reminder_clients_changed(
+            desde_seq=int(estado["last_event_seq"]),
+            hoje_anterior=estado["last_hoje"],
+            hoje=hoje.isoformat(),
+            limite_anterior=estado["last_limite"],
+            limite=limite.isoformat(),
+        )
+    else:
+        clientes = fetch_reminder_clients_all(limite.isoformat())
+
+    parcelas = fetch_due_parcels_for_clients(clientes, limite.isoformat())
+
+    por_cliente = {cliente: [] for cliente in clientes}
+    for p in parcelas:
+        por_cliente[p["cliente"]].append(p)
+
+    lembretes = {
+        cliente: build_client_reminder(cliente, itens, hoje)
+        for cliente, itens in por_cliente.items()
+    }
+
+    criados = sync_client_reminders(lembretes)
+
+    save_reminder_state({
+        "last_event_seq": ultimo_seq,
+        "last_hoje": hoje.isoformat(),
+        "last_limite": limite.isoformat(),
+        "dias": dias,
+    })
+
+    return {
+        "clientes_verificados": len(clientes),
+        "lembretes_criados": criados,
+        "incremental": bool(incremental),
+    }
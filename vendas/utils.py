@@ -1,7 +1,8 @@
-import pandas as pd
-from datetime import date, datetime
+from datetime import date
 from dateutil.relativedelta import relativedelta
 
+from core.dates import normalize_date
+
 from .database import (
     fetch_parcels,
     fetch_parcel_adjustments,
@@ -14,48 +15,6 @@ DAILY_FINE = 3.90
 
 # ================= DATAS =================
 
-def normalize_date(value) -> date:
-    """
-    Normaliza qualquer entrada para datetime.date
-    SEM timezone, SEM hora, SEM pandas UTC.
-    """
-
-    if value is None:
-        return None
-
-    # Já é date (caso do st.date_input)
-    if isinstance(value, date) and not isinstance(value, datetime):
-        return value
-
-    # datetime -> date
-    if isinstance(value, datetime):
-        return value.date()
-
-    # pandas Timestamp
-    if isinstance(value, pd.Timestamp):
-        return value.to_pydatetime().date()
-
-    # string ISO (YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS)
-    if isinstance(value, str):
-        return datetime.fromisoformat(value[:10]).date()
-
-    raise TypeError(f"Tipo inválido para data: {type(value)}")
-
-def normalize_datetime(value) -> datetime | None:
-    
-    if value is None:
-        return None
-    
-    if isinstance(value, datetime):
-        return value
-    
-    if isinstance(value, pd.Timestamp):
-        return value.to_pydatetime()
-    
-    if isinstance(value, str):
-        return datetime.fromisoformat(value)
-    raise TypeError(f"Tipo inválido para data: {type(value)}")
-
 def add_months_safe(orig_date, months):
     return orig_date + relativedelta(months=months)
 
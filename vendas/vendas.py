@@ -20,11 +20,17 @@ from .database import (
     close_sale_critical,
     fetch_closed_sales,
     update_closed_sale_recovery,
+    fetch_payment_reminders,
+    mark_reminder_sent,
 )
 
+from config import EXTRATOS_DIR
+from core.dates import parse_date_column, parse_datetime_column
+from core.jobs import STATUS_ATIVOS, submeter_job, status_job, descartar_job
+from core.jobs_view import acompanhar_job
+
 from .utils import (
     normalize_date,
-    normalize_datetime,
     add_months_safe,
     calculate_due_dates,
     parcel_financial_summary,    
@@ -32,6 +38,17 @@ from .utils import (
     system_health_summary,
 )
 
+from .lembretes import (
+    DIAS_ANTECEDENCIA_PADRAO,
+    gerar_lembretes,
+)
+
+from .extrato import (
+    build_client_statement,
+    gerar_extratos_job,
+    statement_file_name,
+)
+
 from .view import (
     sales_view,
     parcels_view,
@@ -57,7 +74,7 @@ def app():
     StateManager.init(MODULE, VendasState.FILTRO_CLIENTE, "")
     StateManager.init(MODULE, VendasState.VENDA_SELECIONADA, None)
 
-    tabs = st.tabs(["🧾 Vendas", "💰 Parcelas", "📊 Relatórios"])
+    tabs = st.tabs(["🧾 Vendas", "💰 Parcelas", "📊 Relatórios", "🔔 Lembretes"])
 
 # ======================================================
 # 🧾 VENDAS
@@ -426,6 +443,128 @@ def app():
         else:
             st.info("Nenhuma parcela disponível para exibir detalhes.")
 
+        # ---------------- EXTRATO DO CLIENTE ----------------
+        if not df.empty:
+            st.markdown("### Extrato do cliente")
+
+            col_cliente, col_lote = st.columns(2)
+
+            with col_cliente:
+                cliente_extrato = st.selectbox(
+                    "Cliente",
+                    sorted(df["Cliente"].unique()),
+                    key="vendas_extrato_cliente"
+                )
+
+                if st.button("📄 Gerar extrato", key="vendas_gerar_extrato"):
+                    pdf_bytes = build_client_statement(cliente_extrato)
+
+                    if pdf_bytes:
+                        st.download_button(
+                            "Baixar extrato (PDF)",
+                            pdf_bytes,
+                            file_name=statement_file_name(cliente_extrato),
+                            mime="application/pdf",
+                        )
+                    else:
+                        st.info("Nenhuma parcela ativa para este cliente.")
+
+            with col_lote:
+                st.caption("Extratos de todos os clientes com saldo em aberto")
+
+                job_id = st.session_state.get("vendas_extratos_job")
+                job = status_job(job_id) if job_id else None
+
+                if job and job["status"] in STATUS_ATIVOS:
+                    acompanhar_job(job_id, "Gerando extratos...")
+
+                elif job:
+                    if job["status"] == "concluido":
+                        if job["feitos"]:
+                            st.success(f"{job['feitos']} extrato(s) salvo(s) em {EXTRATOS_DIR}")
+                        else:
+                            st.info("Nenhum cliente com saldo em aberto.")
+                    elif job["status"] == "erro":
+                        st.error(f"Erro ao gerar os extratos: {job['erro']}")
+                    else:
+                        st.warning(f"Geração de extratos {job['status']} ({job['feitos']} salvo(s)).")
+
+                    if st.button("OK", key="vendas_extratos_ok"):
+                        descartar_job(job_id)
+                        st.session_state.pop("vendas_extratos_job", None)
+                        st.rerun()
+
+                elif st.button("🗂️ Gerar extratos em lote", key="vendas_extratos_lote"):
+                    st.session_state["vendas_extratos_job"] = submeter_job(
+                        gerar_extratos_job,
+                        tipo="extratos_lote",
+                        modulo="vendas",
+                        descricao="Extratos de clientes com saldo em aberto",
+                    )
+                    st.rerun()
+
+# ======================================================
+# 🔔 LEMBRETES
+# ======================================================
+    with tabs[3]:
+        st.header("Lembretes de Pagamento")
+
+        col_dias, col_gerar = st.columns(
+            [3, 1],
+            vertical_alignment="bottom"
+        )
+
+        dias_lembrete = col_dias.number_input(
+            "Avisar parcelas que vencem nos próximos (dias)",
+            min_value=0,
+            max_value=30,
+            value=DIAS_ANTECEDENCIA_PADRAO,
+            step=1,
+            key="vendas_lembretes_dias"
+        )
+
+        if col_gerar.button("🔄 Atualizar fila", width="stretch"):
+            resultado = gerar_lembretes(int(dias_lembrete))
+            st.success(
+                f"{resultado['clientes_verificados']} cliente(s) verificados • "
+                f"{resultado['lembretes_criados']} lembrete(s) novo(s)"
+            )
+
+        filtro_lembretes = st.radio(
+            "Exibir",
+            ["Pendentes", "Enviados"],
+            horizontal=True,
+            key="vendas_lembretes_filtro"
+        )
+
+        lembretes = fetch_payment_reminders(
+            "pendente" if filtro_lembretes == "Pendentes" else "enviado"
+        )
+
+        if not lembretes:
+            st.info("Nenhum lembrete nesta fila.")
+
+        for lembrete in lembretes:
+            with st.container(border=True):
+                col_msg, col_acao = st.columns([4, 1])
+
+                with col_msg:
+                    icone = "🔴" if lembrete["tipo"] == "atraso" else "🟡"
+                    st.markdown(f"{icone} **{lembrete['cliente']}** — {currency(lembrete['total'])}")
+                    st.code(lembrete["mensagem"], language=None)
+
+                with col_acao:
+                    if lembrete["status"] == "pendente":
+                        if st.button(
+                            "✅ Marcar enviado",
+                            key=f"lembrete_enviado_{lembrete['id']}",
+                            width="stretch"
+                        ):
+                            mark_reminder_sent(lembrete["id"])
+                            st.rerun()
+                    else:
+                        st.caption(f"Enviado em {fmt_date(lembrete['sent_at'], True)}")
+
 # ======================================================
 # 📊 RELATÓRIOS
 # ======================================================
@@ -520,20 +659,21 @@ def app():
         df_adj = pd.DataFrame([dict(a) for a in adjustments]) if adjustments else pd.DataFrame()
             
         if not df_adj.empty:
-            df_adj["created_at"] = df_adj["created_at"].apply(normalize_datetime)
+            df_adj["created_at"] = parse_datetime_column(df_adj["created_at"])
             df_adj = df_adj.dropna(subset=["created_at"])
+            df_adj["mes_ano"] = df_adj["created_at"].dt.strftime("%Y-%m")
 
         if not df_parcels.empty:
-            df_parcels["vencimento"] = df_parcels["vencimento"].apply(normalize_date)
+            df_parcels["vencimento"] = parse_date_column(df_parcels["vencimento"])
 
         # ======================================================
         # FILTRO DE PERÍODO (VENDAS)
         # ======================================================
-        df_sales["data_venda"] = df_sales["data_venda"].apply(normalize_date)
+        df_sales["data_venda"] = parse_date_column(df_sales["data_venda"])
 
         df_sales = df_sales[
-            (df_sales["data_venda"] >= data_inicio) &
-            (df_sales["data_venda"] <= data_fim)
+            (df_sales["data_venda"] >= pd.Timestamp(data_inicio)) &
+            (df_sales["data_venda"] <= pd.Timestamp(data_fim))
         ]
 
         if df_sales.empty:
@@ -543,7 +683,7 @@ def app():
         # ======================================================
         # AGRUPAMENTO MENSAL
         # ======================================================
-        df_sales["mes_ano"] = df_sales["data_venda"].apply(lambda d: f"{d.year}-{d.month:02d}")
+        df_sales["mes_ano"] = df_sales["data_venda"].dt.strftime("%Y-%m")
 
         resumo = []
 
@@ -557,7 +697,7 @@ def app():
             if not df_adj.empty:
                 valor_recebido = df_adj[
                     (df_adj["tipo"] == "pagamento") &
-                    (df_adj["created_at"].dt.to_period("M").astype(str) == mes)
+                    (df_adj["mes_ano"] == mes)
                 ]["valor"].sum()
             else:
                 valor_recebido = 0
@@ -628,8 +768,8 @@ def app():
         if tipo_analise == "Vendas do mês":
 
             df_vendas_mes = df_sales[
-                (df_sales["data_venda"].apply(lambda d: d.year) == ano_ref) &
-                (df_sales["data_venda"].apply(lambda d: d.month) == mes_ref)
+                (df_sales["data_venda"].dt.year == ano_ref) &
+                (df_sales["data_venda"].dt.month == mes_ref)
             ]
 
             if df_vendas_mes.empty:
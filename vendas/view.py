@@ -1,7 +1,8 @@
 import pandas as pd
-from datetime import timedelta
 from datetime import date, datetime
 
+from core.dates import fmt_date
+
 # ======================================================
 # FORMATAÇÃO DE MOEDA (EXCLUSIVO DA CAMADA DE VIEW)
 # ======================================================
@@ -22,29 +23,8 @@ def hide_value(value, visible: bool):
 # ======================================================
 # FORMATAÇÃO DE DATAS (UTC → LOCAL)
 # ======================================================
-def fmt_date(value, with_time=False):
-    if not value:
-        return ""
-
-    try:
-        dt = pd.to_datetime(value, format="mixed")
+# fmt_date vem de core.dates (memoizado por valor)
 
-        # ⚠️ Se NÃO houver horário explícito, é data pura → NÃO ajusta timezone
-        if dt.hour == 0 and dt.minute == 0 and dt.second == 0 and not with_time:
-            return dt.strftime("%d/%m/%Y")
-
-        # Caso tenha horário, converte UTC → Brasília
-        dt_local = dt - timedelta(hours=3)
-
-        return (
-            dt_local.strftime("%d/%m/%Y %H:%M")
-            if with_time
-            else dt_local.strftime("%d/%m/%Y")
-        )
-
-    except Exception:
-        return str(value)
-    
 def format_mes_ano(value):
     if not value:
         return ""